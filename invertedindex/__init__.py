@@ -0,0 +1,40 @@
+# invertedindex: an inverted index of documents (term -> the documents and positions it appears at) with boolean, phrase, proximity
+# and ranked queries. Index (in index.py) is the place to start.
+# Importing the package imports none of its modules. Each name below is imported from its module the first time it is used, so
+# "import invertedindex" costs next to nothing until an index is built or loaded, and NumPy and matplotlib only when they are needed.
+
+import importlib
+
+EXPORTS = {
+    'index': ['Index'],
+    'postings': ['Posting', 'PostingList', 'PostingCursor', 'CompressedPostingList', 'CompressedPostingCursor'],
+    'compact': ['CompactIndex', 'MetaTable'],
+    'build': ['buildIndex', 'readDocuments', 'invertShard'],
+    'storage': ['writeIndex', 'isIndexCurrent', 'DiskIndex', 'SegmentedIndex', 'openIndex', 'IndexWriter'],
+    'external': ['buildIndexExternal'],
+    'query': ['terms_0', 'getAllDocIds', 'daatRetrieval', 'matchPositions', 'conjunctiveDocs', 'proximityRetrieval', 'findPhrase',
+        'getTermStats', 'rangeDocIds', 'distinctPlays'],
+    'ranking': ['CollectionStats', 'BM25Scorer', 'DirichletScorer', 'exhaustiveRetrieval', 'rankedRetrieval'],
+    'batch': ['batchRetrieval'],
+    'cache': ['QueryCache'],
+    'tracing': ['QueryTrace', 'TraceStats'],
+    'docsets': ['DocSet', 'termDocSet', 'booleanRetrieval'],
+    'columnar': ['ColumnarPostingList', 'ColumnarIndex', 'makeBackend'],
+    'server': ['QueryServer', 'loadTest'],
+    'benchmark': ['runBenchmark'],
+    'reports': ['writeReports', 'plotCounts', 'phraseScenes'],
+    'cli': ['main']
+}
+MODULES = dict((name, module) for module, names in EXPORTS.items() for name in names) # Name -> module it is in
+__all__ = list(MODULES)
+
+def __getattr__(name): # Called for names not imported yet
+    module = MODULES.get(name)
+    if module is None:
+        raise AttributeError("module " + __name__ + " has no attribute " + name)
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value # Later lookups find it without coming here
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,5 @@
+# python -m invertedindex runs the command line, like python Indexer.py
+import sys
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,76 @@
+import heapq
+from .query import matchPositions
+
+####################################################################################################################################
+
+# Batch queries
+# batchRetrieval answers a list of queries with one document-at-a-time pass over the posting lists of all their terms, so a term used
+# by many queries has its posting list decoded once. A query is (operator, terms):
+    # ('or', terms): documents with any of the terms (like getAllDocIds)
+    # ('and', terms): documents with all of the terms
+    # ('phrase', terms): documents where the terms appear next to each other in that order
+    # ('more', [term1, term2]): documents with both terms where term1 appears more times than term2 (like terms_0)
+    # ('counts', terms): documents with all of the terms, mapped to the number of times each term appears in them
+# Returns the results in the same order as the queries: a set of docIds, or for 'counts' a dictionary of docId -> tuple of counts.
+
+####################################################################################################################################
+
+BATCH_OPERATORS = ('or', 'and', 'phrase', 'more', 'counts')
+
+def batchRetrieval(queries, index):
+    results = []
+    byTerm = dict() # Term -> indexes of the queries that need it
+    for i, (operator, terms) in enumerate(queries):
+        if operator not in BATCH_OPERATORS:
+            raise ValueError("Unknown batch operator " + str(operator))
+        if operator == 'more' and len(terms) != 2:
+            raise ValueError("'more' takes exactly two terms")
+        results.append(dict() if operator == 'counts' else set())
+        if operator != 'or' and any(t not in index for t in terms):
+            continue # Needs a term that is in no document, so there is nothing to find
+        for t in set(terms):
+            if t in index:
+                byTerm.setdefault(t, []).append(i)
+
+    terms = list(byTerm.keys())
+    lists = [index[t].cursor() for t in terms]
+    heap = [] # (current docId, term number) of every posting list not done yet
+    for n, l in enumerate(lists):
+        if not l.isDone():
+            heap.append((l.getCurrentDoc(), n))
+    heapq.heapify(heap)
+
+    while len(heap) > 0:
+        d = heap[0][0]
+        present = dict() # Term -> its posting list, for the terms in document d
+        numbers = [] # Term numbers of those lists
+        while len(heap) > 0 and heap[0][0] == d:
+            _, n = heapq.heappop(heap)
+            present[terms[n]] = lists[n]
+            numbers.append(n)
+
+        touched = set() # Queries with at least one term in document d
+        for t in present:
+            touched.update(byTerm[t])
+
+        for i in touched:
+            operator, queryTerms = queries[i]
+            if operator == 'or':
+                results[i].add(d)
+            elif all(t in present for t in queryTerms):
+                if operator == 'and':
+                    results[i].add(d)
+                elif operator == 'more':
+                    if present[queryTerms[0]].getCurrentTf() > present[queryTerms[1]].getCurrentTf():
+                        results[i].add(d)
+                elif operator == 'counts':
+                    results[i][d] = tuple(present[t].getCurrentTf() for t in queryTerms)
+                elif len(matchPositions([present[t].getCurrentPositions() for t in queryTerms])) > 0: # 'phrase'
+                    results[i].add(d)
+
+        for n in numbers: # Move every list that was on d to its next document
+            lists[n].movePast()
+            if not lists[n].isDone():
+                heapq.heappush(heap, (lists[n].getCurrentDoc(), n))
+
+    return results
@@ -0,0 +1,180 @@
+import cProfile
+import json
+import gzip
+import math
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import tracemalloc
+from .postings import CompressedPostingList
+from .build import invertShard, buildIndex
+from .storage import writeIndex, openIndex
+from .query import getAllDocIds, daatRetrieval, proximityRetrieval, findPhrase
+from .ranking import CollectionStats, BM25Scorer, DirichletScorer, rankedRetrieval
+from .batch import batchRetrieval
+from .columnar import makeBackend
+from .compare import bestTime, RANKING_QUERIES, REPORT_BATCH
+
+####################################################################################################################################
+
+# Benchmark
+# Times each phase of building the index and each class of query, one at a time, on a synthetic corpus made from the Shakespeare
+# scenes, and saves the results as json so runs on different commits can be compared with benchmark-diff.
+# Build phases, each timed on its own over the whole corpus:
+    # decompress: gzip.decompress of the corpus file
+    # parse: json.loads of the decompressed text
+    # tokenize: splitting every text into words
+    # invert: invertShard on every text. It splits the texts itself, so this includes tokenize
+    # build: buildIndex from the file, streaming (all of the above at once)
+    # write, load: writeIndex to a directory and opening it again with openIndex
+# Query classes are timed on the loaded index, each query best of repeat runs. Every phase and query class is also run once more under
+# tracemalloc for its peak memory, and with a profile directory once more under cProfile, dumped to <directory>/<name>.prof.
+# Run with: python Indexer.py benchmark [documents] [replicate | shuffle] [results.json] [profile directory]
+# Compare two results with: python Indexer.py benchmark-diff old.json new.json
+
+####################################################################################################################################
+
+BENCHMARK_QUERIES = [
+    ('or', ['verona', 'rome', 'italy']), ('or', ['falstaff']), ('or', ['soldier']),
+    ('and', ['thee', 'you']), ('and', ['thou', 'you']), ('and', ['lady', 'macbeth']),
+    ('phrase', ['lady', 'macbeth']), ('phrase', ['a', 'rose', 'by', 'any', 'other', 'name']), ('phrase', ['cry', 'havoc']),
+    ('findPhrase', ['lady', 'macbeth']), ('findPhrase', ['a', 'rose', 'by', 'any', 'other', 'name']), ('findPhrase', ['cry', 'havoc']),
+    ('window', ['cry', 'havoc']), ('window', ['king', 'crown']),
+    ('more', ['thee', 'you']), ('more', ['thou', 'you'])
+] + [('bm25', Q) for Q in RANKING_QUERIES] + [('dirichlet', Q) for Q in RANKING_QUERIES] + [('batch', REPORT_BATCH)]
+
+# Returns count documents made from documents: copies of all of them in order ('replicate') or each copy in a random order ('shuffle').
+# Copies after the first get '#copy' added to their sceneId
+def syntheticCorpus(documents, count, mode = 'replicate', seed = 0):
+    if mode not in ('replicate', 'shuffle'):
+        raise ValueError("Unknown corpus mode " + str(mode) + ", use replicate or shuffle")
+    corpus = []
+    copy = 0
+    while len(corpus) < count and len(documents) > 0:
+        scenes = list(documents)
+        if mode == 'shuffle':
+            random.Random(seed + copy).shuffle(scenes)
+        for doc in scenes[:count - len(corpus)]:
+            corpus.append(doc if copy == 0 else dict(doc, sceneId = doc['sceneId'] + '#' + str(copy)))
+        copy += 1
+    return corpus
+
+def benchmarkQuery(query, index, scorers): # Runs one query of BENCHMARK_QUERIES
+    queryClass, terms = query
+    if queryClass == 'or':
+        return getAllDocIds([t for t in terms if t in index], index)
+    if queryClass == 'and':
+        return daatRetrieval(terms, index) if all(t in index for t in terms) else set()
+    if queryClass == 'phrase':
+        return proximityRetrieval(terms, index)
+    if queryClass == 'findPhrase': # The way the phrase reports find phrases
+        return [d for d in daatRetrieval(terms, index) if findPhrase(terms, index, d)] if all(t in index for t in terms) else []
+    if queryClass == 'window':
+        return proximityRetrieval(terms, index, '#uw', 8)
+    if queryClass == 'more':
+        return makeBackend('object', index).more(terms[0], terms[1])
+    if queryClass == 'batch':
+        return batchRetrieval(terms, index)
+    return rankedRetrieval(terms, index, scorers[queryClass])
+
+def tracedPeak(function, *args): # Peak bytes allocated by tracemalloc while function runs
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def profileRun(directory, name, function, *args): # Runs function under cProfile and dumps the stats to directory/name.prof
+    profile = cProfile.Profile()
+    profile.runcall(function, *args)
+    profile.dump_stats(os.path.join(directory, name + '.prof'))
+
+def gitCommit(): # Short hash of the checked out commit, or None outside a git repository
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output = True, text = True,
+            cwd = os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.strip() if result.returncode == 0 else None
+    except OSError:
+        return None
+
+def runBenchmark(jsonfilename, count = None, mode = 'replicate', profileDirectory = None, repeat = 3):
+    with gzip.open(jsonfilename, 'rt') as f:
+        documents = json.load(f)['corpus']
+    corpus = syntheticCorpus(documents, len(documents) if count is None else count, mode)
+    if profileDirectory is not None:
+        os.makedirs(profileDirectory, exist_ok = True)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'corpus.json.gz')
+        indexDirectory = os.path.join(directory, 'corpus.idx')
+        with gzip.open(filename, 'wt', compresslevel = 6) as f:
+            json.dump({ 'corpus':corpus }, f)
+        with open(filename, 'rb') as f:
+            compressed = f.read()
+        decompressed = gzip.decompress(compressed)
+        texts = [doc['text'] for doc in corpus]
+        index, meta = buildIndex(filename)
+
+        def load():
+            loaded = openIndex(indexDirectory)
+            loaded.getMeta()
+            loaded.close()
+
+        phases = [
+            ('decompress', gzip.decompress, compressed),
+            ('parse', json.loads, decompressed),
+            ('tokenize', lambda: [text.split() for text in texts]),
+            ('invert', invertShard, (texts, 0, CompressedPostingList)),
+            ('build', buildIndex, filename),
+            ('write', writeIndex, index, meta, indexDirectory),
+            ('load', load)
+        ]
+        results = { 'commit':gitCommit(), 'python':platform.python_version(), 'repeat':repeat,
+            'corpus':{ 'documents':len(corpus), 'mode':mode, 'terms':len(index), 'postings':sum(index[t].getDocCount() for t in index.keys()),
+                'bytes':len(compressed) }, 'phases':dict(), 'queries':dict() }
+        for name, function, *args in phases:
+            results['phases'][name] = { 'seconds':bestTime(function, *args, repeat = repeat), 'peakBytes':tracedPeak(function, *args) }
+            if profileDirectory is not None:
+                profileRun(profileDirectory, name, function, *args)
+
+        loaded = openIndex(indexDirectory)
+        stats = CollectionStats(loaded, loaded.getMeta())
+        scorers = { 'bm25':BM25Scorer(stats), 'dirichlet':DirichletScorer(stats) }
+        for queryClass in dict.fromkeys(queryClass for queryClass, _ in BENCHMARK_QUERIES): # In order, once each
+            queries = [query for query in BENCHMARK_QUERIES if query[0] == queryClass]
+            runAll = lambda: [benchmarkQuery(query, loaded, scorers) for query in queries]
+            results['queries'][queryClass] = { 'queries':len(queries),
+                'seconds':sum(bestTime(benchmarkQuery, query, loaded, scorers, repeat = repeat) for query in queries),
+                'peakBytes':tracedPeak(runAll) }
+            if profileDirectory is not None:
+                profileRun(profileDirectory, 'query-' + queryClass, runAll)
+        loaded.close()
+    return results
+
+def printBenchmark(results):
+    corpus = results['corpus']
+    print("%d documents (%s), %d terms, %d postings, commit %s" % (corpus['documents'], corpus['mode'], corpus['terms'], corpus['postings'], results['commit']))
+    print("%-14s %10s %14s" % ("phase", "time (s)", "peak (MB)"))
+    for name, result in results['phases'].items():
+        print("%-14s %10.4f %14.1f" % (name, result['seconds'], result['peakBytes'] / 1e6))
+    print("%-14s %8s %10s %14s %14s" % ("query class", "queries", "time (s)", "per query (ms)", "peak (MB)"))
+    for name, result in results['queries'].items():
+        print("%-14s %8d %10.4f %14.3f %14.2f" % (name, result['queries'], result['seconds'], result['seconds'] / result['queries'] * 1000, result['peakBytes'] / 1e6))
+
+def diffBenchmarks(oldFilename, newFilename): # Prints the times of two saved results side by side. ratio > 1 means the new one is slower
+    with open(oldFilename, 'r') as f:
+        old = json.load(f)
+    with open(newFilename, 'r') as f:
+        new = json.load(f)
+    if old['corpus'] != new['corpus']:
+        print("Warning: the results are for different corpora, " + str(old['corpus']) + " and " + str(new['corpus']))
+    print("%-22s %12s %12s %8s" % ("", str(old['commit']), str(new['commit']), "ratio"))
+    for section in ('phases', 'queries'):
+        for name in old[section]:
+            if name in new[section]:
+                before = old[section][name]['seconds']
+                after = new[section][name]['seconds']
+                print("%-22s %12.4f %12.4f %8.2f" % (section[:-1] + ' ' + name, before, after, after / before if before > 0 else math.inf))
+
@@ -0,0 +1,227 @@
+import json
+import gzip
+import multiprocessing
+from collections import deque
+from .postings import CompressedPostingList
+from .compact import CompactIndex, MetaTable
+
+####################################################################################################################################
+
+# Index creation
+# Reads the corpus files and builds the in-memory index (dictionary of term -> PostingList) and the metadata list.
+# The documents can be split into shards of consecutive docIds that are inverted by separate worker processes.
+# Every shard covers a later range of docIds than the one before it, so merging them is appending their posting lists in shard order.
+# Appending (CompressedPostingList.extend) copies the encoded bytes of the later list and shifts its skip pointers, nothing is decoded.
+
+####################################################################################################################################
+
+# Inverts one shard. shard is (texts, firstDoc, postingListClass), where texts[i] is the text of the document with docId firstDoc + i
+# Returns a dictionary of term -> PostingList for the shard
+def invertShard(shard):
+    texts, firstDoc, postingListClass = shard
+    index = dict()
+
+    for d, text in enumerate(texts, firstDoc): # For every document
+        positions = dict() # Word -> positions of the word in this document
+        for p, w in enumerate(text.split()):
+            wordPositions = positions.get(w)
+            if wordPositions is None:
+                positions[w] = [p]
+            else:
+                wordPositions.append(p)
+
+        for w, wordPositions in positions.items(): # Then one Posting per word of the document
+            postingList = index.get(w)
+            if postingList is None: # If the word has not been added to the inverted index, add it with a new PostingList
+                postingList = postingListClass(d, wordPositions[0])
+                for p in wordPositions[1:]:
+                    postingList.add(d, p)
+                index[w] = postingList
+            else: # Otherwise, add the Posting to its PostingList
+                postingList.addPosting(d, wordPositions)
+
+    for postingList in index.values():
+        if isinstance(postingList, CompressedPostingList):
+            postingList.flush() # Encode the last Postings here so the worker does it instead of the merge
+
+    return index
+
+# Merges shard indexes (in docId order) into one. shards can be any iterable, each shard is merged as soon as it is produced
+def mergeShards(shards):
+    index = None
+    for shard in shards:
+        if index is None:
+            index = shard
+            continue
+        for w, postingList in shard.items():
+            if w in index:
+                index[w].extend(postingList)
+            else:
+                index[w] = postingList
+    return index if index is not None else dict()
+
+####################################################################################################################################
+
+# Corpus reading
+# Documents are read one at a time so the whole file never has to be in memory at once.
+# A file can be the json format described in README.txt ({"corpus": [document, document, ...]}), or json lines with one document per line
+# (files ending in .jsonl or .jsonl.gz). Files ending in .gz are decompressed as they are read.
+
+####################################################################################################################################
+
+READ_SIZE = 1 << 16 # Characters read from a file at a time
+
+def openCorpusFile(filename):
+    if filename.endswith('.gz'):
+        return gzip.open(filename, "rt", encoding = 'utf-8')
+    return open(filename, "r", encoding = 'utf-8')
+
+# Yields the documents of the "corpus" list of a json file, parsing one document at a time from a buffer of at most a few READ_SIZEs.
+# The "corpus" key is found by searching for it, so it must be the first place the text "corpus" appears in the file.
+def readCorpusList(f):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+
+    start = -1
+    while start < 0: # Read up to the '[' that opens the corpus list
+        chunk = f.read(READ_SIZE)
+        if chunk == '':
+            raise ValueError("No \"corpus\" list found")
+        buffer += chunk
+        key = buffer.find('"corpus"')
+        if key >= 0:
+            start = buffer.find('[', key)
+    pos = start + 1
+
+    eof = False
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,': # Skip the separators between documents
+            pos += 1
+        if pos >= len(buffer):
+            if eof:
+                raise ValueError("The \"corpus\" list is not closed")
+            chunk = f.read(READ_SIZE)
+            eof = chunk == ''
+            buffer = buffer[pos:] + chunk # Drop everything already parsed
+            pos = 0
+            continue
+        if buffer[pos] == ']': # End of the corpus list
+            return
+
+        try:
+            doc, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof: # The document really is broken
+                raise
+            chunk = f.read(READ_SIZE) # Otherwise the document is only partly in the buffer
+            eof = chunk == ''
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        pos = end
+        yield doc
+
+# Yields every document of every file, in order
+def readDocuments(filenames):
+    for filename in filenames:
+        with openCorpusFile(filename) as f:
+            if filename.endswith('.jsonl') or filename.endswith('.jsonl.gz'):
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            else:
+                yield from readCorpusList(f)
+
+####################################################################################################################################
+
+# Building
+
+####################################################################################################################################
+
+SHARD_SIZE = 32 # Documents per shard of readShards
+BATCH_CHARS = 1 << 25 # Characters of text read before readBatches splits them among the workers
+
+# Yields the texts of the documents as they are read, appending their metadata to meta.
+# documents defaults to reading the documents from filenames
+def readTexts(filenames, meta, documents = None):
+    for doc in (readDocuments(filenames) if documents is None else documents):
+        # Append a new object containing the three features other than 'text' as metadata, and the number of words of the text
+        meta.append({ 'playId':doc['playId'], 'sceneId':doc['sceneId'], 'sceneNum':doc['sceneNum'], 'length':len(doc['text'].split()) })
+        yield doc['text']
+
+# Yields the shards of the texts for invertShard, as (texts, firstDoc, postingListClass), shardSize documents each
+def readShards(texts, postingListClass, shardSize = SHARD_SIZE):
+    shard = []
+    firstDoc = 0
+    for text in texts:
+        shard.append(text)
+        if len(shard) == shardSize:
+            yield (shard, firstDoc, postingListClass)
+            firstDoc += len(shard)
+            shard = []
+    if len(shard) > 0:
+        yield (shard, firstDoc, postingListClass)
+
+# Yields the shards of the texts for invertShard like readShards, but reads up to batchChars characters of text at a time and splits
+# them into one shard per worker, with about as many characters each. Big shards mean few posting lists for the parent to unpickle
+# and extend: a corpus smaller than batchChars is one contiguous docId range per worker
+def readBatches(texts, postingListClass, workers, batchChars = BATCH_CHARS):
+    batch = []
+    chars = 0
+    firstDoc = 0
+    for text in texts:
+        batch.append(text)
+        chars += len(text)
+        if chars >= batchChars:
+            yield from splitBatch(batch, chars, firstDoc, postingListClass, workers)
+            firstDoc += len(batch)
+            batch = []
+            chars = 0
+    if len(batch) > 0:
+        yield from splitBatch(batch, chars, firstDoc, postingListClass, workers)
+
+def splitBatch(batch, chars, firstDoc, postingListClass, workers): # Yields batch as workers shards of consecutive texts
+    start = 0
+    end = 0
+    total = 0
+    for k in range(1, workers + 1):
+        while end < len(batch) and (k == workers or total + len(batch[end]) / 2 <= chars * k / workers):
+            total += len(batch[end])
+            end += 1
+        if end > start:
+            yield (batch[start:end], firstDoc + start, postingListClass)
+            start = end
+
+# Sends the shards to the pool and yields their indexes in order. At most 2 shards per worker are read ahead,
+# so only those are in memory besides the index (Pool.imap would read every shard of the corpus up front)
+def invertShards(pool, shards, workers):
+    pending = deque()
+    for shard in shards:
+        pending.append(pool.apply_async(invertShard, (shard,)))
+        if len(pending) >= 2 * workers:
+            yield pending.popleft().get()
+    while len(pending) > 0:
+        yield pending.popleft().get()
+
+# filenames is one corpus file name or a list of them. docIds continue from one file to the next
+# postingListClass is the class used for the posting lists (PostingList or CompressedPostingList)
+# workers is the number of worker processes. 1 builds the index in this process
+# compact returns a CompactIndex and a MetaTable instead of the dictionary and the metadata list
+def buildIndex(filenames, postingListClass = CompressedPostingList, workers = 1, compact = False):
+    if isinstance(filenames, str):
+        filenames = [filenames]
+    meta = MetaTable() if compact else [] # List for metadata entries
+    texts = readTexts(filenames, meta)
+
+    # Workers are forked where that is possible, it is quicker than starting new interpreters that import the package
+    if workers > 1:
+        context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+        with context.Pool(workers) as pool:
+            index = mergeShards(invertShards(pool, readBatches(texts, postingListClass, workers), workers))
+    else:
+        index = invertShard((texts, 0, postingListClass)) # Every text is inverted as it is read and then dropped
+
+    if compact:
+        index = CompactIndex(index)
+    return index, meta # Return the inverted index and the metadata list
@@ -0,0 +1,97 @@
+import sys
+import threading
+from collections import OrderedDict
+from .query import getAllDocIds, daatRetrieval, findPhrase
+
+####################################################################################################################################
+
+# Query cache
+# QueryCache answers the same queries as getAllDocIds, daatRetrieval and findPhrase, keeping results it has already computed.
+# Queries are keyed on a normalized form, so queries that must have the same result share one entry:
+    # ('or', sorted distinct terms), ('daat', terms in order), ('phrase', terms in order, docId), ('phrase', terms in order)
+# daatRetrieval entries keep the terms in the caller's order: its early stop (see daatRetrieval) makes its result depend on the order,
+# and a cached result must be the one the uncached call would return.
+# Phrase queries look for the phrase in the documents of the daatRetrieval entry of their terms, so they reuse conjunctive query
+# results and the other way around.
+# The least recently used entries are dropped when there are more than maxEntries, or when the results take more than maxBytes
+# (an estimate from sys.getsizeof). Every entry is dropped when the index's generation changes: a SegmentedIndex's changes when its
+# refresh() (called by Index.refresh()) opens segments added since it was opened.
+# lookup(key, compute) caches any other result, like the DocSets of terms Index keeps in one (see docsets.py).
+# Results are frozensets, so a caller can't change a cached result by changing what it was given.
+# One QueryCache can be used by many threads. The entries are only changed with lock held, but results are computed without it, so two
+# threads missing on the same key at once both compute it.
+
+####################################################################################################################################
+
+def indexGeneration(index): # Generation of an index. Dictionaries and DiskIndexes never change, so they are always 0
+    return getattr(index, 'generation', 0)
+
+def resultSize(value): # Estimated bytes taken by a cached result
+    if hasattr(value, 'getSizeInBytes'): # A DocSet
+        return value.getSizeInBytes()
+    size = sys.getsizeof(value)
+    if isinstance(value, (set, frozenset, list, tuple)):
+        size += sum(sys.getsizeof(v) for v in value)
+    return size
+
+class QueryCache:
+    def __init__(self, index, maxEntries = 1024, maxBytes = 16 * 1024 * 1024):
+        self.index = index
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.entries = OrderedDict() # Key -> (result, size), least recently used first
+        self.bytes = 0
+        self.generation = indexGeneration(index)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def invalidate(self): # Drops every entry
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def lookup(self, key, compute): # Returns the cached result for key, or computes, caches and returns it
+        generation = indexGeneration(self.index)
+        if generation != self.generation:
+            self.invalidate()
+            self.generation = generation
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return entry[0]
+            self.misses += 1
+
+        result = compute()
+        size = resultSize(result)
+        with self.lock:
+            if key not in self.entries: # Another thread may have computed it meanwhile
+                self.entries[key] = (result, size)
+                self.bytes += size
+            while len(self.entries) > self.maxEntries or (self.bytes > self.maxBytes and len(self.entries) > 1):
+                _, (_, evictedSize) = self.entries.popitem(last = False)
+                self.bytes -= evictedSize
+                self.evictions += 1
+        return result
+
+    def getAllDocIds(self, terms):
+        key = ('or', tuple(sorted(set(terms))))
+        return self.lookup(key, lambda: frozenset(getAllDocIds(key[1], self.index)))
+
+    def daatRetrieval(self, Q):
+        key = ('daat', tuple(Q))
+        return self.lookup(key, lambda: frozenset(daatRetrieval(list(Q), self.index)))
+
+    def findPhrase(self, query, docId):
+        return self.lookup(('phrase', tuple(query), docId), lambda: findPhrase(query, self.index, docId))
+
+    def phraseDocs(self, query): # Documents where the phrase appears, looked for in the cached daatRetrieval result of its terms
+        return self.lookup(('phrase', tuple(query)), lambda: frozenset(d for d in self.daatRetrieval(query) if self.findPhrase(query, d)))
+
+    def getStats(self): # Counters for monitoring
+        with self.lock:
+            return { 'hits':self.hits, 'misses':self.misses, 'evictions':self.evictions, 'entries':len(self.entries), 'bytes':self.bytes }
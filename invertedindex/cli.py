@@ -0,0 +1,235 @@
+import argparse
+import json
+import os
+
+####################################################################################################################################
+
+# Command line
+# python Indexer.py [--corpus file] [--index directory] [command] (or python -m invertedindex ...)
+# With no command it does what the script always did: loads the index (building it if the corpus changed), writes the reports and
+# shows the plot. Every command imports only the modules it uses, so starting one that doesn't need matplotlib or NumPy doesn't
+# import them.
+
+####################################################################################################################################
+
+CORPUS = "shakespeare-scenes.json.gz" # File name
+INDEX_PATH = "shakespeare-scenes.idx" # Directory for the on-disk index
+
+def openDefaultIndex(args): # Loads the index directory if it is up to date with the corpus. Otherwise builds it and writes it for the next run
+    from .index import Index
+    return Index.open(args.index, args.corpus)
+
+def runAll(args):
+    from .reports import writeReports, plotCounts
+    index = openDefaultIndex(args)
+    writeReports(index.index, index.getMeta())
+    plotCounts(index.index, index.getMeta())
+
+def runReport(args):
+    from .reports import writeReports
+    index = openDefaultIndex(args)
+    writeReports(index.index, index.getMeta())
+
+def runPlot(args):
+    from .reports import plotCounts
+    index = openDefaultIndex(args)
+    plotCounts(index.index, index.getMeta())
+
+def runBuild(args): # Builds the index from the corpus files given (or the default one) and writes it
+    from .index import Index
+    Index.build(args.files or args.corpus, args.index, os.cpu_count() or 1)
+
+def runBuildExternal(args): # Builds the index of the corpus files given (or the default one) with bounded memory
+    from .external import buildIndexExternal
+    runs = buildIndexExternal(args.files or args.corpus, args.index, args.memory << 20, args.workers, args.temp)
+    print("Merged " + str(runs) + " runs")
+
+def runAdd(args): # Adds the documents of the corpus files given to the index
+    from .build import readDocuments
+    from .storage import IndexWriter
+    writer = IndexWriter(args.index)
+    docIds = writer.addDocuments(readDocuments(args.files))
+    writer.close()
+    print("Added docIds " + str(docIds.start) + " to " + str(docIds.stop - 1))
+
+def runQuery(args): # Prints the results of one query with the sceneIds of their documents
+    index = openDefaultIndex(args)
+    meta = index.getMeta()
+    trace = None
+    if args.trace:
+        from .tracing import QueryTrace
+        trace = QueryTrace()
+    results = index.query(args.terms, args.type, operator = args.operator, n = args.n, k = args.k, scorer = args.scorer, playId = args.play,
+        exclude = args.exclude, trace = trace)
+    if args.type == 'ranked':
+        for score, d in results:
+            print("%10.4f %s" % (score, meta[d]['sceneId']))
+    elif args.type == 'phrase':
+        for d in sorted(results):
+            print(meta[d]['sceneId'] + " " + str(results[d]))
+    else:
+        for d in results:
+            print(meta[d]['sceneId'])
+    if trace is not None:
+        print(json.dumps(trace.toDict(), indent = 2))
+
+def runCheckPhrases(args):
+    from .compare import checkPhrases
+    index = openDefaultIndex(args)
+    return 0 if checkPhrases(index.index, index.getMeta()) else 1
+
+def runCheckThreads(args):
+    from .compare import checkThreads
+    index = openDefaultIndex(args)
+    return 0 if checkThreads(index.index, index.getMeta(), args.threads) else 1
+
+def runServe(args):
+    from .server import QueryServer
+    QueryServer(openDefaultIndex(args), args.workers, args.trace).run(args.address)
+
+def runLoadTest(args): # Needs a server started with serve, not the index
+    from .server import loadTest
+    loadTest(args.address, args.requests, args.levels or [1, 4, 16, 64])
+
+def runCompareLayouts(args):
+    from .compare import compareLayouts
+    compareLayouts(args.corpus)
+
+def runCompareMemory(args):
+    from .compare import compareMemory
+    compareMemory(args.corpus)
+
+def runCompareBuild(args):
+    from .compare import compareBuilds
+    workerCounts = args.workers
+    if len(workerCounts) == 0:
+        workerCounts = [1]
+        while workerCounts[-1] * 2 <= (os.cpu_count() or 1):
+            workerCounts.append(workerCounts[-1] * 2)
+    compareBuilds(args.corpus, workerCounts)
+
+def runCompareBatch(args):
+    from .compare import compareBatch
+    compareBatch(openDefaultIndex(args).index)
+
+def runCompareBackends(args):
+    from .compare import compareBackends
+    index = openDefaultIndex(args)
+    compareBackends(index.index, index.getMeta(), args.times)
+
+def runCompareDocSets(args):
+    from .compare import compareDocSets
+    index = openDefaultIndex(args)
+    compareDocSets(index.index, index.getMeta(), args.times)
+
+def runCompareRanking(args):
+    from .compare import compareRanking
+    index = openDefaultIndex(args)
+    compareRanking(index.index, index.getMeta())
+
+def runCompareExternal(args):
+    from .compare import compareExternal
+    compareExternal(args.corpus, args.times, args.memory)
+
+def runCompareTraces(args):
+    from .compare import compareTraces
+    index = openDefaultIndex(args)
+    compareTraces(index.index, index.getMeta())
+
+def runCompareFilters(args):
+    from .compare import compareFilters
+    index = openDefaultIndex(args)
+    compareFilters(index.index, index.getMeta())
+
+def runPlays(args): # Prints the playIds of the documents with any of the terms
+    index = openDefaultIndex(args)
+    for playId in index.getPlays(args.terms):
+        print(playId)
+
+def runBenchmark(args):
+    from .benchmark import runBenchmark, printBenchmark
+    results = runBenchmark(args.corpus, args.documents, args.mode, args.profile)
+    printBenchmark(results)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent = 2)
+
+def runBenchmarkDiff(args):
+    from .benchmark import diffBenchmarks
+    diffBenchmarks(args.old, args.new)
+
+def makeParser():
+    parser = argparse.ArgumentParser(prog = 'Indexer.py', description = "Builds an inverted index of the Shakespeare scenes and queries it.")
+    parser.add_argument('--corpus', default = CORPUS, help = "corpus file (default " + CORPUS + ")")
+    parser.add_argument('--index', default = INDEX_PATH, help = "index directory (default " + INDEX_PATH + ")")
+    parser.set_defaults(run = runAll)
+    commands = parser.add_subparsers(title = 'commands', metavar = 'command')
+
+    def command(name, run, description):
+        subparser = commands.add_parser(name, help = description, description = description)
+        subparser.set_defaults(run = run)
+        return subparser
+
+    command('report', runReport, "write terms0.txt .. terms3.txt and phrase0.txt .. phrase2.txt")
+    command('plot', runPlot, "plot the counts of thee, thou and you (imports matplotlib)")
+    command('build', runBuild, "build the index of the corpus files and write it").add_argument('files', nargs = '*')
+    buildExternal = command('build-external', runBuildExternal, "build the index of the corpus files on disk, with bounded memory")
+    buildExternal.add_argument('files', nargs = '*')
+    buildExternal.add_argument('--memory', type = int, default = 64, help = "MB of posting lists kept in memory (default 64)")
+    buildExternal.add_argument('--workers', type = int, default = 1)
+    buildExternal.add_argument('--temp', help = "directory for the temporary run files (default: the system's)")
+    command('add', runAdd, "add the documents of the corpus files to the index as a new segment").add_argument('files', nargs = '+')
+
+    query = command('query', runQuery, "answer one query and print the sceneIds found")
+    query.add_argument('type', choices = ('or', 'and', 'phrase', 'ranked'))
+    query.add_argument('terms', nargs = '+')
+    query.add_argument('--operator', default = '#od', choices = ('#od', '#uw'), help = "phrase operator")
+    query.add_argument('-n', type = int, default = 1, help = "phrase window size (1 with #od is the exact phrase)")
+    query.add_argument('-k', type = int, default = 10, help = "number of ranked results")
+    query.add_argument('--scorer', default = 'bm25', choices = ('bm25', 'dirichlet'))
+    query.add_argument('--play', help = "only documents of this playId")
+    query.add_argument('--not', dest = 'exclude', nargs = '+', default = [], metavar = 'term', help = "only documents without these terms")
+    query.add_argument('--trace', action = 'store_true', help = "print what the query's cursors did and the time of each operator")
+    command('plays', runPlays, "print the playIds of the documents with any of the terms").add_argument('terms', nargs = '+')
+
+    command('check-phrases', runCheckPhrases, "check the phrase queries still find the scenes the phrase*.txt reports list")
+    command('check-threads', runCheckThreads, "check queries from many threads at once get the same results").add_argument(
+        'threads', nargs = '?', type = int, default = 8)
+
+    serve = command('serve', runServe, "answer queries over HTTP/JSON")
+    serve.add_argument('address', nargs = '?', default = '127.0.0.1:8080', help = "host:port, or a path for a Unix socket")
+    serve.add_argument('workers', nargs = '?', type = int, default = os.cpu_count() or 1)
+    serve.add_argument('--trace', action = 'store_true', help = "trace every query and add the totals to /stats")
+    loadTest = command('load-test', runLoadTest, "measure the latency and queries per second of a running server")
+    loadTest.add_argument('address', nargs = '?', default = '127.0.0.1:8080')
+    loadTest.add_argument('requests', nargs = '?', type = int, default = 1000, help = "requests per concurrency level")
+    loadTest.add_argument('levels', nargs = '*', type = int, help = "concurrency levels (default 1 4 16 64)")
+
+    command('compare-layouts', runCompareLayouts, "compare the memory and speed of PostingList and CompressedPostingList")
+    command('compare-memory', runCompareMemory, "compare the memory per posting and resident memory of each layout")
+    command('compare-build', runCompareBuild, "time the build with different numbers of workers").add_argument('workers', nargs = '*', type = int)
+    command('compare-batch', runCompareBatch, "compare batchRetrieval with running the report queries one at a time")
+    command('compare-backends', runCompareBackends, "compare the object and numpy backends").add_argument(
+        'times', nargs = '?', type = int, default = 100, help = "times the corpus is repeated")
+    command('compare-docsets', runCompareDocSets, "compare DocSets with Python sets for boolean queries").add_argument(
+        'times', nargs = '?', type = int, default = 100, help = "times the corpus is repeated")
+    command('compare-ranking', runCompareRanking, "compare rankedRetrieval with exhaustiveRetrieval")
+    compareExternal = command('compare-external', runCompareExternal, "compare build-external with building in memory on a bigger corpus")
+    compareExternal.add_argument('times', nargs = '?', type = int, default = 20, help = "times the corpus is repeated")
+    compareExternal.add_argument('memory', nargs = '?', type = int, default = 4, help = "MB of posting lists per run")
+    command('compare-traces', runCompareTraces, "trace the report phrase queries run like the reports and with proximityRetrieval")
+    command('compare-filters', runCompareFilters, "compare playId filters pushed down into the index with filtering the results")
+
+    benchmark = command('benchmark', runBenchmark, "time each build phase and query class and save the results as json")
+    benchmark.add_argument('documents', nargs = '?', type = int, help = "documents in the synthetic corpus (default: the corpus once)")
+    benchmark.add_argument('mode', nargs = '?', default = 'replicate', choices = ('replicate', 'shuffle'))
+    benchmark.add_argument('output', nargs = '?', default = 'benchmark.json')
+    benchmark.add_argument('profile', nargs = '?', help = "directory for cProfile dumps")
+    benchmarkDiff = command('benchmark-diff', runBenchmarkDiff, "compare two saved benchmark results")
+    benchmarkDiff.add_argument('old')
+    benchmarkDiff.add_argument('new')
+    return parser
+
+def main(argv = None): # Returns the exit status
+    args = makeParser().parse_args(argv)
+    status = args.run(args)
+    return status if status is not None else 0
@@ -0,0 +1,217 @@
+try:
+    import numpy as np
+except ImportError: # NumPy is only needed for the columnar backend
+    np = None
+from .postings import Posting
+from .query import getAllDocIds, conjunctiveDocs, getTermStats
+from .cache import indexGeneration
+
+####################################################################################################################################
+
+# Columnar backend
+# ColumnarPostingList keeps a term's postings in three NumPy arrays:
+    # docIds: the docId of every posting
+    # offsets: posting i's positions are positions[offsets[i]:offsets[i + 1]], so offsets has one more entry than docIds
+    # positions: the positions of every posting, one after the other
+# It has cursors like PostingList, so every function above works on it, but the backends below also give set operations
+# and term frequency comparisons over whole arrays (searchsorted, intersect1d, union1d, setdiff1d) instead of one posting at a time.
+# ColumnarIndex converts the posting lists of another index when they are first looked up.
+# NumPy is only needed for this backend.
+
+####################################################################################################################################
+
+def requireNumpy():
+    if np is None:
+        raise ImportError("The numpy backend needs NumPy (pip install numpy)")
+
+class ColumnarPostingList:
+    __slots__ = ('docIds', 'offsets', 'positions')
+
+    def __init__(self, docIds, offsets, positions):
+        self.docIds = docIds
+        self.offsets = offsets
+        self.positions = positions
+
+    def getPostings(self): # Builds Posting objects. Only for code that needs them
+        postings = []
+        for i in range(len(self.docIds)):
+            posting = Posting(int(self.docIds[i]), 0)
+            posting.positions = self.positions[self.offsets[i]:self.offsets[i + 1]].tolist()
+            postings.append(posting)
+        return postings
+
+    def getTfs(self):
+        return np.diff(self.offsets).tolist()
+
+    def getTf(self, d): # Number of times the term appears in document d (0 if it doesn't)
+        i = int(np.searchsorted(self.docIds, d, 'left'))
+        return int(self.offsets[i + 1] - self.offsets[i]) if i < len(self.docIds) and self.docIds[i] == d else 0
+
+    def getTfArray(self): # Number of times the term appears in each of its documents, as an array
+        return np.diff(self.offsets)
+
+    def getDocCount(self):
+        return len(self.docIds)
+
+    def cursor(self):
+        return ColumnarPostingCursor(self.docIds, self.offsets, self.positions)
+
+class ColumnarPostingCursor:
+    __slots__ = ('docIds', 'offsets', 'positions', 'current')
+
+    def __init__(self, docIds, offsets, positions):
+        self.docIds = docIds
+        self.offsets = offsets
+        self.positions = positions
+        self.current = 0
+
+    def getCurrentDoc(self):
+        return int(self.docIds[self.current])
+
+    def getCurrentPositions(self):
+        return self.positions[self.offsets[self.current]:self.offsets[self.current + 1]].tolist()
+
+    def getCurrentTf(self):
+        return int(self.offsets[self.current + 1] - self.offsets[self.current])
+
+    def getDocCount(self):
+        return len(self.docIds)
+
+    def hasMore(self):
+        return self.current < len(self.docIds) - 1
+
+    def isDone(self):
+        return self.current >= len(self.docIds)
+
+    def skipTo(self, d): # Moves current forward to the first Posting with document ID >= d (or the last one if there is none)
+        if self.isDone() or self.docIds[self.current] >= d:
+            return
+        self.current = min(int(np.searchsorted(self.docIds, d, 'left')), len(self.docIds) - 1)
+
+    def movePast(self):
+        self.current += 1
+
+    def reset(self):
+        self.current = 0
+
+# Converts any posting list to a ColumnarPostingList. With times > 1 the postings are repeated that many times,
+# the k-th copy with docIds shifted by k * docCount, as if the corpus had been repeated
+def toColumnar(postingList, docCount = 0, times = 1):
+    requireNumpy()
+    docIds = []
+    positions = []
+    cursor = postingList.cursor()
+    while not cursor.isDone():
+        docIds.append(cursor.getCurrentDoc())
+        positions.extend(cursor.getCurrentPositions())
+        cursor.movePast()
+    tfs = np.array(postingList.getTfs(), dtype = np.int64)
+
+    docIds = np.array(docIds, dtype = np.int64)
+    positions = np.array(positions, dtype = np.int32)
+    if times > 1:
+        docIds = (docIds[None, :] + (np.arange(times, dtype = np.int64) * docCount)[:, None]).ravel()
+        positions = np.tile(positions, times)
+        tfs = np.tile(tfs, times)
+    offsets = np.zeros(len(tfs) + 1, dtype = np.int64)
+    np.cumsum(tfs, out = offsets[1:])
+    return ColumnarPostingList(docIds, offsets, positions)
+
+class ColumnarIndex:
+    def __init__(self, index, docCount = 0, times = 1): # docCount and times replicate the corpus, see toColumnar
+        requireNumpy()
+        self.index = index
+        self.docCount = docCount
+        self.times = times
+        self.generation = indexGeneration(index)
+        self.converted = dict() # Term -> ColumnarPostingList
+
+    def __getitem__(self, term):
+        postingList = self.converted.get(term)
+        if postingList is None:
+            postingList = toColumnar(self.index[term], self.docCount, self.times)
+            self.converted[term] = postingList
+        return postingList
+
+    def __contains__(self, term):
+        return term in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def keys(self):
+        return self.index.keys()
+
+    def getTermStats(self, term): # Those of the converted index, with df and cf multiplied by times
+        df, cf, maxTf = getTermStats(self.index, term)
+        return (df * self.times, cf * self.times, maxTf)
+
+# Backends answer the same set queries. ObjectBackend moves posting list cursors one posting at a time and returns sets.
+# NumpyBackend works on the arrays of a ColumnarIndex and returns sorted arrays of docIds.
+    # union(terms): documents with any of the terms
+    # intersection(terms): documents with all of the terms
+    # difference(terms, excluded): documents with all of terms and none of excluded
+    # more(term1, term2): documents with both terms where term1 appears more times than term2 (like terms_0)
+class ObjectBackend:
+    def __init__(self, index):
+        self.index = index
+
+    def union(self, terms):
+        return getAllDocIds([t for t in terms if t in self.index], self.index)
+
+    def intersection(self, terms):
+        if any(t not in self.index for t in terms):
+            return set()
+        return set(conjunctiveDocs([self.index[t].cursor() for t in set(terms)]))
+
+    def difference(self, terms, excluded):
+        return self.intersection(terms) - self.union(excluded)
+
+    def more(self, term1, term2):
+        if term1 not in self.index or term2 not in self.index:
+            return set()
+        cursor1 = self.index[term1].cursor()
+        cursor2 = self.index[term2].cursor()
+        return set(d for d in conjunctiveDocs([cursor1, cursor2]) if cursor1.getCurrentTf() > cursor2.getCurrentTf())
+
+class NumpyBackend:
+    def __init__(self, index): # index is a ColumnarIndex
+        requireNumpy()
+        self.index = index
+
+    def empty(self):
+        return np.zeros(0, dtype = np.int64)
+
+    def union(self, terms):
+        arrays = [self.index[t].docIds for t in terms if t in self.index]
+        return np.unique(np.concatenate(arrays)) if len(arrays) > 0 else self.empty()
+
+    def intersection(self, terms):
+        if len(terms) == 0 or any(t not in self.index for t in terms):
+            return self.empty()
+        arrays = sorted((self.index[t].docIds for t in set(terms)), key = len) # Smallest first keeps the intermediate results small
+        result = arrays[0]
+        for docIds in arrays[1:]:
+            result = np.intersect1d(result, docIds, assume_unique = True)
+        return result
+
+    def difference(self, terms, excluded):
+        return np.setdiff1d(self.intersection(terms), self.union(excluded), assume_unique = True)
+
+    def more(self, term1, term2):
+        if term1 not in self.index or term2 not in self.index:
+            return self.empty()
+        postingList1 = self.index[term1]
+        postingList2 = self.index[term2]
+        docIds, i1, i2 = np.intersect1d(postingList1.docIds, postingList2.docIds, assume_unique = True, return_indices = True)
+        return docIds[postingList1.getTfArray()[i1] > postingList2.getTfArray()[i2]]
+
+BACKENDS = { 'object':ObjectBackend, 'numpy':NumpyBackend }
+
+# Returns the backend called name for index. The numpy backend wraps index in a ColumnarIndex unless it already is one
+def makeBackend(name, index):
+    if name not in BACKENDS:
+        raise ValueError("Unknown backend " + str(name) + ", use one of " + ', '.join(BACKENDS))
+    if name == 'numpy' and not isinstance(index, ColumnarIndex):
+        index = ColumnarIndex(index)
+    return BACKENDS[name](index)
@@ -0,0 +1,125 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from .postings import CompressedPostingList
+
+####################################################################################################################################
+
+# Compact layout
+# CompactIndex can be used in place of the index dictionary. The terms are kept once, in sorted order, and numbered by their place in it
+# (their termId), and the posting lists are kept in a list by termId. A term is looked up with a binary search of the sorted terms
+# instead of a hash table. The df, cf and maxTf of every term (see getTermStats) are counted once when it is made and kept by termId.
+# The terms are not passed through sys.intern: each one is already a single string, and the interpreter's
+# table of interned strings would take about 2MB more for this corpus.
+# MetaTable can be used in place of the metadata list. It keeps the metadata column-wise: one array per field instead of one dictionary
+# per document, and each playId once, with a number for it in every document. meta[d] builds the dictionary of document d.
+# It also keeps where each run of consecutive documents of the same play starts, so the documents of a play are a few docId ranges
+# (one per play for this corpus, where the scenes of a play come one after the other). Queries can be restricted to those ranges
+# by skipping over everything else (see Document ranges in query.py) instead of looking up the playId of every document found.
+
+####################################################################################################################################
+
+class CompactIndex:
+    def __init__(self, index): # index is the dictionary of term -> PostingList. Compressed posting lists are frozen
+        self.terms = sorted(index.keys()) # termId -> term
+        self.postingLists = [index[t] for t in self.terms] # termId -> PostingList
+        self.dfs = array('i') # termId -> df
+        self.cfs = array('q') # termId -> cf
+        self.maxTfs = array('i') # termId -> maxTf
+        for postingList in self.postingLists:
+            if isinstance(postingList, CompressedPostingList):
+                postingList.freeze()
+            tfs = postingList.getTfs()
+            self.dfs.append(len(tfs))
+            self.cfs.append(sum(tfs))
+            self.maxTfs.append(max(tfs))
+
+    def getTermId(self, term): # termId of term, or None if it is in no document
+        i = bisect_left(self.terms, term)
+        return i if i < len(self.terms) and self.terms[i] == term else None
+
+    def getTerm(self, termId):
+        return self.terms[termId]
+
+    def getTermStats(self, term): # (df, cf, maxTf) of term, (0, 0, 0) if it is in no document
+        termId = self.getTermId(term)
+        if termId is None:
+            return (0, 0, 0)
+        return (self.dfs[termId], self.cfs[termId], self.maxTfs[termId])
+
+    def __getitem__(self, term): # Works like index[term] on the dictionary. Raises KeyError for unknown terms
+        termId = self.getTermId(term)
+        if termId is None:
+            raise KeyError(term)
+        return self.postingLists[termId]
+
+    def __contains__(self, term):
+        return self.getTermId(term) is not None
+
+    def __len__(self):
+        return len(self.terms)
+
+    def keys(self):
+        return self.terms
+
+class MetaTable:
+    def __init__(self, entries = ()):
+        self.plays = [] # Every distinct playId
+        self.playNumbers = dict() # playId -> its index in plays
+        self.playColumn = array('i') # Number of the playId of every document
+        self.sceneIds = []
+        self.sceneNums = array('i')
+        self.lengths = array('i')
+        self.runStarts = array('i') # First docId of every run of documents of the same play
+        self.runPlays = array('i') # Number of the playId of every run
+        self.extend(entries)
+
+    def append(self, entry): # Adds a document from its dictionary ('playId', 'sceneId', 'sceneNum' and 'length')
+        number = self.playNumbers.get(entry['playId'])
+        if number is None:
+            number = len(self.plays)
+            self.plays.append(entry['playId'])
+            self.playNumbers[entry['playId']] = number
+        if len(self.runPlays) == 0 or self.runPlays[-1] != number:
+            self.runStarts.append(len(self.sceneIds))
+            self.runPlays.append(number)
+        self.playColumn.append(number)
+        self.sceneIds.append(entry['sceneId'])
+        self.sceneNums.append(entry['sceneNum'])
+        self.lengths.append(entry['length'])
+
+    def extend(self, entries):
+        for entry in entries:
+            self.append(entry)
+
+    def getPlayId(self, d):
+        return self.plays[self.playColumn[d]]
+
+    def getPlays(self): # Every distinct playId, in the order they first appear
+        return self.plays
+
+    def getPlayRanges(self, playId): # The docIds of the documents of playId, as a list of ranges. Empty for an unknown playId
+        number = self.playNumbers.get(playId)
+        return [self.getRun(i) for i in range(len(self.runPlays)) if self.runPlays[i] == number]
+
+    def getRun(self, i): # Range of the docIds of run i
+        stop = self.runStarts[i + 1] if i + 1 < len(self.runStarts) else len(self.sceneIds)
+        return range(self.runStarts[i], stop)
+
+    def getPlayRun(self, d): # Range of the docIds of the run document d is in: d and the documents of the same play next to it
+        return self.getRun(bisect_right(self.runStarts, d) - 1)
+
+    def getLengths(self): # Number of words of every document, as an array
+        return self.lengths
+
+    def __getitem__(self, d): # Dictionary of document d, like the metadata list has
+        return { 'playId':self.plays[self.playColumn[d]], 'sceneId':self.sceneIds[d], 'sceneNum':self.sceneNums[d], 'length':self.lengths[d] }
+
+    def __len__(self):
+        return len(self.sceneIds)
+
+    def __iter__(self):
+        for d in range(len(self.sceneIds)):
+            yield self[d]
+
+    def __eq__(self, other): # Equal to a MetaTable or metadata list with the same entries
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
@@ -0,0 +1,572 @@
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+from .postings import PostingList, writeVarint, readVarint, CompressedPostingList
+from .build import buildIndex, readDocuments
+from .storage import writeIndex, DiskIndex
+from .query import terms_0, getAllDocIds, daatRetrieval, proximityRetrieval, findPhrase, conjunctiveDocs, getTermStats
+from .ranking import CollectionStats, BM25Scorer, DirichletScorer, exhaustiveRetrieval, rankedRetrieval
+from .batch import batchRetrieval
+from .columnar import requireNumpy, ColumnarIndex, makeBackend
+from .index import Index
+from .external import buildIndexExternal
+from .cache import resultSize
+from .docsets import termDocSet, booleanRetrieval
+from .reports import phraseScenes
+from .tracing import COUNTERS, QueryTrace, traceCall
+
+####################################################################################################################################
+
+# Layout comparison
+# Builds the index with PostingList (a Posting object with a list of positions per document) and with CompressedPostingList,
+# then prints the memory used by each index and the time taken to build it, decode it and run the report queries on it.
+# Run with: python Indexer.py compare-layouts
+
+####################################################################################################################################
+
+def reportQueries(index): # Runs the queries of the terms*.txt and phrase*.txt reports without writing anything
+    terms_0(index['thee'], index['you'])
+    terms_0(index['thou'], index['you'])
+    for terms in (['verona', 'rome', 'italy'], ['falstaff'], ['soldier']):
+        getAllDocIds(terms, index)
+    for phrase in (['lady', 'macbeth'], ['a', 'rose', 'by', 'any', 'other', 'name'], ['cry', 'havoc']):
+        for d in daatRetrieval(phrase, index):
+            findPhrase(phrase, index, d)
+
+def decodeAll(index): # Walks every posting list and decodes every position. Returns the number of positions
+    positionCount = 0
+    for t in index.keys():
+        cursor = index[t].cursor()
+        positionCount += len(cursor.getCurrentPositions())
+        while cursor.hasMore():
+            cursor.movePast()
+            positionCount += len(cursor.getCurrentPositions())
+    return positionCount
+
+def bestTime(function, *args, repeat = 3): # Lowest wall time in seconds over repeat calls
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def compareLayouts(jsonfilename):
+    print("%-22s %12s %10s %10s %10s %10s" % ("layout", "memory (MB)", "B/position", "build (s)", "decode (s)", "queries (s)"))
+
+    for postingListClass in (PostingList, CompressedPostingList):
+        tracemalloc.start() # Memory still allocated once the build returns is the index and meta (the parsed json is freed by then)
+        index, meta = buildIndex(jsonfilename, postingListClass)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        build = bestTime(buildIndex, jsonfilename, postingListClass, repeat = 1)
+        positionCount = decodeAll(index)
+        decode = bestTime(decodeAll, index)
+        queries = bestTime(reportQueries, index)
+
+        print("%-22s %12.1f %10.1f %10.2f %10.2f %10.2f" % (postingListClass.__name__, memory / 1e6, memory / positionCount, build, decode, queries))
+
+####################################################################################################################################
+
+# Memory comparison
+# Builds the index in each layout and prints the memory it takes per posting (traced by tracemalloc) and the resident set size of the
+# process before and after building it. Every build runs in a new process (forked where that is possible), so none of them sees
+# memory left by another.
+# Run with: python Indexer.py compare-memory
+
+####################################################################################################################################
+
+MEMORY_LAYOUTS = [('PostingList', PostingList, False), ('CompressedPostingList', CompressedPostingList, False),
+    ('compact', CompressedPostingList, True)]
+
+def currentRss(): # Resident set size of this process in bytes, or None where there is no /proc (it is only read on Linux)
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+def formatRss(rss):
+    return "%9.1f MB" % (rss / 1e6) if rss is not None else "n/a"
+
+def measureLayout(layout): # Runs in a new process. layout is (jsonfilename, postingListClass, compact, traced)
+    jsonfilename, postingListClass, compact, traced = layout
+    if traced: # tracemalloc takes memory of its own, so the traced build is a separate one from the build the RSS is read around
+        tracemalloc.start()
+        index, meta = buildIndex(jsonfilename, postingListClass, compact = compact)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return memory, sum(index[t].getDocCount() for t in index.keys())
+    before = currentRss()
+    index, meta = buildIndex(jsonfilename, postingListClass, compact = compact)
+    return before, currentRss()
+
+def compareMemory(jsonfilename):
+    print("%-22s %12s %10s %12s %12s" % ("layout", "memory (MB)", "B/posting", "RSS before", "RSS after"))
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+    for name, postingListClass, compact in MEMORY_LAYOUTS:
+        with context.Pool(1, maxtasksperchild = 1) as pool: # maxtasksperchild = 1 runs each build in a process of its own
+            memory, postingCount = pool.apply(measureLayout, ((jsonfilename, postingListClass, compact, True),))
+            before, after = pool.apply(measureLayout, ((jsonfilename, postingListClass, compact, False),))
+        print("%-22s %12.1f %10.1f %12s %12s" % (name, memory / 1e6, memory / postingCount, formatRss(before), formatRss(after)))
+
+####################################################################################################################################
+
+# External build comparison
+# Writes the corpus repeated times times (20 by default) to a json lines file, then builds its index on disk with buildIndexExternal
+# keeping memory MB of posting lists (4 by default) and with buildIndex and writeIndex, each in a new process. Prints the time
+# and the peak resident set size of each, and checks they write the same meta.json and the same postings (see samePostings).
+# Run with: python Indexer.py compare-external [times] [memory MB]
+
+####################################################################################################################################
+
+def peakRss(): # Highest resident set size of this process so far in bytes, or None where the resource module is missing
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 # In KB on Linux
+
+def writeReplicatedCorpus(jsonfilename, times, filename): # The documents of jsonfilename times times, one at a time, as json lines
+    with open(filename, 'w') as f:
+        for copy in range(times):
+            for doc in readDocuments([jsonfilename]):
+                if copy > 0:
+                    doc['sceneId'] += '#' + str(copy)
+                f.write(json.dumps(doc) + '\n')
+
+def measureBuild(build): # Runs in a new process. build is (name, corpus file, index directory, memory)
+    name, filename, path, memory = build
+    start = time.perf_counter()
+    runs = 1
+    if name == 'external':
+        runs = buildIndexExternal(filename, path, memory)
+    else:
+        index, meta = buildIndex(filename, compact = True)
+        writeIndex(index, meta, path)
+    return time.perf_counter() - start, runs, peakRss()
+
+def compareExternal(jsonfilename, times = 20, memoryMB = 4):
+    directory = tempfile.mkdtemp(prefix = 'invertedindex-compare-')
+    try:
+        filename = os.path.join(directory, 'corpus.jsonl')
+        writeReplicatedCorpus(jsonfilename, times, filename)
+        print("Corpus repeated %d times: %.1f MB of json, %d MB of posting lists per run" % (times, os.path.getsize(filename) / 1e6, memoryMB))
+        print("%-10s %10s %6s %12s" % ("build", "time (s)", "runs", "peak RSS"))
+        context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+        for name in ('external', 'in memory'):
+            with context.Pool(1, maxtasksperchild = 1) as pool:
+                elapsed, runs, peak = pool.apply(measureBuild, ((name, filename, os.path.join(directory, name), memoryMB << 20),))
+            print("%-10s %10.2f %6d %12s" % (name, elapsed, runs, formatRss(peak)))
+        external = DiskIndex(os.path.join(directory, 'external'))
+        inMemory = DiskIndex(os.path.join(directory, 'in memory'))
+        try:
+            identical = filecmp(os.path.join(directory, 'external', 'meta.json'), os.path.join(directory, 'in memory', 'meta.json')) and \
+                samePostings(external, inMemory)
+        finally:
+            external.close()
+            inMemory.close()
+        print("same metadata and postings: " + str(identical))
+    finally:
+        shutil.rmtree(directory, ignore_errors = True)
+
+def filecmp(filename1, filename2): # Checks two files have the same bytes
+    with open(filename1, 'rb') as f1, open(filename2, 'rb') as f2:
+        while True:
+            block1 = f1.read(1 << 20)
+            if block1 != f2.read(1 << 20):
+                return False
+            if len(block1) == 0:
+                return True
+
+####################################################################################################################################
+
+# Phrase regression check
+# Runs the phrase queries of the phrase*.txt reports and compares the scenes found with the ones the reports list (PHRASE_SCENES).
+# They are kept here rather than read from the reports, which are written again every time the reports run.
+# Run with: python Indexer.py check-phrases (exits with status 1 if any of them differ). tests/test_phrases.py checks the same
+
+####################################################################################################################################
+
+PHRASE_REPORTS = [(['lady', 'macbeth'], "phrase0.txt"), (['a', 'rose', 'by', 'any', 'other', 'name'], "phrase1.txt"), (['cry', 'havoc'], "phrase2.txt")]
+PHRASE_SCENES = { # Report -> scenes it lists
+    "phrase0.txt": ['macbeth:0.4', 'macbeth:0.5', 'macbeth:0.6', 'macbeth:1.1', 'macbeth:1.2', 'macbeth:2.0', 'macbeth:2.1', 'macbeth:2.3',
+        'macbeth:4.0'],
+    "phrase1.txt": ['romeo_and_juliet:1.1'],
+    # daatRetrieval stops once one of its lists has no more postings, so the reports miss life_and_death_of_king_john:1.0
+    "phrase2.txt": ['coriolanus:2.0', 'julius_caesar:2.0']
+}
+
+def checkPhrases(index, meta):
+    passed = True
+    for phrase, filename in PHRASE_REPORTS:
+        expected = PHRASE_SCENES[filename]
+        found = phraseScenes(phrase, index, meta)
+        if found == expected:
+            print("OK   " + filename)
+        else:
+            passed = False
+            print("FAIL " + filename + ": missing " + str(sorted(set(expected) - set(found))) + ", unexpected " + str(sorted(set(found) - set(expected))))
+    return passed
+
+####################################################################################################################################
+
+# Ranking comparison
+# Runs top-10 queries with exhaustiveRetrieval and rankedRetrieval for both scorers, checks they return the same documents and prints the times.
+# Run with: python Indexer.py compare-ranking
+
+####################################################################################################################################
+
+RANKING_QUERIES = [
+    ['the', 'and', 'i', 'to', 'of', 'a', 'you', 'my', 'that', 'in'],
+    ['king', 'queen', 'crown', 'throne', 'england', 'france', 'war', 'peace', 'sword', 'blood'],
+    ['love', 'death', 'romeo', 'juliet'],
+    ['thee', 'thou', 'you'],
+    ['falstaff', 'sack', 'tavern']
+]
+
+def sameResults(results1, results2): # Same docIds in the same order, with scores equal up to rounding
+    return len(results1) == len(results2) and \
+        all(d1 == d2 and abs(s1 - s2) < 1e-9 for (s1, d1), (s2, d2) in zip(results1, results2))
+
+def compareRanking(index, meta, k = 10):
+    stats = CollectionStats(index, meta)
+    print("%-10s %-60s %14s %12s %8s %6s" % ("scorer", "query", "exhaustive (s)", "maxscore (s)", "speedup", "same"))
+    for scorer in (BM25Scorer(stats), DirichletScorer(stats)):
+        for query in RANKING_QUERIES:
+            same = sameResults(exhaustiveRetrieval(query, index, scorer, k), rankedRetrieval(query, index, scorer, k))
+            exhaustive = bestTime(exhaustiveRetrieval, query, index, scorer, k)
+            pruned = bestTime(rankedRetrieval, query, index, scorer, k)
+            print("%-10s %-60s %14.4f %12.4f %8.2f %6s" % (type(scorer).__name__[:-6], ' '.join(query), exhaustive, pruned, exhaustive / pruned, same))
+
+####################################################################################################################################
+
+# Batch comparison
+# Runs the queries of the reports and the plot one at a time and with batchRetrieval, checks the results match and prints the times
+# and the number of postings each way reads.
+# Run with: python Indexer.py compare-batch
+
+####################################################################################################################################
+
+REPORT_BATCH = [
+    ('more', ['thee', 'you']), ('more', ['thou', 'you']),
+    ('or', ['verona', 'rome', 'italy']), ('or', ['falstaff']), ('or', ['soldier']),
+    ('phrase', ['lady', 'macbeth']), ('phrase', ['a', 'rose', 'by', 'any', 'other', 'name']), ('phrase', ['cry', 'havoc']),
+    ('counts', ['thee', 'you']), ('counts', ['thou', 'you'])
+]
+
+def singleRetrieval(query, index): # Answers one batch query with the one-query functions
+    operator, terms = query
+    if operator == 'or':
+        return getAllDocIds([t for t in terms if t in index], index)
+    if operator == 'more':
+        return terms_0(index[terms[0]], index[terms[1]])
+    if operator == 'phrase':
+        return set(proximityRetrieval(terms, index))
+    docs = set.intersection(*[getAllDocIds([t], index) for t in terms]) # 'and' and 'counts'
+    if operator == 'and':
+        return docs
+    counts = dict()
+    for d in docs:
+        counts[d] = tuple(index[t].getTf(d) for t in terms)
+    return counts
+
+def compareBatch(index, queries = REPORT_BATCH):
+    single = [singleRetrieval(query, index) for query in queries]
+    batch = batchRetrieval(queries, index)
+    singlePostings = sum(index[t].getDocCount() for _, terms in queries for t in set(terms) if t in index)
+    batchPostings = sum(index[t].getDocCount() for t in set(t for _, terms in queries for t in terms) if t in index)
+
+    print("%-10s %10s %10s" % ("", "one by one", "batch"))
+    print("%-10s %10.4f %10.4f" % ("time (s)", bestTime(lambda: [singleRetrieval(query, index) for query in queries]), bestTime(batchRetrieval, queries, index)))
+    print("%-10s %10d %10d" % ("postings", singlePostings, batchPostings))
+    print("same results: " + str(single == batch))
+
+####################################################################################################################################
+
+# Backend comparison
+# Repeats the corpus (100 times by default) for the terms of some set queries, then runs them on the object and numpy backends,
+# checks they find the same documents and prints the times.
+# Run with: python Indexer.py compare-backends [times]
+
+####################################################################################################################################
+
+BACKEND_QUERIES = [
+    ('union', (['verona', 'rome', 'italy'],)),
+    ('union', (['the', 'and', 'i', 'you'],)),
+    ('intersection', (['thee', 'you'],)),
+    ('intersection', (['the', 'and', 'i', 'to', 'of'],)),
+    ('difference', (['thee'], ['you'])),
+    ('more', ('thee', 'you')),
+    ('more', ('thou', 'you'))
+]
+
+# Repeats a CompressedPostingList times times, the k-th copy with docIds shifted by k * docCount
+def replicatePostingList(postingList, docCount, times):
+    postingList.flush()
+    firstDoc, i = readVarint(postingList.data, 0)
+    replicated = CompressedPostingList()
+    for k in range(times):
+        data = bytearray()
+        writeVarint(data, firstDoc + k * docCount) # Only the first docId gap is from 0, the rest are relative
+        shift = len(data) - i # Offsets after the first docId gap move by this much
+        data += postingList.data[i:]
+        copy = CompressedPostingList()
+        lastOffset = postingList.lastOffset + shift if postingList.count > 1 else 0
+        copy.setEncoded(data, postingList.count, postingList.lastDoc + k * docCount, lastOffset,
+            array('i', [d + k * docCount for d in postingList.skipDocs]), array('q', [offset + shift for offset in postingList.skipOffsets]),
+            array('i', postingList.skipIndexes))
+        replicated.extend(copy)
+    return replicated
+
+def compareBackends(index, meta, times = 100):
+    requireNumpy()
+    terms = set()
+    for _, args in BACKEND_QUERIES:
+        for arg in args:
+            terms.update([arg] if isinstance(arg, str) else arg)
+    docCount = len(meta)
+
+    objectIndex = dict((t, replicatePostingList(index[t], docCount, times)) for t in terms)
+    columnarIndex = ColumnarIndex(index, docCount, times)
+    for t in terms:
+        columnarIndex[t] # Convert now so only the queries are timed
+    backends = [makeBackend('object', objectIndex), makeBackend('numpy', columnarIndex)]
+
+    print("Corpus repeated " + str(times) + " times: " + str(docCount * times) + " documents")
+    print("%-14s %-36s %12s %12s %8s %6s" % ("operation", "terms", "object (s)", "numpy (s)", "speedup", "same"))
+    for operation, args in BACKEND_QUERIES:
+        objectResult = getattr(backends[0], operation)(*args)
+        numpyResult = getattr(backends[1], operation)(*args)
+        same = objectResult == set(numpyResult.tolist())
+        objectTime = bestTime(getattr(backends[0], operation), *args)
+        numpyTime = bestTime(getattr(backends[1], operation), *args)
+        print("%-14s %-36s %12.4f %12.4f %8.1f %6s" % (operation, ' / '.join(arg if isinstance(arg, str) else ' '.join(arg) for arg in args),
+            objectTime, numpyTime, objectTime / numpyTime, same))
+
+####################################################################################################################################
+
+# DocSet comparison
+# Repeats the corpus (100 times by default) for the terms of some boolean queries, then answers them with Python sets of docIds
+# (getAllDocIds, conjunctiveDocs) and with DocSets (booleanRetrieval, with the DocSets of the terms made beforehand, as an Index
+# keeps them), checks they find the same documents and prints the times and the memory taken by the results.
+# Run with: python Indexer.py compare-docsets [times]
+
+####################################################################################################################################
+
+DOCSET_QUERIES = [ # (operator, terms, excluded terms)
+    ('or', ['verona', 'rome', 'italy'], []),
+    ('or', ['the', 'and', 'i', 'you'], []),
+    ('or', ['thee', 'thou', 'thy', 'you', 'your'], []),
+    ('and', ['thee', 'you'], []),
+    ('and', ['the', 'and', 'i', 'to', 'of'], []),
+    ('not', ['the', 'and'], ['you']),
+    ('not', ['king'], ['queen', 'crown'])
+]
+
+def setRetrieval(query, index): # The same query with Python sets
+    operator, terms, excluded = query
+    if operator == 'or':
+        return getAllDocIds(terms, index)
+    docs = set(conjunctiveDocs([index[t].cursor() for t in set(terms)]))
+    return docs - getAllDocIds(excluded, index) if operator == 'not' else docs
+
+def compareDocSets(index, meta, times = 100):
+    terms = set(t for _, queryTerms, excluded in DOCSET_QUERIES for t in queryTerms + excluded)
+    docCount = len(meta)
+    replicated = dict((t, replicatePostingList(index[t], docCount, times)) for t in terms)
+    docSets = dict((t, termDocSet(t, replicated)) for t in terms)
+    getDocSet = lambda term, index: docSets[term]
+
+    print("Corpus repeated " + str(times) + " times: " + str(docCount * times) + " documents. DocSets of the terms made in %.4f s" %
+        bestTime(lambda: [termDocSet(t, replicated) for t in terms]))
+    print("%-5s %-36s %10s %10s %8s %10s %10s %6s" % ("", "terms", "set (s)", "DocSet (s)", "speedup", "set (KB)", "DocSet (KB)", "same"))
+    for query in DOCSET_QUERIES:
+        operator, queryTerms, excluded = query
+        docSetQuery = lambda: booleanRetrieval(queryTerms, replicated, 'or' if operator == 'or' else 'and', excluded, getDocSet)
+        same = docSetQuery() == setRetrieval(query, replicated)
+        setTime = bestTime(setRetrieval, query, replicated)
+        docSetTime = bestTime(docSetQuery)
+        print("%-5s %-36s %10.4f %10.4f %8.1f %10.1f %10.1f %6s" % (operator, ' '.join(queryTerms) + ''.join(' -' + t for t in excluded),
+            setTime, docSetTime, setTime / docSetTime, resultSize(setRetrieval(query, replicated)) / 1024,
+            len(docSetQuery().toBytes()) / 1024, same))
+
+####################################################################################################################################
+
+# Thread check
+# Runs the report, ranking and proximity queries from many threads at once on the same index, switching threads as often as possible
+# so the queries interleave inside the same posting lists, and checks every result matches the one from running the query alone.
+# Run with: python Indexer.py check-threads [threads] (exits with status 1 if any of them differ)
+
+####################################################################################################################################
+
+def threadQueries(index, meta): # (name, function) for every query of the thread check
+    scorer = BM25Scorer(CollectionStats(index, meta))
+    queries = [(operator + ' ' + ' '.join(terms), lambda query = (operator, terms): singleRetrieval(query, index)) for operator, terms in REPORT_BATCH]
+    queries += [('daat ' + ' '.join(phrase), lambda phrase = phrase: daatRetrieval(phrase, index)) for phrase, _ in PHRASE_REPORTS]
+    queries += [('ranked ' + ' '.join(Q), lambda Q = Q: rankedRetrieval(Q, index, scorer)) for Q in RANKING_QUERIES]
+    queries.append(('#uw8 cry havoc', lambda: proximityRetrieval(['cry', 'havoc'], index, '#uw', 8)))
+    return queries
+
+def checkThreads(index, meta, threads = 8, rounds = 10):
+    queries = threadQueries(index, meta)
+    expected = [function() for _, function in queries]
+    wrong = [0] * len(queries)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with concurrent.futures.ThreadPoolExecutor(threads) as pool:
+            jobs = [(i, pool.submit(queries[i][1])) for _ in range(rounds) for i in range(len(queries))]
+            for i, job in jobs:
+                if job.result() != expected[i]:
+                    wrong[i] += 1
+    finally:
+        sys.setswitchinterval(interval)
+
+    for (name, _), count in zip(queries, wrong):
+        print(("OK   " if count == 0 else "FAIL ") + name + ("" if count == 0 else ": %d of %d runs differ" % (count, rounds)))
+    return sum(wrong) == 0
+
+####################################################################################################################################
+
+# Build comparison
+# Builds the index with 1 worker process and with more, checks that every posting list comes out the same and prints the speedup.
+# Run with: python Indexer.py compare-build [worker counts...]   (defaults to 1, 2, 4, ... up to the number of CPUs)
+
+####################################################################################################################################
+
+# Checks two indexes have the same terms, with the same encoded postings and term stats. Skip pointers are not compared: lists joined
+# with extend (by a build with workers, or build-external) have them in other places than lists built one posting at a time
+def samePostings(index1, index2):
+    return sorted(index1.keys()) == sorted(index2.keys()) and all(index1[t].data == index2[t].data and
+        index1[t].getDocCount() == index2[t].getDocCount() and getTermStats(index1, t) == getTermStats(index2, t) for t in index1.keys())
+
+def compareBuilds(jsonfilename, workerCounts):
+    serialIndex, serialMeta = buildIndex(jsonfilename, workers = 1)
+    serial = bestTime(buildIndex, jsonfilename, CompressedPostingList, 1)
+
+    print("%-8s %10s %8s %10s" % ("workers", "build (s)", "speedup", "identical"))
+    for workers in workerCounts:
+        index, meta = buildIndex(jsonfilename, workers = workers)
+        identical = meta == serialMeta and samePostings(index, serialIndex)
+        elapsed = bestTime(buildIndex, jsonfilename, CompressedPostingList, workers)
+        print("%-8d %10.2f %8.2f %10s" % (workers, elapsed, serial / elapsed, identical))
+
+####################################################################################################################################
+
+# Filter comparison
+# Runs queries restricted to one play and "which plays have these terms" queries two ways: pushed down into the index (skipping to
+# the docId ranges of the play, see Document ranges in query.py) and by running the query on every play and then looking up the
+# playId of every document found. Checks both find the same documents and prints the times.
+# Run with: python Indexer.py compare-filters
+
+####################################################################################################################################
+
+FILTER_QUERIES = [ # (query type, terms, playId). 'plays' is distinct playIds
+    ('plays', ['falstaff'], None), ('plays', ['soldier'], None), ('plays', ['thee', 'thou'], None), ('plays', ['the'], None),
+    ('or', ['king'], 'hamlet'), ('or', ['the', 'and'], 'hamlet'),
+    ('and', ['thee', 'you'], 'romeo_and_juliet'), ('and', ['the', 'and', 'i'], 'macbeth'),
+    ('phrase', ['lady', 'macbeth'], 'macbeth'), ('phrase', ['i', 'am'], 'hamlet'),
+    ('ranked', ['romeo', 'juliet', 'love'], 'romeo_and_juliet'), ('ranked', ['king', 'crown'], 'hamlet')
+]
+
+def pushedDown(index, query): # index is an Index
+    queryType, terms, playId = query
+    if queryType == 'plays':
+        return index.getPlays(terms)
+    results = index.query(terms, queryType, playId = playId)
+    if queryType == 'ranked':
+        return [d for _, d in results]
+    return results if queryType == 'phrase' else list(results)
+
+# The query without the filter, keeping the documents of the play afterwards. 'or' and 'and' are answered from the posting lists
+# (getAllDocIds, conjunctiveDocs) like the pushed down queries are, not from the DocSets Index caches for unfiltered queries
+def postFiltered(index, query):
+    queryType, terms, playId = query
+    meta = index.getMeta()
+    if queryType == 'plays':
+        return sorted(set(meta[d]['playId'] for d in getAllDocIds(terms, index.index)))
+    if queryType == 'ranked': # Every document has to be ranked, the best of the play could be anywhere in the ranking
+        return [d for _, d in index.query(terms, 'ranked', k = len(meta)) if meta[d]['playId'] == playId][:10]
+    if queryType == 'phrase':
+        results = index.query(terms, 'phrase')
+        return dict((d, positions) for d, positions in results.items() if meta[d]['playId'] == playId)
+    if queryType == 'or':
+        results = sorted(getAllDocIds(terms, index.index))
+    else:
+        results = conjunctiveDocs([index.index[t].cursor() for t in set(terms)])
+    return [d for d in results if meta[d]['playId'] == playId]
+
+def compareFilters(index, meta):
+    index = Index(index, meta)
+    print("%-8s %-24s %-18s %12s %12s %8s %6s" % ("query", "terms", "playId", "after (s)", "pushed (s)", "speedup", "same"))
+    for query in FILTER_QUERIES:
+        same = pushedDown(index, query) == postFiltered(index, query)
+        afterTime = bestTime(postFiltered, index, query)
+        pushedTime = bestTime(pushedDown, index, query)
+        print("%-8s %-24s %-18s %12.5f %12.5f %8.1f %6s" % (query[0], ' '.join(query[1]), query[2] or '', afterTime, pushedTime,
+            afterTime / pushedTime, same))
+
+####################################################################################################################################
+
+# Trace comparison
+# Traces the report phrase queries run the way the reports run them (daatRetrieval, then findPhrase in every document it finds, which
+# opens new cursors each time) and with proximityRetrieval, and prints the counters and operator times of both (see tracing.py).
+# findPhrase is only timed as a whole, so the positions it compares aren't counted (the ones it decodes are).
+# Then prints how much slower the traced queries are than the same queries without a trace.
+# Run with: python Indexer.py compare-traces
+
+####################################################################################################################################
+
+def traceReportPhrase(phrase, index): # QueryTrace of a phrase query run like the reports do
+    trace = QueryTrace()
+    trace.setQuery('phrase', phrase)
+    traced = trace.traceIndex(index)
+    start = time.perf_counter()
+    docs = traceCall(trace, 'daat', daatRetrieval, phrase, traced)
+    trace.count('candidateDocs', len(docs))
+    found = [d for d in docs if traceCall(trace, 'findPhrase', findPhrase, phrase, traced, d)]
+    trace.elapsed = time.perf_counter() - start
+    trace.count('results', len(found))
+    return trace
+
+def printTraces(names, traces): # Counters and operator times of traces side by side
+    print("%-18s" % "" + ''.join("%20s" % name for name in names))
+    for counter in COUNTERS:
+        print("%-18s" % counter + ''.join("%20d" % trace.counters[counter] for trace in traces))
+    operators = []
+    for trace in traces:
+        operators += [name for name in trace.operators if name not in operators]
+    for name in operators:
+        print("%-18s" % (name + " (ms)") + ''.join("%20s" % ("%.3f (%d)" % (trace.operators[name][1] * 1000, trace.operators[name][0])
+            if name in trace.operators else '') for trace in traces))
+    print("%-18s" % "elapsed (ms)" + ''.join("%20.3f" % (trace.elapsed * 1000) for trace in traces))
+
+def compareTraces(index, meta):
+    index = Index(index, meta)
+    for phrase, _ in PHRASE_REPORTS:
+        print(' '.join(phrase) + ":")
+        printTraces(("daat + findPhrase", "proximity"), (traceReportPhrase(phrase, index.index), traceQuery(index, phrase, 'phrase')))
+        print()
+
+    print("%-32s %14s %14s %10s" % ("query", "untraced (s)", "traced (s)", "overhead"))
+    for queryType, terms in [('phrase', phrase) for phrase, _ in PHRASE_REPORTS] + [('and', ['thee', 'you']), ('ranked', RANKING_QUERIES[2])]:
+        untraced = bestTime(lambda: index.query(terms, queryType), repeat = 10)
+        traced = bestTime(lambda: index.query(terms, queryType, trace = QueryTrace()), repeat = 10)
+        print("%-32s %14.5f %14.5f %9.0f%%" % (queryType + ' ' + ' '.join(terms), untraced, traced, (traced / untraced - 1) * 100))
+
+def traceQuery(index, terms, queryType):
+    trace = QueryTrace()
+    index.query(terms, queryType, trace = trace)
+    return trace
@@ -0,0 +1,291 @@
+import sys
+from array import array
+from bisect import bisect_left
+from .postings import writeVarint, readVarint
+
+####################################################################################################################################
+
+# Document sets
+# DocSet is a set of docIds kept as a compressed bitmap, split the way Roaring bitmaps are: docIds are grouped by their high 16 bits
+# (the key) and the low 16 bits of each group are kept in a container of one of two kinds:
+    # array container: a sorted array('H') of the low bits, for groups of at most ARRAY_LIMIT documents (2 bytes per document)
+    # bitmap container: an int used as a 65536 bit bitmap, bit i set if the document with low bits i is in the set (8KB however full)
+# A group is always kept in the smaller kind, so two DocSets with the same documents have the same containers.
+# Union, intersection and difference (|, & and -) work group by group. Two bitmap containers are combined with one bitwise operation
+# on the ints, which Python runs over whole machine words, and array containers are merged as sets of at most ARRAY_LIMIT values.
+# toBytes() and DocSet.fromBytes() write and read a DocSet as bytes, so results can be cached or sent somewhere cheaply.
+# The results of |, &, -, unionAll and intersectAll reuse the containers of the DocSets they were made from where a group is unchanged
+# (shared is then True), so the DocSets of the terms Index caches are never copied to answer a query. append() copies a shared
+# container before changing it, so adding to a result never changes the DocSets it was made from.
+# booleanRetrieval answers 'or' and 'and' queries with DocSets, with terms the documents must not have (NOT).
+
+####################################################################################################################################
+
+ARRAY_LIMIT = 4096 # Largest array container. Above it a bitmap container (8192 bytes) is smaller
+BITMAP_BYTES = 8192
+
+BYTE_BITS = [[bit for bit in range(8) if byte >> bit & 1] for byte in range(256)] # Set bits of every byte value
+
+def toBitmap(values): # Bitmap container of an array container
+    bitmap = bytearray(BITMAP_BYTES)
+    for v in values:
+        bitmap[v >> 3] |= 1 << (v & 7)
+    return int.from_bytes(bitmap, 'little')
+
+def fromBitmap(bitmap): # Array of the set bits of a bitmap container, in order
+    values = array('H')
+    for i, byte in enumerate(bitmap.to_bytes(BITMAP_BYTES, 'little')):
+        if byte:
+            base = i << 3
+            for bit in BYTE_BITS[byte]:
+                values.append(base + bit)
+    return values
+
+def cardinality(container):
+    return container.bit_count() if isinstance(container, int) else len(container)
+
+def normalize(container): # The container in its smaller kind, or None if it is empty
+    if isinstance(container, int):
+        count = container.bit_count()
+        if count == 0:
+            return None
+        return fromBitmap(container) if count <= ARRAY_LIMIT else container
+    if len(container) == 0:
+        return None
+    return toBitmap(container) if len(container) > ARRAY_LIMIT else container
+
+def unionContainers(a, b):
+    if isinstance(a, int) or isinstance(b, int):
+        return (a if isinstance(a, int) else toBitmap(a)) | (b if isinstance(b, int) else toBitmap(b)) # Only gets bigger, stays a bitmap
+    return normalize(array('H', sorted(set(a).union(b))))
+
+def intersectContainers(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        return normalize(a & b)
+    if isinstance(a, int) or isinstance(b, int): # Keep the values of the array whose bit is set in the bitmap
+        values, bitmap = (b, a) if isinstance(a, int) else (a, b)
+        bitmap = bitmap.to_bytes(BITMAP_BYTES, 'little')
+        return normalize(array('H', [v for v in values if bitmap[v >> 3] >> (v & 7) & 1]))
+    smaller, larger = (a, b) if len(a) <= len(b) else (b, a)
+    return normalize(array('H', sorted(set(smaller).intersection(larger))))
+
+def differenceContainers(a, b):
+    if isinstance(a, int):
+        return normalize(a & ~(b if isinstance(b, int) else toBitmap(b)))
+    if isinstance(b, int):
+        bitmap = b.to_bytes(BITMAP_BYTES, 'little')
+        return normalize(array('H', [v for v in a if not bitmap[v >> 3] >> (v & 7) & 1]))
+    excluded = set(b)
+    return normalize(array('H', [v for v in a if v not in excluded]))
+
+class DocSet:
+    __slots__ = ('keys', 'containers', 'shared')
+
+    def __init__(self, docIds = ()): # Any iterable of docIds, in any order
+        self.keys = [] # High 16 bits of the docIds of every group, sorted
+        self.containers = [] # Container of every group
+        self.shared = False # True if the containers may be those of other DocSets
+        for d in sorted(set(docIds)):
+            self.append(d)
+        self.containers = [normalize(container) for container in self.containers]
+
+    @classmethod
+    def fromSorted(cls, docIds): # DocSet of docIds that are already in increasing order, like those of a posting list
+        docSet = cls()
+        for d in docIds:
+            docSet.append(d)
+        docSet.containers = [normalize(container) for container in docSet.containers]
+        return docSet
+
+    @classmethod
+    def fromContainers(cls, keys, containers): # Keeps the groups that aren't empty
+        docSet = cls()
+        for key, container in zip(keys, containers):
+            if container is not None:
+                docSet.keys.append(key)
+                docSet.containers.append(container)
+        docSet.shared = True
+        return docSet
+
+    def append(self, d): # Adds d, which must be greater than every docId already added. Leaves arrays unnormalized, see fromSorted
+        key = d >> 16
+        if len(self.keys) == 0 or self.keys[-1] != key:
+            self.keys.append(key)
+            self.containers.append(array('H'))
+        elif isinstance(self.containers[-1], int):
+            self.containers[-1] |= 1 << (d & 65535) # A new int, bitmaps are never changed in place
+            return
+        elif self.shared: # Only the last group is ever added to, so once it is a copy nothing here is shared that append changes
+            self.containers[-1] = array('H', self.containers[-1])
+        self.shared = False
+        self.containers[-1].append(d & 65535)
+
+    def combine(self, other, operation, keepLeft, keepRight): # Applies operation to the groups both have, keeps the others if asked
+        keys = []
+        containers = []
+        i = 0
+        j = 0
+        while i < len(self.keys) or j < len(other.keys):
+            if j == len(other.keys) or (i < len(self.keys) and self.keys[i] < other.keys[j]):
+                if keepLeft:
+                    keys.append(self.keys[i])
+                    containers.append(self.containers[i])
+                i += 1
+            elif i == len(self.keys) or other.keys[j] < self.keys[i]:
+                if keepRight:
+                    keys.append(other.keys[j])
+                    containers.append(other.containers[j])
+                j += 1
+            else:
+                keys.append(self.keys[i])
+                containers.append(operation(self.containers[i], other.containers[j]))
+                i += 1
+                j += 1
+        return DocSet.fromContainers(keys, containers)
+
+    def __or__(self, other):
+        return self.combine(other, unionContainers, True, True)
+
+    def __and__(self, other):
+        return self.combine(other, intersectContainers, False, False)
+
+    def __sub__(self, other):
+        return self.combine(other, differenceContainers, True, False)
+
+    @staticmethod
+    def unionAll(docSets): # Union of a list of DocSets. Each group's bitmaps are or'ed together once instead of pairwise
+        groups = dict() # Key -> containers of that group
+        for docSet in docSets:
+            for key, container in zip(docSet.keys, docSet.containers):
+                groups.setdefault(key, []).append(container)
+        keys = sorted(groups)
+        containers = []
+        for key in keys:
+            group = groups[key]
+            if len(group) == 1:
+                containers.append(group[0])
+            elif not any(isinstance(c, int) for c in group) and sum(len(c) for c in group) <= ARRAY_LIMIT:
+                containers.append(normalize(array('H', sorted(set().union(*group)))))
+            else:
+                bitmap = 0
+                for container in group:
+                    bitmap |= container if isinstance(container, int) else toBitmap(container)
+                containers.append(normalize(bitmap))
+        return DocSet.fromContainers(keys, containers)
+
+    @staticmethod
+    def intersectAll(docSets): # Intersection of a list of DocSets, smallest first so the intermediate results stay small
+        if len(docSets) == 0:
+            return DocSet()
+        docSets = sorted(docSets, key = len)
+        result = DocSet.fromContainers(docSets[0].keys, docSets[0].containers) # Not docSets[0] itself, which may be cached
+        for docSet in docSets[1:]:
+            if len(result.keys) == 0:
+                break
+            result = result & docSet
+        return result
+
+    def __len__(self):
+        return sum(cardinality(container) for container in self.containers)
+
+    def __iter__(self): # docIds in increasing order
+        for key, container in zip(self.keys, self.containers):
+            base = key << 16
+            for v in (fromBitmap(container) if isinstance(container, int) else container):
+                yield base + v
+
+    def __contains__(self, d):
+        i = bisect_left(self.keys, d >> 16)
+        if i == len(self.keys) or self.keys[i] != d >> 16:
+            return False
+        container = self.containers[i]
+        v = d & 65535
+        if isinstance(container, int):
+            return container >> v & 1 == 1
+        j = bisect_left(container, v)
+        return j < len(container) and container[j] == v
+
+    def __eq__(self, other): # Equal to a DocSet, set or frozenset with the same docIds
+        if isinstance(other, DocSet):
+            return self.keys == other.keys and self.containers == other.containers
+        if isinstance(other, (set, frozenset)):
+            return len(self) == len(other) and all(d in other for d in self)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'DocSet(' + str(list(self)) + ')'
+
+    def getSizeInBytes(self): # Estimated memory taken by the DocSet
+        size = sys.getsizeof(self) + sys.getsizeof(self.keys) + sys.getsizeof(self.containers)
+        return size + sum(sys.getsizeof(key) + sys.getsizeof(container) for key, container in zip(self.keys, self.containers))
+
+    # As bytes: the number of groups, then for every group its key and cardinality as variable-byte ints and its container:
+    # 2 bytes (little-endian) per value for an array container, BITMAP_BYTES for a bitmap container
+    def toBytes(self):
+        data = bytearray()
+        writeVarint(data, len(self.keys))
+        for key, container in zip(self.keys, self.containers):
+            writeVarint(data, key)
+            writeVarint(data, cardinality(container))
+            if isinstance(container, int):
+                data += container.to_bytes(BITMAP_BYTES, 'little')
+            else:
+                values = array('H', container)
+                if sys.byteorder != 'little':
+                    values.byteswap()
+                data += values.tobytes()
+        return bytes(data)
+
+    @classmethod
+    def fromBytes(cls, data):
+        docSet = cls()
+        count, i = readVarint(data, 0)
+        for _ in range(count):
+            key, i = readVarint(data, i)
+            n, i = readVarint(data, i)
+            if n > ARRAY_LIMIT:
+                container = int.from_bytes(data[i:i + BITMAP_BYTES], 'little')
+                i += BITMAP_BYTES
+            else:
+                container = array('H')
+                container.frombytes(data[i:i + 2 * n])
+                if sys.byteorder != 'little':
+                    container.byteswap()
+                i += 2 * n
+            docSet.keys.append(key)
+            docSet.containers.append(container)
+        return docSet
+
+####################################################################################################################################
+
+# Boolean queries on DocSets
+
+####################################################################################################################################
+
+def termDocSet(term, index): # DocSet of the documents with term. Only reads docIds, never positions
+    if term not in index:
+        return DocSet()
+    cursor = index[term].cursor()
+    docIds = []
+    while not cursor.isDone():
+        docIds.append(cursor.getCurrentDoc())
+        cursor.movePast()
+    return DocSet.fromSorted(docIds)
+
+# Documents with any ('or') or all ('and') of terms and none of exclude, as a DocSet.
+# getDocSet(term, index) returns the DocSet of a term. Pass one that caches them (like Index.getDocSet) to reuse them across queries
+def booleanRetrieval(terms, index, operator = 'and', exclude = (), getDocSet = termDocSet):
+    if operator not in ('or', 'and'):
+        raise ValueError("Unknown boolean operator " + str(operator) + ", use 'or' or 'and'")
+    if operator == 'or':
+        result = DocSet.unionAll([getDocSet(t, index) for t in set(terms)])
+    elif len(terms) == 0 or any(t not in index for t in terms):
+        result = DocSet()
+    else:
+        result = DocSet.intersectAll([getDocSet(t, index) for t in set(terms)])
+    excluded = [getDocSet(t, index) for t in set(exclude) if t in index]
+    if len(excluded) > 0 and len(result) > 0:
+        result = result - DocSet.unionAll(excluded)
+    return result
@@ -0,0 +1,122 @@
+import heapq
+import multiprocessing
+import os
+import struct
+import tempfile
+from .postings import CompressedPostingList
+from .compact import MetaTable
+from .build import invertShard, readTexts, readShards, invertShards
+from .storage import encodePostingList, decodePostingList, writeSortedIndex
+
+####################################################################################################################################
+
+# External-memory build
+# buildIndexExternal builds the on-disk index of corpora too big for their index to fit in memory. It never holds more than about
+# memory bytes of posting lists:
+    # 1. The shards are inverted as usual and appended to the current run (a dictionary of term -> CompressedPostingList). Once the
+    # posting lists of the run take memory bytes (estimated, see shardBytes), the run is written to a temporary file in term order
+    # and a new one is started. Runs cover consecutive ranges of docIds, like shards.
+    # 2. The runs are merged with a k-way merge on their terms (heapq.merge): only the current record of every run is in memory.
+    # The posting lists of a term are joined in run order, which is docId order, and written to postings.bin at once
+    # (writeSortedIndex), so only one term's whole posting list is in memory at a time.
+# A run file is a list of records in term order: RUN_RECORD (byte length of the term and of the block), the term in utf-8 and the
+# block of its posting list as encodePostingList writes it for postings.bin.
+# The metadata is kept in memory as a MetaTable (a few dozen bytes per document) and written to meta.json at the end.
+# Run with: python Indexer.py build-external [--memory MB] [--workers n] [files...]
+
+####################################################################################################################################
+
+DEFAULT_MEMORY = 64 * 1024 * 1024 # Bytes of posting lists in a run
+TERM_BYTES = 200 # Estimated memory per term of a run besides its data: the dictionary entry, the string, the list and its bytearray
+RUN_RECORD = struct.Struct('<II')
+
+def shardBytes(shard, run): # Estimated memory the posting lists of shard add to run once it is merged into it
+    size = 0
+    for w, postingList in shard.items():
+        size += len(postingList.data)
+        if w not in run:
+            size += TERM_BYTES + len(w)
+    return size
+
+def writeRun(run, directory, number): # Writes a run in term order to a new file in directory. Returns its file name
+    filename = os.path.join(directory, 'run-%d.bin' % number)
+    with open(filename, 'wb') as f:
+        for t in sorted(run):
+            term = t.encode('utf-8')
+            block = encodePostingList(run[t])
+            f.write(RUN_RECORD.pack(len(term), len(block)))
+            f.write(term)
+            f.write(block)
+    return filename
+
+def readRun(filename, number): # Yields (term, run number, block) for every record of a run file
+    with open(filename, 'rb') as f:
+        while True:
+            header = f.read(RUN_RECORD.size)
+            if len(header) < RUN_RECORD.size:
+                return
+            termLength, blockLength = RUN_RECORD.unpack(header)
+            yield f.read(termLength).decode('utf-8'), number, f.read(blockLength)
+
+def mergeRuns(filenames): # Yields (term, PostingList, (df, cf, maxTf)) for every term of the runs, in term order, for writeSortedIndex
+    records = heapq.merge(*[readRun(filename, number) for number, filename in enumerate(filenames)]) # By term, then run number
+    term = None
+    postingList = None
+    for t, _, block in records:
+        if t != term:
+            if term is not None:
+                yield term, postingList, termStats(postingList)
+            term = t
+            postingList = decodePostingList(block)
+        else:
+            if not isinstance(postingList.data, bytearray): # The first block of the term is wrapped as it is, copy it to append
+                first = postingList
+                postingList = CompressedPostingList()
+                postingList.extend(first)
+            postingList.extend(decodePostingList(block))
+    if term is not None:
+        yield term, postingList, termStats(postingList)
+
+def termStats(postingList):
+    tfs = postingList.getTfs()
+    return (len(tfs), sum(tfs), max(tfs))
+
+# Builds the index of the corpus files (one file name or a list of them) and writes it to the index directory path, keeping about
+# memory bytes of posting lists in memory. Temporary run files go in a directory made in tempDir (the system's default if None),
+# which is deleted at the end. workers inverts the shards in that many processes, like buildIndex. Returns the number of runs
+def buildIndexExternal(filenames, path, memory = DEFAULT_MEMORY, workers = 1, tempDir = None):
+    if isinstance(filenames, str):
+        filenames = [filenames]
+    meta = MetaTable()
+    shards = readShards(readTexts(filenames, meta), CompressedPostingList)
+
+    with tempfile.TemporaryDirectory(prefix = 'invertedindex-runs-', dir = tempDir) as directory:
+        pool = None
+        if workers > 1:
+            pool = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn').Pool(workers)
+        try:
+            inverted = invertShards(pool, shards, workers) if pool is not None else (invertShard(shard) for shard in shards)
+            runFiles = []
+            run = dict()
+            size = 0
+            for shard in inverted:
+                size += shardBytes(shard, run)
+                for w, postingList in shard.items(): # Merged like mergeShards does
+                    if w in run:
+                        run[w].extend(postingList)
+                    else:
+                        run[w] = postingList
+                if size >= memory:
+                    runFiles.append(writeRun(run, directory, len(runFiles)))
+                    run = dict()
+                    size = 0
+            if len(run) > 0 or len(runFiles) == 0:
+                runFiles.append(writeRun(run, directory, len(runFiles)))
+            run = None
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        writeSortedIndex(mergeRuns(runFiles), meta, path)
+    return len(runFiles)
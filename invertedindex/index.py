@@ -0,0 +1,197 @@
+import os
+import time
+import warnings
+from .build import buildIndex
+from .storage import writeIndex, isIndexCurrent, openIndex, SegmentedIndex
+from .query import conjunctiveDocs, proximityRetrieval, getTermStats, rangeDocIds, distinctPlays
+from .compact import MetaTable
+from .ranking import CollectionStats, BM25Scorer, DirichletScorer, rankedRetrieval
+from .cache import QueryCache
+from .docsets import DocSet, termDocSet, booleanRetrieval
+from .tracing import traceCall
+
+####################################################################################################################################
+
+# Index
+# Index is the way to use the indexer from other code. It holds an index (a dictionary of term -> PostingList, a CompactIndex,
+# a DiskIndex or a SegmentedIndex) and its metadata, and can itself be used in place of the index dictionary.
+    # Index.build(filenames, path = None, workers = 1): builds the index of the corpus files, and writes it to the directory path if given
+    # Index.load(path): opens an index directory written by build (or writeIndex). Only the lexicon is read until terms are looked up
+    # Index.open(path, filenames): loads path if it was written after the corpus files last changed, otherwise builds and writes it
+    # refresh(): picks up documents added to the index directory since it was loaded (see Segments in storage.py)
+    # query(terms, queryType, playId = None, exclude = (), trace = None): answers a query, see below
+    # getDocSet(term): DocSet of the documents with term, kept in a QueryCache so boolean queries reuse it
+    # getPlays(terms): sorted playIds of the documents with any of the terms
+    # tf(term, d), df(term), cf(term), getDocLength(d): statistics kept in the index, none of them reads positions
+# Nothing is read or built when the package is imported, only when one of these is called.
+
+####################################################################################################################################
+
+QUERY_TYPES = ('or', 'and', 'phrase', 'ranked')
+SCORERS = { 'bm25':BM25Scorer, 'dirichlet':DirichletScorer }
+
+class Index:
+    def __init__(self, index, meta, path = None):
+        self.index = index
+        self.meta = meta if isinstance(meta, MetaTable) else MetaTable(meta) # Its docId ranges of every play are used by playId filters
+        self.path = path # Directory the index was loaded from or written to, if any
+        self.stats = None # CollectionStats, made the first time a ranked query needs it
+        self.scorers = dict() # Scorer name -> scorer
+        self.cache = None # QueryCache of the DocSets of terms, made the first time a boolean query needs one
+
+    @classmethod
+    def build(cls, filenames, path = None, workers = 1):
+        index, meta = buildIndex(filenames, workers = workers, compact = True)
+        if path is not None:
+            writeIndex(index, meta, path)
+        return cls(index, meta, path)
+
+    @classmethod
+    def load(cls, path):
+        index = openIndex(path)
+        return cls(index, index.getMeta(), path)
+
+    # Documents added to path (python Indexer.py add) are only in path, so an index with added documents is never rebuilt here, even if
+    # the corpus files changed after them. It is loaded as it is, with a warning
+    @classmethod
+    def open(cls, path, filenames, workers = os.cpu_count() or 1):
+        if isIndexCurrent(path, filenames):
+            return cls.load(path)
+        if os.path.exists(os.path.join(path, 'segments.json')):
+            warnings.warn(path + " is older than the corpus files, but documents were added to it and rebuilding it would drop them. "
+                "Loading it as it is: run python Indexer.py build to rebuild it anyway")
+            return cls.load(path)
+        return cls.build(filenames, path, workers)
+
+    # Reopens the segments of the index directory if documents were added to it since it was loaded (or since the last refresh), and
+    # remakes the metadata, statistics, scorers and cached DocSets from them. Returns True if it did. Call it while no query is running
+    def refresh(self):
+        if self.path is None:
+            return False
+        if isinstance(self.index, SegmentedIndex):
+            if not self.index.refresh():
+                return False
+        elif os.path.exists(os.path.join(self.path, 'segments.json')): # Loaded or built before the first documents were added
+            old = self.index
+            self.index = SegmentedIndex(self.path)
+            if hasattr(old, 'close'):
+                old.close()
+        else:
+            return False
+        self.meta = self.index.getMeta()
+        self.stats = None
+        self.scorers = dict()
+        self.cache = None
+        return True
+
+    def getMeta(self): # Accessor for the metadata
+        return self.meta
+
+    def getScorer(self, name): # The BM25Scorer ('bm25') or DirichletScorer ('dirichlet') of this index
+        scorer = self.scorers.get(name)
+        if scorer is None:
+            if name not in SCORERS:
+                raise ValueError("Unknown scorer " + str(name) + ", use one of " + ', '.join(SCORERS))
+            if self.stats is None:
+                self.stats = CollectionStats(self.index, self.meta)
+            scorer = SCORERS[name](self.stats)
+            self.scorers[name] = scorer
+        return scorer
+
+    def getDocSet(self, term, index = None): # index is read instead of this one if the DocSet isn't cached (a TracedIndex of it)
+        if self.cache is None:
+            self.cache = QueryCache(self.index)
+        return self.cache.lookup(('docset', term), lambda: termDocSet(term, index if index is not None else self.index))
+
+    # Answers a query. terms is a list of terms, queryType one of:
+        # 'or': DocSet of the documents with any of the terms
+        # 'and': DocSet of the documents with all of the terms
+        # 'phrase': dictionary of docId -> start positions of the matches of the terms. operator and n are those of proximityRetrieval:
+        # '#od' with n = 1 (the default) is the exact phrase
+        # 'ranked': the k best (score, docId), best first, scored with scorer ('bm25' or 'dirichlet')
+    # With playId, only documents of that play are looked at (the postings of the other plays are skipped, see Document ranges in query.py)
+    # exclude is a list of terms the documents found must not have (NOT). Not for 'ranked' queries
+    # With a QueryTrace (see tracing.py) the query runs on trace.traceIndex(index), counting what its cursors do, and the time of each
+    # of its operators, the whole query and the number of results are added to the trace
+    def query(self, terms, queryType = 'or', operator = '#od', n = 1, k = 10, scorer = 'bm25', playId = None, exclude = (), trace = None):
+        if queryType not in QUERY_TYPES:
+            raise ValueError("Unknown query type " + str(queryType) + ", use one of " + ', '.join(QUERY_TYPES))
+        if queryType == 'ranked' and len(exclude) > 0:
+            raise ValueError("exclude only works with 'or', 'and' and 'phrase' queries")
+        if trace is None:
+            return self.runQuery(self.index, terms, queryType, operator, n, k, scorer, playId, exclude, None)
+        trace.setQuery(queryType, terms)
+        start = time.perf_counter()
+        try:
+            results = self.runQuery(trace.traceIndex(self.index), terms, queryType, operator, n, k, scorer, playId, exclude, trace)
+        finally:
+            trace.elapsed += time.perf_counter() - start
+        trace.count('results', len(results))
+        return results
+
+    def runQuery(self, index, terms, queryType, operator, n, k, scorer, playId, exclude, trace): # query() on index, traced with trace
+        ranges = self.meta.getPlayRanges(playId) if playId is not None else None
+        getDocSet = lambda term, index: self.getDocSet(term, index)
+        if queryType in ('or', 'and') and ranges is None:
+            return traceCall(trace, 'boolean', booleanRetrieval, terms, index, queryType, exclude, getDocSet)
+
+        if queryType == 'or':
+            results = DocSet(traceCall(trace, 'ranges', rangeDocIds, terms, index, ranges))
+        elif queryType == 'and':
+            if len(terms) == 0 or any(t not in index for t in terms):
+                return DocSet()
+            candidates = conjunctiveDocs([index[t].cursor() for t in set(terms)], ranges)
+            if trace is not None:
+                candidates = trace.timeIterator('candidates', candidates, 'candidateDocs')
+            results = DocSet.fromSorted(candidates)
+        elif queryType == 'phrase':
+            results = proximityRetrieval(terms, index, operator, n, ranges, trace)
+        else:
+            return traceCall(trace, 'ranked', rankedRetrieval, terms, index, self.getScorer(scorer), k, ranges, trace)
+
+        if len(exclude) > 0:
+            excluded = traceCall(trace, 'exclude', booleanRetrieval, exclude, index, 'or', (), getDocSet)
+            if queryType == 'phrase':
+                return dict((d, positions) for d, positions in results.items() if d not in excluded)
+            results = results - excluded
+        return results
+
+    def getPlays(self, terms): # Sorted playIds of the documents with any of the terms
+        return distinctPlays(terms, self.index, self.meta)
+
+    def tf(self, term, d): # Number of times term appears in document d
+        return self.index[term].getTf(d) if term in self.index else 0
+
+    def df(self, term): # Number of documents term appears in
+        return getTermStats(self.index, term)[0]
+
+    def cf(self, term): # Number of times term appears in the whole collection
+        return getTermStats(self.index, term)[1]
+
+    def getTermStats(self, term): # (df, cf, maxTf) of term, see getTermStats in query.py
+        return getTermStats(self.index, term)
+
+    def getDocLength(self, d): # Number of words of document d
+        return self.meta.getLengths()[d]
+
+    def __getitem__(self, term): # Works like index[term] on the dictionary. Raises KeyError for unknown terms
+        return self.index[term]
+
+    def __contains__(self, term):
+        return term in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def keys(self):
+        return self.index.keys()
+
+    def close(self): # Closes the files of an index that was loaded
+        if hasattr(self.index, 'close'):
+            self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
@@ -0,0 +1,434 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+####################################################################################################################################
+
+# Postings have a document ID and a list of positions where the associated term appears in said document
+class Posting:
+    __slots__ = ('docId', 'positions') # No __dict__ for each of the hundreds of thousands of Postings
+
+    def __init__(self, d, p):
+        self.docId = d # ID of the document
+        self.positions = [p] # Indices in the document where the term appears. Cannot be empty. Defaults with one.
+
+    def add(self, p): # Add an index to the list of positions
+        self.positions.append(p)
+    
+    def getDocId(self): # Accessor to return docId
+        return self.docId
+
+    def getPositions(self): # Accessor to return positions list
+        return self.positions
+    
+####################################################################################################################################
+
+# PostingList has
+    # postings: a list of Posting objects
+        # Cannot be empty. Is constructed with a Posting already added
+    # last: an index of the last Posting to be added to postings
+# A PostingList is only added to while the index is built. It is read through cursors (see PostingCursor) made with cursor(),
+# so the same PostingList can be read by any number of queries at once.
+
+class PostingList:
+    __slots__ = ('postings', 'last')
+
+    def __init__(self, d, p): # Constructor requires a document ID and a position
+        self.postings = [Posting(d, p)] # Cannot make an empty PostingList. Defaults with one added.
+        self.last = 0 # Index for last added Posting
+    
+    def add(self, d, p):
+        if self.postings[self.last].getDocId() == d: # If the docId of the most recently added Posting is the same as d
+            self.postings[self.last].add(p) # Add the position p to the current Posting
+        else:
+            self.postings.append(Posting(d, p)) # Otherwise, append a new Posting to the list with docId d and position p.
+            self.last += 1 # Increment index of last added Posting
+    
+    def addPosting(self, d, positions): # Adds a whole Posting at once. d must be greater than every docId already added
+        posting = Posting(d, positions[0])
+        posting.positions = positions
+        self.postings.append(posting)
+        self.last += 1
+
+    def extend(self, other): # Appends the Postings of other. Its docIds must all be greater than the ones in this list
+        self.postings.extend(other.getPostings())
+        self.last = len(self.postings) - 1
+
+    def getPostings(self): # Accessor for postings list
+        return self.postings
+
+    def getTfs(self): # Number of times the term appears in each of its documents, in docId order
+        return [len(posting.getPositions()) for posting in self.postings]
+
+    def getTf(self, d): # Number of times the term appears in document d (0 if it doesn't)
+        i = bisect_left(self.postings, d, key = Posting.getDocId)
+        return len(self.postings[i].getPositions()) if i < len(self.postings) and self.postings[i].getDocId() == d else 0
+
+    def getDocCount(self): # Number of Postings, which is the number of documents the term appears in
+        return len(self.postings)
+
+    def cursor(self): # A new cursor on the first Posting
+        return PostingCursor(self.postings)
+
+####################################################################################################################################
+
+# PostingCursor is the position of one query in a PostingList. It has
+    # postings: the postings list of the PostingList. Only read
+    # current: an index of the Posting being currently looked at
+# Every query makes its own cursors, so queries running at the same time (in threads or interleaved) can't move each other's.
+# Cursors are made for every term of every query, so they have __slots__ to stay small and quick to make.
+
+class PostingCursor:
+    __slots__ = ('postings', 'current')
+
+    def __init__(self, postings):
+        self.postings = postings
+        self.current = 0 # Index for current Posting
+
+    def getCurrentDoc(self): # Accessor for current document ID
+        return self.postings[self.current].getDocId()
+    
+    def getCurrentPositions(self): # Accessor for positions of current Posting
+        return self.postings[self.current].getPositions()
+    
+    def getCurrentTf(self): # Number of times the term appears in the current document
+        return len(self.postings[self.current].getPositions())
+
+    def getDocCount(self): # Number of Postings, which is the number of documents the term appears in
+        return len(self.postings)
+
+    def hasMore(self): # Checks if current is still less than the last index available
+        if self.current < len(self.postings) - 1:
+            return True # If it is still not at the last index, return True
+        return False
+
+    def isDone(self): # Checks if current has moved past the last Posting
+        return self.current >= len(self.postings)
+    
+    def skipTo(self, d): # Moves current forward to the first Posting with document ID >= d (or the last one if there is none)
+        last = len(self.postings) - 1
+        if self.current > last or self.getCurrentDoc() >= d: # Never moves backwards. Use reset() for that
+            return
+        lo = self.current # Galloping search: double the step until a Posting with document ID >= d is passed
+        step = 1
+        while lo + step < last and self.postings[lo + step].getDocId() < d:
+            lo += step
+            step *= 2
+        self.current = bisect_left(self.postings, d, lo, min(lo + step, last), key = Posting.getDocId) # Then binary search that range
+
+    def movePast(self): # Modifies value of current
+        self.current += 1 # Just increments once
+
+    def reset(self): # Moves current back to the first Posting
+        self.current = 0
+
+####################################################################################################################################
+
+# CompressedPostingList has the same interface as PostingList, but keeps its postings encoded in a single bytearray instead of
+# a list of Posting objects with a list of ints each.
+    # data: the encoded postings. Every posting is written as variable-byte ints (7 bits per byte, high bit set on all but the last byte):
+        # docId gap from the previous posting, position count, byte length of the positions, then the position gaps
+    # pendingDoc, pendingPositions: the posting currently being added to. It is only encoded once a new docId is added
+    # or the list is read, because its position count is not known until then.
+    # skipDocs, skipOffsets, skipIndexes: skip pointers. The docId, data offset and index of about every SKIP_INTERVAL-th Posting, so
+    # skipTo can binary search them and only decode the postings after the last skip pointer before its target. extend() shifts the
+    # skip pointers of the list it appends instead of decoding its postings to place new ones, so pointers are SKIP_INTERVAL apart
+    # in lists built with add() but can be up to a few times that apart in joined lists.
+# It is read through CompressedPostingCursors like a PostingList is read through PostingCursors. Making a cursor encodes the pending
+# posting, so a list that is still being added to must not be read from more than one thread. Built and loaded lists never are.
+
+####################################################################################################################################
+
+SKIP_INTERVAL = 32 # Postings between two skip pointers
+
+def writeVarint(buffer, n): # Appends n to buffer as a variable-byte int
+    while n >= 128:
+        buffer.append((n & 127) | 128)
+        n >>= 7
+    buffer.append(n)
+
+def readVarint(buffer, i): # Reads the variable-byte int starting at buffer[i]. Returns the int and the index right after it
+    b = buffer[i]
+    n = b & 127
+    shift = 7
+    while b >= 128:
+        i += 1
+        b = buffer[i]
+        n |= (b & 127) << shift
+        shift += 7
+    return n, i + 1
+
+class CompressedPostingList:
+    __slots__ = ('data', 'count', 'lastDoc', 'lastOffset', 'pendingDoc', 'pendingPositions', 'skipDocs', 'skipOffsets', 'skipIndexes')
+
+    def __init__(self, d = None, p = None): # Constructed like PostingList, or empty when it will be filled with setEncoded()
+        self.data = bytearray()
+        self.count = 0 # Number of postings, including the pending one
+        self.lastDoc = 0 # docId of the last encoded posting (docId gaps are taken from it)
+        self.lastOffset = 0 # Offset in data of the last encoded posting
+        self.pendingDoc = None
+        self.pendingPositions = None
+        self.skipDocs = () # Skip pointer i is for the Posting at index skipIndexes[i], with docId skipDocs[i] and offset skipOffsets[i]
+        self.skipOffsets = () # They become arrays once there is a skip pointer. Most terms never get one
+        self.skipIndexes = ()
+        if d is not None:
+            self.pendingDoc = d
+            self.pendingPositions = [p]
+            self.count = 1
+
+    def setEncoded(self, data, count, lastDoc, lastOffset, skipDocs, skipOffsets, skipIndexes): # Fills the list with postings already encoded
+        self.data = data
+        self.count = count
+        self.lastDoc = lastDoc
+        self.lastOffset = lastOffset
+        self.skipDocs = skipDocs
+        self.skipOffsets = skipOffsets
+        self.skipIndexes = skipIndexes
+        self.pendingDoc = None
+        self.pendingPositions = None
+
+    def add(self, d, p):
+        if self.pendingDoc == d: # If the docId of the most recently added Posting is the same as d
+            self.pendingPositions.append(p) # Add the position p to the pending Posting
+            return
+
+        if self.pendingDoc is not None:
+            self.flush() # Otherwise the pending Posting is done, encode it
+        elif self.count > 0 and self.lastDoc == d:
+            self.unflush() # Or the last Posting was encoded when it was read, decode it to add to it again
+            self.pendingPositions.append(p)
+            return
+
+        self.pendingDoc = d # Start a new pending Posting with docId d and position p
+        self.pendingPositions = [p]
+        self.count += 1
+
+    def addPosting(self, d, positions): # Adds a whole Posting at once. d must be greater than every docId already added
+        if self.pendingDoc is not None:
+            self.flush()
+        self.pendingDoc = d
+        self.pendingPositions = positions
+        self.count += 1
+
+    # Appends the Postings of other. Its docIds must all be greater than the ones in this list.
+    # Only the first docId gap of other is decoded and written again, the rest of its data is copied as it is and its skip pointers
+    # are shifted by the offset and index it starts at
+    def extend(self, other):
+        self.flush()
+        other.flush()
+        if other.count == 0:
+            return
+        if not isinstance(self.data, bytearray):
+            self.data = bytearray(self.data)
+
+        offset = len(self.data) # Where the first Posting of other goes
+        firstDoc, i = readVarint(other.data, 0) # The first docId gap of other is from 0, make it a gap from the last docId here
+        writeVarint(self.data, firstDoc - (self.lastDoc if offset > 0 else 0))
+        shift = len(self.data) - i # Offsets in other after its first docId gap move by this much
+        self.data += other.data[i:]
+
+        if self.count > 0 and self.count - (self.skipIndexes[-1] if len(self.skipIndexes) > 0 else 0) >= SKIP_INTERVAL:
+            self.addSkip(self.count, firstDoc, offset) # Like flush would, so joining many short lists still gets skip pointers
+        for k, d, skipOffset in zip(other.skipIndexes, other.skipDocs, other.skipOffsets):
+            self.addSkip(self.count + k, d, skipOffset + shift)
+
+        self.lastOffset = other.lastOffset + shift if other.count > 1 else offset
+        self.lastDoc = other.lastDoc
+        self.count += other.count
+
+    def addSkip(self, k, d, offset): # Adds a skip pointer to the Posting at index k, with docId d and at offset in data
+        if len(self.skipDocs) == 0:
+            self.skipDocs = array('i')
+            self.skipOffsets = array('q')
+            self.skipIndexes = array('i')
+        self.skipDocs.append(d)
+        self.skipOffsets.append(offset)
+        self.skipIndexes.append(k)
+
+    def flush(self): # Encodes the pending Posting at the end of data
+        if self.pendingDoc is None:
+            return
+        if not isinstance(self.data, bytearray):
+            self.data = bytearray(self.data) # Lists read from disk are immutable bytes
+
+        positionBytes = bytearray()
+        prev = 0
+        for p in self.pendingPositions:
+            writeVarint(positionBytes, p - prev)
+            prev = p
+
+        offset = len(self.data)
+        i = self.count - 1 # Index of the pending Posting
+        if i > 0 and i - (self.skipIndexes[-1] if len(self.skipIndexes) > 0 else 0) >= SKIP_INTERVAL:
+            self.addSkip(i, self.pendingDoc, offset)
+        writeVarint(self.data, self.pendingDoc - (self.lastDoc if len(self.data) > 0 else 0))
+        writeVarint(self.data, len(self.pendingPositions))
+        writeVarint(self.data, len(positionBytes))
+        self.data += positionBytes
+
+        self.lastOffset = offset
+        self.lastDoc = self.pendingDoc
+        self.pendingDoc = None
+        self.pendingPositions = None
+
+    def freeze(self): # Encodes the pending Posting and trims data to its length. Adding to the list again copies it back into a bytearray
+        self.flush()
+        if isinstance(self.data, bytearray):
+            self.data = bytes(self.data) # A bytearray keeps spare room to grow into
+
+    def unflush(self): # Takes the last encoded Posting out of data and makes it the pending Posting again
+        offset = 0
+        prevOffset = 0
+        prevDoc = 0
+        while offset < self.lastOffset: # Walk up to the last Posting, keeping the offset and docId of the one before it
+            prevOffset = offset
+            gap, offset = readVarint(self.data, offset)
+            prevDoc += gap
+            offset = self.skipPositions(offset)
+
+        cursor = CompressedPostingCursor(self)
+        cursor.seek(self.count - 1, self.lastOffset, prevDoc)
+        self.pendingPositions = cursor.getCurrentPositions()
+        self.pendingDoc = self.lastDoc
+        self.data = bytearray(self.data[:self.lastOffset])
+        if len(self.skipOffsets) > 0 and self.skipOffsets[-1] == self.lastOffset:
+            self.skipDocs.pop() # The skip pointer to it goes too. It is added back when it is encoded again
+            self.skipOffsets.pop()
+            self.skipIndexes.pop()
+        self.lastDoc = prevDoc
+        self.lastOffset = prevOffset
+
+    def skipPositions(self, offset): # Given the offset right after a docId gap, returns the offset of the next Posting
+        _, offset = readVarint(self.data, offset)
+        nbytes, offset = readVarint(self.data, offset)
+        return offset + nbytes
+
+    def getPostings(self): # Decodes every Posting. Only for code that needs Posting objects, this undoes the compression
+        postings = []
+        cursor = self.cursor()
+        while not cursor.isDone():
+            posting = Posting(cursor.getCurrentDoc(), 0)
+            posting.positions = cursor.getCurrentPositions()
+            postings.append(posting)
+            cursor.movePast()
+        return postings
+
+    def getTfs(self): # Number of times the term appears in each of its documents, in docId order
+        self.flush()
+        tfs = []
+        offset = 0
+        for _ in range(self.count): # Only the Posting headers are read
+            _, offset = readVarint(self.data, offset)
+            tf, offset = readVarint(self.data, offset)
+            nbytes, offset = readVarint(self.data, offset)
+            offset += nbytes
+            tfs.append(tf)
+        return tfs
+
+    def getTf(self, d): # Number of times the term appears in document d (0 if it doesn't). Only Posting headers are read
+        cursor = self.cursor()
+        cursor.skipTo(d)
+        return cursor.getCurrentTf() if not cursor.isDone() and cursor.getCurrentDoc() == d else 0
+
+    def getDocCount(self): # Number of Postings, which is the number of documents the term appears in
+        return self.count
+
+    def cursor(self): # A new cursor on the first Posting
+        return CompressedPostingCursor(self)
+
+# CompressedPostingCursor is the position of one query in a CompressedPostingList. It has
+    # data, count, skipDocs, skipOffsets, skipIndexes: those of the list when the cursor was made. Only read
+    # current: index of the Posting being currently looked at. The docId and byte offsets of the current posting are decoded
+    # as current moves, and its positions are only decoded when asked for.
+class CompressedPostingCursor:
+    __slots__ = ('data', 'count', 'skipDocs', 'skipOffsets', 'skipIndexes', 'current', 'currentDoc', 'currentOffset', 'positionsOffset',
+        'positionCount', 'nextOffset', 'positions', 'prevDoc')
+
+    def __init__(self, postingList):
+        postingList.flush()
+        self.data = postingList.data
+        self.count = postingList.count
+        self.skipDocs = postingList.skipDocs
+        self.skipOffsets = postingList.skipOffsets
+        self.skipIndexes = postingList.skipIndexes
+        self.reset()
+
+    def reset(self): # Moves the cursor back to the first posting
+        self.currentOffset = 0 # Offset in data of the current posting
+        self.positionsOffset = 0 # Offset in data of the positions of the current posting
+        self.positionCount = 0
+        self.nextOffset = 0 # Offset in data of the posting after the current one
+        self.seek(0, 0, 0) # Sets current, currentDoc (None past the last posting), positions (decoded positions) and prevDoc
+
+    def seek(self, i, offset, prevDoc): # Decodes the header of the Posting at index i and data offset, without its positions
+        self.current = i
+        self.prevDoc = prevDoc
+        self.positions = None
+        if i >= self.count:
+            self.currentDoc = None # Past the last Posting
+            return
+        self.currentOffset = offset
+        gap, offset = readVarint(self.data, offset)
+        self.currentDoc = prevDoc + gap
+        self.positionCount, offset = readVarint(self.data, offset)
+        nbytes, offset = readVarint(self.data, offset)
+        self.positionsOffset = offset
+        self.nextOffset = offset + nbytes
+
+    def getCurrentDoc(self): # Accessor for current document ID
+        if self.currentDoc is None:
+            raise IndexError("CompressedPostingList cursor is past the last posting")
+        return self.currentDoc
+
+    def getCurrentPositions(self): # Accessor for positions of current Posting. Decoded on first access
+        if self.positions is None:
+            if self.currentDoc is None:
+                raise IndexError("CompressedPostingList cursor is past the last posting")
+            positions = []
+            data = self.data
+            i = self.positionsOffset
+            prev = 0
+            for _ in range(self.positionCount):
+                b = data[i]
+                n = b & 127
+                shift = 7
+                while b >= 128: # Inlined readVarint, this is the hottest loop
+                    i += 1
+                    b = data[i]
+                    n |= (b & 127) << shift
+                    shift += 7
+                i += 1
+                prev += n
+                positions.append(prev)
+            self.positions = positions
+        return self.positions
+
+    def getCurrentTf(self): # Number of times the term appears in the current document. Read from the header, no positions are decoded
+        if self.currentDoc is None:
+            raise IndexError("CompressedPostingList cursor is past the last posting")
+        return self.positionCount
+
+    def getDocCount(self): # Number of Postings, which is the number of documents the term appears in
+        return self.count
+
+    def hasMore(self): # Checks if current is still less than the last index available
+        return self.current < self.count - 1
+
+    def isDone(self): # Checks if current has moved past the last Posting
+        return self.current >= self.count
+
+    def skipTo(self, d): # Moves current forward to the first Posting with document ID >= d (or the last one if there is none)
+        if self.currentDoc is None or self.currentDoc >= d: # Never moves backwards. Use reset() for that
+            return
+        j = bisect_right(self.skipDocs, d) - 1 # Last skip pointer to a Posting with docId <= d
+        if j >= 0 and self.skipIndexes[j] > self.current: # Jump to it if it is ahead of current
+            offset = self.skipOffsets[j]
+            gap, _ = readVarint(self.data, offset)
+            self.seek(self.skipIndexes[j], offset, self.skipDocs[j] - gap)
+        while self.currentDoc < d and self.hasMore(): # Then decode forwards, up to the next skip pointer
+            self.seek(self.current + 1, self.nextOffset, self.currentDoc)
+
+    def movePast(self): # Modifies value of current
+        if self.currentDoc is None:
+            self.current += 1 # Already past the end, there is nothing to decode
+        else:
+            self.seek(self.current + 1, self.nextOffset, self.currentDoc)
@@ -0,0 +1,335 @@
+from bisect import bisect_left, bisect_right
+from .compact import MetaTable
+
+####################################################################################################################################
+
+
+# Functions
+
+
+####################################################################################################################################
+
+# Function for Terms0
+
+####################################################################################################################################
+# Function designed for producing terms0.txt's content
+# Takes the posting lists of two terms (index[term1] and index[term2]).
+# postingList1 is the posting list of the term that you want to have more frequency per document.
+# Frequencies are the tf kept with every Posting, so no position list is read or decoded.
+def terms_0(postingList1, postingList2):
+    cursor1 = postingList1.cursor()
+    cursor2 = postingList2.cursor()
+
+    docIds = set() # Set to hold docIds where frequency of term1 > frequency of term2 in current document
+
+    for d in conjunctiveDocs([cursor1, cursor2]): # Documents with both terms, with both cursors on them
+        if cursor1.getCurrentTf() > cursor2.getCurrentTf(): # If term1 is more frequent than term2 in current document
+            docIds.add(d) # Add it to the set of docIds
+
+    return docIds # Return set of docIds for scenes where term1 is more frequent than term2
+
+####################################################################################################################################
+
+# Non-conjunctive Processing
+
+####################################################################################################################################
+
+# Returns set of all docIds from a list of postings
+# Non-conjunctive processing for document IDs of all documents containing any of the terms
+def getAllDocIds(terms, index):
+    docIds = set()
+
+    for t in terms: # For every term
+        cursor = index[t].cursor() # Start from the first posting
+        docIds.add(cursor.getCurrentDoc()) # Get the document ID and add it to the set
+        while cursor.hasMore(): # For each other posting
+            cursor.movePast()
+            docIds.add(cursor.getCurrentDoc())
+
+    return docIds # Return the set of document IDs
+
+####################################################################################################################################
+
+# Document At A Time Retrieval Conjunctive Processing Function
+# Based on pseudocode on p. 174 in textbook
+
+####################################################################################################################################
+
+# Q is the query, I is the index
+def daatRetrieval(Q, I):
+    L = [] # List of inverted lists
+    D = set() # Documents set where all terms of query appear
+
+    if len(Q) == 0:         # If empty query:
+        return D                # Return empty set D;
+
+    for q in Q:             # For each term in the query Q:
+        L.append(I[q].cursor()) # Add a cursor on the first posting of its inverted list to L;
+    
+    d = -1 # Initialize d to -1 meaning not all terms appear in the current document
+
+    done = False
+    while not done: # While there are still elements in the lists to check:
+        for l in L: # For each inverted list:
+            if l.getCurrentDoc() > d: # If the current document is greater:
+                d = l.getCurrentDoc() # Set that as the earliest document candidate d;
+
+        for l in L: # For each inverted list:
+            l.skipTo(d) # Skip them to the candidate document;
+
+            if l.getCurrentDoc() == d: # If the term appears in this document:
+                l.movePast() # Move on;
+            else: # Otherwise if the term does not appear in document d:
+                d = -1 # Set to -1 to indicate that this document is no longer a candidate;
+
+            if not l.hasMore(): # If the list does not have more to check:
+                done = True # Set done to True and the while loop will end;
+
+        if d > -1: # If the document d is not -1:
+            D.add(d) # d is a document where all terms appear. Add them to the set;
+
+    return D # Return set D of documents where all terms in Q appear;
+
+####################################################################################################################################
+
+# Phrase and proximity matching
+# Works on the position lists of all the terms of a query in one document at once, in a single forward pass over each list.
+# Three operators (named like the Indri query language):
+    # Exact phrase: the terms at consecutive positions. The rarest term's positions are the candidates: each one gives the position
+    # the phrase would have to start at, and the other terms are checked at that start + their index in the query.
+    # #odN (ordered window): the terms in query order, each at most N positions after the one before it. #od1 is the exact phrase.
+    # #uwN (unordered window): all the terms, in any order, within a window of N positions.
+# Matches are returned as the sorted list of positions where they start.
+
+####################################################################################################################################
+
+def alignPhrase(positionLists): # Start positions of the exact phrase. positionLists[i] is the positions of the i-th query term
+    order = sorted(range(len(positionLists)), key = lambda i: len(positionLists[i])) # Rarest term first
+    rarest = order[0]
+    pointers = [0] * len(positionLists) # How far each position list has been read. Starts only increase so they never go back
+
+    starts = []
+    for x in positionLists[rarest]:
+        start = x - rarest # Where the phrase starts if this occurrence of the rarest term is part of it
+        if start < 0:
+            continue
+        for i in order[1:]:
+            positions = positionLists[i]
+            pointers[i] = bisect_left(positions, start + i, pointers[i]) # First position at or after where term i has to be
+            if pointers[i] == len(positions) or positions[pointers[i]] != start + i:
+                break
+        else:
+            starts.append(start)
+    return starts
+
+def alignOrdered(positionLists, n): # Start positions of #odN matches
+    valid = positionLists[-1] # Positions of term i that begin a complete match of terms i to the last, starting with the last term
+    for i in range(len(positionLists) - 2, -1, -1):
+        kept = []
+        j = 0
+        for x in positionLists[i]: # Keep x if term i + 1 has a valid position in (x, x + n]
+            while j < len(valid) and valid[j] <= x:
+                j += 1
+            if j < len(valid) and valid[j] <= x + n:
+                kept.append(x)
+        valid = kept
+    return valid
+
+def alignUnordered(positionLists, n): # Start positions of #uwN matches (the smallest windows holding every term, no wider than n)
+    needed = dict() # Term index -> how many occurrences the window needs. A term repeated in the query needs that many occurrences
+    events = [] # (position, term) for every position of every distinct term, in position order
+    for i, positions in enumerate(positionLists):
+        first = positionLists.index(positions) # Repeated terms share their first index
+        needed[first] = needed.get(first, 0) + 1
+        if first == i:
+            events.extend((p, i) for p in positions)
+    events.sort()
+
+    counts = dict()
+    missing = len(positionLists) # Occurrences still needed for the window to hold every term
+    starts = []
+    left = 0
+    for position, term in events: # Slide the right end of the window
+        counts[term] = counts.get(term, 0) + 1
+        if counts[term] <= needed[term]:
+            missing -= 1
+        while missing == 0: # Shrink from the left while the window still holds every term
+            leftPosition, leftTerm = events[left]
+            if counts[leftTerm] == needed[leftTerm]: # The window can't lose this one, so it is the smallest window ending here
+                if position - leftPosition < n and (len(starts) == 0 or starts[-1] != leftPosition):
+                    starts.append(leftPosition)
+                break
+            counts[leftTerm] -= 1
+            left += 1
+    return starts
+
+PROXIMITY_OPERATORS = ('#od', '#uw')
+
+def checkOperator(operator): # Raises ValueError for an operator matchPositions doesn't have
+    if operator not in PROXIMITY_OPERATORS:
+        raise ValueError("Unknown proximity operator " + str(operator) + ", use '#od' or '#uw'")
+
+def matchPositions(positionLists, operator = '#od', n = 1): # Dispatches to the operator. '#od' with n = 1 is the exact phrase
+    checkOperator(operator)
+    if len(positionLists) == 0:
+        return []
+    if operator == '#uw':
+        return alignUnordered(positionLists, n)
+    if n == 1:
+        return alignPhrase(positionLists)
+    return alignOrdered(positionLists, n)
+
+# Positions of query's terms in document docId, or None if one of them does not appear in it
+def documentPositions(query, index, docId):
+    positionLists = []
+    for t in query:
+        if t not in index:
+            return None
+        cursor = index[t].cursor()
+        cursor.skipTo(docId)
+        if cursor.isDone() or cursor.getCurrentDoc() != docId:
+            return None
+        positionLists.append(cursor.getCurrentPositions())
+    return positionLists
+
+# Start positions of the matches of query (a list of terms, in order) in document docId
+def proximityPositions(query, index, docId, operator = '#od', n = 1):
+    positionLists = documentPositions(query, index, docId)
+    return matchPositions(positionLists, operator, n) if positionLists is not None else []
+
+# Yields every docId that all the cursors have, with every cursor on that document when it is yielded. The cursors must be new.
+# Candidates come from the list with the fewest documents. The others skip to each candidate, and when one of them
+# lands past it the rarest list skips ahead to that document instead.
+# With ranges (see Document ranges below) only documents inside them are yielded, and the rarest list skips over the gaps between them.
+def conjunctiveDocs(cursors, ranges = None):
+    if len(cursors) == 0:
+        return
+    lists = sorted(cursors, key = lambda l: l.getDocCount())
+    rarest = lists[0]
+
+    r = 0 # Index of the range the candidates are in
+    while not rarest.isDone():
+        d = rarest.getCurrentDoc()
+        if ranges is not None:
+            r = findRange(ranges, d, r)
+            if r == len(ranges):
+                return # Past the last range
+            if d < ranges[r].start: # Before the next range, skip to its start
+                advanceTo(rarest, ranges[r].start)
+                continue
+        target = d
+        for l in lists[1:]:
+            l.skipTo(d)
+            if l.isDone() or l.getCurrentDoc() < d:
+                return # This list has no documents from d on, so no more documents can have every term
+            if l.getCurrentDoc() > d:
+                target = l.getCurrentDoc()
+                break
+
+        if target == d:
+            yield d
+            rarest.movePast()
+        else:
+            rarest.skipTo(target)
+            if rarest.getCurrentDoc() < target:
+                return
+
+# Every document with a match of query (only those inside ranges if given). Returns a dictionary of docId -> start positions of its matches
+# With a QueryTrace (see tracing.py) the time taken finding candidates and matching positions is added to its 'candidates' and
+# 'match' operators. The index should then be trace.traceIndex(index) for the cursors to be counted too
+def proximityRetrieval(query, index, operator = '#od', n = 1, ranges = None, trace = None):
+    checkOperator(operator) # Before looking for candidates, so an unknown operator fails even when there are none
+    matches = dict()
+    if len(query) == 0 or any(t not in index for t in query):
+        return matches
+
+    cursors = dict((t, index[t].cursor()) for t in query) # A repeated term shares one cursor
+    candidates = conjunctiveDocs(list(cursors.values()), ranges)
+    match = matchPositions
+    if trace is not None:
+        candidates = trace.timeIterator('candidates', candidates, 'candidateDocs')
+        match = trace.traceMatch(matchPositions)
+    for d in candidates:
+        positions = dict((t, cursor.getCurrentPositions()) for t, cursor in cursors.items())
+        found = match([positions[t] for t in query], operator, n)
+        if len(found) > 0:
+            matches[d] = found
+    return matches
+
+# Phrase finding function
+# query is a list of terms that make up the query (in order).
+# docId is the document to look in (usually one where all terms appear, obtained by running daatRetrieval(Q, I)).
+# Returns True if the terms appear next to each other in that order in the document
+def findPhrase(query, index, docId):
+    return len(proximityPositions(query, index, docId)) > 0
+
+####################################################################################################################################
+
+# Term statistics
+# getTermStats(index, term) returns (df, cf, maxTf) for a term:
+    # df: number of documents the term appears in
+    # cf: number of times the term appears in the whole collection
+    # maxTf: highest number of times the term appears in one document
+# CompactIndex, DiskIndex and SegmentedIndex keep them for every term from when the index was built, so for those it is a lookup.
+# For a dictionary of term -> PostingList they are added up from the tfs of the Postings, which reads no positions.
+
+####################################################################################################################################
+
+def getTermStats(index, term): # (0, 0, 0) for a term that is in no document
+    if hasattr(index, 'getTermStats'):
+        return index.getTermStats(term)
+    tfs = index[term].getTfs() if term in index else []
+    return (len(tfs), sum(tfs), max(tfs, default = 0))
+
+####################################################################################################################################
+
+# Document ranges
+# A filter on metadata, like playId = hamlet, is a sorted list of docId ranges (range objects that don't overlap) holding the documents
+# that pass it, see MetaTable.getPlayRanges. Functions that take ranges skip their cursors from the end of one range to the start of
+# the next, so postings outside them are never visited and the metadata of the documents found is never looked up.
+# distinctPlays answers "which plays have the term" the same way: once a document of a play is found, the cursor skips past the
+# rest of that play's documents.
+
+####################################################################################################################################
+
+def findRange(ranges, d, r = 0): # Index of the first range from ranges[r] on that ends after d, or len(ranges) if there is none
+    return bisect_right(ranges, d, r, key = rangeStop)
+
+def rangeStop(docIds):
+    return docIds.stop
+
+def advanceTo(cursor, d): # Like skipTo, but moves past the last Posting (isDone() is then True) if every docId is less than d
+    cursor.skipTo(d)
+    if not cursor.isDone() and cursor.getCurrentDoc() < d:
+        cursor.movePast()
+
+# Set of the docIds inside ranges of all documents containing any of the terms
+def rangeDocIds(terms, index, ranges):
+    docIds = set()
+    for t in terms:
+        if t not in index:
+            continue
+        cursor = index[t].cursor()
+        for docRange in ranges:
+            advanceTo(cursor, docRange.start)
+            while not cursor.isDone() and cursor.getCurrentDoc() < docRange.stop:
+                docIds.add(cursor.getCurrentDoc())
+                cursor.movePast()
+            if cursor.isDone():
+                break
+    return docIds
+
+# Sorted playIds of the documents containing any of the terms
+def distinctPlays(terms, index, meta):
+    if not isinstance(meta, MetaTable):
+        meta = MetaTable(meta)
+    plays = set()
+    for t in terms:
+        if t not in index:
+            continue
+        cursor = index[t].cursor()
+        while not cursor.isDone():
+            run = meta.getPlayRun(cursor.getCurrentDoc()) # This document and the ones of the same play next to it
+            plays.add(meta.getPlayId(run.start))
+            advanceTo(cursor, run.stop) # The rest of the run can't add another play
+    return sorted(plays)
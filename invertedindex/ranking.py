@@ -0,0 +1,202 @@
+import heapq
+import math
+from .compact import MetaTable
+from .query import getTermStats, findRange, advanceTo
+
+####################################################################################################################################
+
+# Ranked retrieval
+# Scores documents for a query and returns the k best as a list of (score, docId), best first.
+# The scorers need the length of every document (the 'length' of its metadata entry) and the df, cf and maxTf of the query terms
+# (see getTermStats), which the index keeps from when it was built.
+# Every scorer gives each query term an upper bound on what it can add to a document's score. rankedRetrieval uses those to skip
+# documents that can't make the top k (MaxScore), exhaustiveRetrieval scores every document that has any of the terms.
+# Only scorers with pruning = True are pruned. DirichletScorer's bounds are too loose for MaxScore to pay off (see DirichletScorer),
+# so rankedRetrieval scores every candidate for it, like exhaustiveRetrieval but with its support for docId ranges.
+
+####################################################################################################################################
+
+class CollectionStats:
+    def __init__(self, index, meta):
+        self.index = index
+        self.docLengths = meta.getLengths() if isinstance(meta, MetaTable) else [m['length'] for m in meta] # Number of words of every document
+        self.docCount = len(self.docLengths)
+        self.totalLength = sum(self.docLengths)
+        self.avgLength = self.totalLength / self.docCount if self.docCount > 0 else 0
+        self.minLength = min(self.docLengths) if self.docCount > 0 else 0
+        self.terms = dict() # Term -> (df, cf, maxTf) of every term asked for
+
+    def termStats(self, term): # Returns (df, cf, maxTf)
+        stats = self.terms.get(term)
+        if stats is None:
+            stats = getTermStats(self.index, term)
+            self.terms[term] = stats
+        return stats
+
+# BM25 with k1 and b. A document's score is the sum over the query terms it has of idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avgLength))
+class BM25Scorer:
+    pruning = True
+
+    def __init__(self, stats, k1 = 1.2, b = 0.75):
+        self.stats = stats
+        self.k1 = k1
+        self.b = b
+        self.norms = [k1 * (1 - b + b * length / stats.avgLength) for length in stats.docLengths] # Per document
+        self.idfs = dict() # Term -> idf
+
+    def idf(self, term): # Always positive, so a term can only add to a score
+        idf = self.idfs.get(term)
+        if idf is None:
+            df = self.stats.termStats(term)[0]
+            idf = math.log((self.stats.docCount - df + 0.5) / (df + 0.5) + 1)
+            self.idfs[term] = idf
+        return idf
+
+    def score(self, term, tf, d): # What term adds to the score of document d, where it appears tf times
+        return self.idf(term) * tf * (self.k1 + 1) / (tf + self.norms[d])
+
+    def bound(self, term): # Upper bound of score(): the highest tf in the shortest document
+        maxTf = self.stats.termStats(term)[2]
+        norm = self.k1 * (1 - self.b + self.b * self.stats.minLength / self.stats.avgLength)
+        return self.idf(term) * maxTf * (self.k1 + 1) / (maxTf + norm)
+
+    def docScore(self, terms, d): # Part of the score that depends only on the document
+        return 0.0
+
+    def docBound(self, terms): # Upper bound of docScore()
+        return 0.0
+
+# Query likelihood with Dirichlet smoothing (mu). A document's score is the sum over all query terms of
+# log((tf + mu * cf / totalLength) / (length + mu)), split into a part for each term the document has: log(1 + tf / (mu * cf / totalLength))
+# and a part for the document: len(terms) * log(mu / (length + mu)) + the sum of log(cf / totalLength)
+# The term part grows with tf and the document part shrinks with length, so the bounds take the highest tf with the shortest document.
+# Long documents hold both the high tfs and the low document parts, so the bounds are far above any real score. Common terms are in
+# almost every document, so no candidate can be skipped either. Pruning with them (even bounding tf by length / tf ratios per term)
+# was measured at 0.6 to 1.9 times the speed of scoring every candidate, so it is off (pruning = False)
+class DirichletScorer:
+    pruning = False
+
+    def __init__(self, stats, mu = 2000):
+        self.stats = stats
+        self.mu = mu
+        self.docParts = [math.log(mu / (length + mu)) for length in stats.docLengths] # Per document
+        self.backgrounds = dict() # Term -> probability of the term in the whole collection
+
+    def background(self, term): # Terms not in the collection count as appearing once
+        background = self.backgrounds.get(term)
+        if background is None:
+            background = max(self.stats.termStats(term)[1], 1) / self.stats.totalLength
+            self.backgrounds[term] = background
+        return background
+
+    def score(self, term, tf, d):
+        return math.log(1 + tf / (self.mu * self.background(term)))
+
+    def bound(self, term):
+        return math.log(1 + self.stats.termStats(term)[2] / (self.mu * self.background(term)))
+
+    def docScore(self, terms, d):
+        return len(terms) * self.docParts[d] + sum(math.log(self.background(t)) for t in terms)
+
+    def docBound(self, terms): # The shortest document has the highest docScore()
+        return len(terms) * max(self.docParts, default = 0.0) + sum(math.log(self.background(t)) for t in terms)
+
+# Keeps the k best (score, docId) in heap. Ties go to the lower docId. Returns the lowest score in the heap once it is full
+def pushResult(heap, k, score, d):
+    entry = (score, -d)
+    if len(heap) < k:
+        heapq.heappush(heap, entry)
+    elif entry > heap[0]:
+        heapq.heapreplace(heap, entry)
+    return heap[0][0] if len(heap) == k else -math.inf
+
+def sortedResults(heap): # Best first
+    return [(score, -d) for score, d in sorted(heap, reverse = True)]
+
+# Q is the query, I is the index, scorer is a BM25Scorer or DirichletScorer for I. Scores every document with any term of Q
+# Returns the k best (score, docId), best first. k <= 0 returns no results
+def exhaustiveRetrieval(Q, I, scorer, k = 10):
+    if k <= 0: # No document makes a top k that small
+        return []
+    heap = []
+    terms = [q for q in Q if q in I]
+    L = [I[q].cursor() for q in terms]
+
+    while True:
+        d = min((l.getCurrentDoc() for l in L if not l.isDone()), default = None) # Next document with any of the terms
+        if d is None:
+            break
+        score = scorer.docScore(Q, d)
+        for q, l in zip(terms, L):
+            if not l.isDone() and l.getCurrentDoc() == d:
+                score += scorer.score(q, l.getCurrentTf(), d)
+                l.movePast()
+        pushResult(heap, k, score, d)
+
+    return sortedResults(heap)
+
+# Same results as exhaustiveRetrieval, but with MaxScore if the scorer allows it (pruning):
+# The terms are sorted by their bound. Once the heap is full, the terms whose bounds add up to no more than the lowest score in it
+# (the threshold) are non-essential: a document with only those can't get into the top k. Candidate documents only come from the
+# essential terms, and scoring a candidate stops as soon as the bounds of its remaining terms can't lift it over the threshold.
+# With ranges (see Document ranges in query.py) only documents inside them are scored.
+# With a QueryTrace (see tracing.py) the number of candidate documents is added to its candidateDocs counter.
+def rankedRetrieval(Q, I, scorer, k = 10, ranges = None, trace = None):
+    if k <= 0: # No document makes a top k that small
+        return []
+    heap = []
+    candidates = 0
+    terms = sorted((q for q in Q if q in I), key = scorer.bound)
+    L = [I[q].cursor() for q in terms]
+
+    bounds = [scorer.bound(q) for q in terms]
+    prefix = [] # prefix[i] is the sum of bounds[0..i]
+    total = 0.0
+    for bound in bounds:
+        total += bound
+        prefix.append(total)
+    docBound = scorer.docBound(Q)
+
+    threshold = -math.inf
+    essential = 0 # Index of the first essential term
+    r = 0 # Index of the range the candidates are in
+    while essential < len(L):
+        d = min((l.getCurrentDoc() for l in L[essential:] if not l.isDone()), default = None) # Next candidate
+        if d is None:
+            break
+        if ranges is not None:
+            r = findRange(ranges, d, r)
+            if r == len(ranges):
+                break # Past the last range
+            if d < ranges[r].start: # Before the next range, skip the essential terms to its start
+                for l in L[essential:]:
+                    advanceTo(l, ranges[r].start)
+                continue
+
+        candidates += 1
+        score = scorer.docScore(Q, d)
+        for i in range(essential, len(L)): # Essential terms first
+            l = L[i]
+            if not l.isDone() and l.getCurrentDoc() == d:
+                score += scorer.score(terms[i], l.getCurrentTf(), d)
+                l.movePast()
+
+        for i in range(essential - 1, -1, -1): # Then non-essential terms, highest bound first
+            if score + prefix[i] <= threshold: # Even with every remaining term it can't beat the threshold
+                score = None
+                break
+            l = L[i]
+            l.skipTo(d)
+            if not l.isDone() and l.getCurrentDoc() == d:
+                score += scorer.score(terms[i], l.getCurrentTf(), d)
+
+        if score is not None:
+            newThreshold = pushResult(heap, k, score, d)
+            if scorer.pruning and newThreshold > threshold: # Without pruning every term stays essential
+                threshold = newThreshold
+                while essential < len(L) and prefix[essential] + docBound <= threshold:
+                    essential += 1 # Move terms to the non-essential side while their bounds together stay under the threshold
+
+    if trace is not None:
+        trace.count('candidateDocs', candidates)
+    return sortedResults(heap)
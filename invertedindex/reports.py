@@ -0,0 +1,242 @@
+from .query import terms_0, getAllDocIds, daatRetrieval, findPhrase, distinctPlays
+
+####################################################################################################################################
+
+# Reports
+# writeReports runs the queries of the assignment and writes their results to terms0.txt .. terms3.txt and phrase0.txt .. phrase2.txt
+# in the current directory. plotCounts plots the counts of "thee", "thou" and "you" in the scenes where they appear together.
+# matplotlib is only imported when plotCounts is called.
+# phraseScenes finds the scenes of a phrase the way the phrase reports do, for checking them (python Indexer.py check-phrases, tests).
+
+####################################################################################################################################
+
+def phraseScenes(phrase, index, meta): # Sorted sceneIds of the scenes where the phrase appears (daatRetrieval, then findPhrase)
+    scenes = set()
+    for d in daatRetrieval(phrase, index):
+        if findPhrase(phrase, index, d):
+            scenes.add(meta[d]['sceneId'])
+    return sorted(scenes)
+
+def writeReports(index, meta):
+    # Terms 0: Scenes where 'thee' and 'thou' > 'you'
+
+    # Posting lists for the three terms
+    pThee = index['thee']
+    pThou = index['thou']
+    pYou = index['you']
+
+    docIds0 = terms_0(pThee, pYou) # Function call to terms_0 returns set of docIds where term1('thee') is more frequent than term2('you')
+    docIds0.update(terms_0(pThou, pYou)) # Add the call on 'thou' as term1 to the result set
+
+    terms_scenes0 = set()
+    for d in docIds0:
+        terms_scenes0.add(meta[d]['sceneId'])
+
+    # File writing
+    terms_file0 = open("terms0.txt", "w")
+
+    # Sorting
+    scenes = []
+    for s in terms_scenes0:
+        scenes.append(s)
+    sorted_scenes = sorted(scenes)
+
+    terms_file0.write("Terms 0: Scenes where \"thou\" or \"thee\" are used more than \"you\"\n")
+    for s in sorted_scenes:
+        terms_file0.writelines(s + '\n')
+
+    terms_file0.close()
+
+    ################################################################################################################################
+    # Terms 1: Scenes w/ 'verona', 'rome', or 'italy'
+
+    # All documents where the term(s) appear (non-conjunctive)
+    terms1 = ['verona', 'rome', 'italy']
+    docIds1 = getAllDocIds(terms1, index)
+
+    # All scenes of the documents found
+    terms_scenes1 = set()
+    for d in docIds1:
+        terms_scenes1.add(meta[d]['sceneId'])
+
+    # Sorting
+    scenes = []
+    for s in terms_scenes1:
+        scenes.append(s)
+    sorted_scenes = sorted(scenes)
+
+    # File writing
+    terms_file1 = open("terms1.txt", "w")
+
+    terms_file1.write("Terms 1: Scenes where \"verona\", \"rome\", or \"italy\" are mentioned\n")
+    for s in sorted_scenes:
+        terms_file1.write(s + '\n')
+
+    terms_file1.close()
+
+    ################################################################################################################################
+    # Terms 2: Plays w/ 'falstaff'
+
+    # All plays where the term(s) appear, sorted. Once a scene of a play is found the rest of the play is skipped
+    terms2 = ['falstaff']
+    sorted_plays = distinctPlays(terms2, index, meta)
+
+    # File writing
+    terms_file2 = open("terms2.txt", "w")
+    terms_file2.write("Terms 2: Plays where \"falstaff\" is mentioned\n")
+    for p in sorted_plays:
+        terms_file2.write(p + '\n')
+
+    terms_file2.close()
+
+    ################################################################################################################################
+    # Terms 3: Plays w/ 'soldier'
+
+    # All plays where the term(s) appear, sorted. Once a scene of a play is found the rest of the play is skipped
+    terms3 = ['soldier']
+    sorted_plays = distinctPlays(terms3, index, meta)
+
+    # File writing
+    terms_file3 = open("terms3.txt", "w")
+
+    terms_file3.write("Terms 3: Plays where \'soldier\' is mentioned\n")
+    for p in sorted_plays:
+        terms_file3.write(p + '\n')
+
+    terms_file3.close()
+
+    ################################################################################################################################
+    # Phrase 0: "Lady MacBeth"
+
+    # All documents where all terms appear
+    phrase0 = ['lady', 'macbeth']
+    shared_docs0 = daatRetrieval(phrase0, index)
+
+    # All scenes where the phrase appears (conjunctive)
+    phrase_scenes0 = set()
+    for d in shared_docs0:
+        if findPhrase(phrase0, index, d):
+            phrase_scenes0.add(meta[d]['sceneId'])
+
+    # Sorting
+    scenes = []
+    for s in phrase_scenes0:
+        scenes.append(s)
+    sorted_scenes = sorted(scenes)
+
+    # File writing
+    phrase0_file = open("phrase0.txt", "w")
+
+    phrase0_file.write("Phrase 0: Scenes where \"Lady MacBeth\" is mentioned:\n")
+    for s in sorted_scenes:
+        phrase0_file.write(s + '\n')
+
+    phrase0_file.close()
+
+    ################################################################################################################################
+    # Phrase 1: "A rose by any other name"
+
+    # All documents where all terms appear
+    phrase1 = ['a', 'rose', 'by', 'any', 'other', 'name']
+    shared_docs1 = daatRetrieval(phrase1, index)
+
+    # All scenes where the phrase appears (conjunctive)
+    phrase_scenes1 = set()
+    for d in shared_docs1:
+        if findPhrase(phrase1, index, d):
+            phrase_scenes1.add(meta[d]['sceneId'])
+
+    # Sorting
+    scenes = []
+    for s in phrase_scenes1:
+        scenes.append(s)
+    sorted_scenes = sorted(scenes)
+
+    # File writing
+    phrase1_file = open("phrase1.txt", "w")
+
+    phrase1_file.write("Phrase 1: Scenes where \"A rose by any other name\" is mentioned:\n")
+    for s in sorted_scenes:
+        phrase1_file.write(s + '\n')
+
+    phrase1_file.close()
+
+    ################################################################################################################################
+    # Phrase 2: "Cry havoc"
+
+    # All documents where all terms appear
+    phrase2 = ['cry', 'havoc']
+    shared_docs2 = daatRetrieval(phrase2, index)
+
+    # All scenes where the phrase appears (conjunctive)
+    phrase_scenes2 = set()
+    for d in shared_docs2:
+        if findPhrase(phrase2, index, d):
+            phrase_scenes2.add(meta[d]['sceneId'])
+
+    # Sorting
+    scenes = []
+    for s in phrase_scenes2:
+        scenes.append(s)
+    sorted_scenes = sorted(scenes)
+
+    # File writing
+    phrase2_file = open("phrase2.txt", "w")
+
+    phrase2_file.write("Phrase 2: Scenes where \"Cry havoc\" is mentioned:\n")
+    for s in sorted_scenes:
+        phrase2_file.write(s + '\n')
+
+    phrase2_file.close()
+
+####################################################################################################################################
+
+
+# Graph plotting
+
+
+####################################################################################################################################
+
+def plotCounts(index, meta):
+    import matplotlib.pyplot as plt # Only here: importing it takes longer than loading the index
+
+    theeyou_docs = daatRetrieval(['thee', 'you'], index)
+
+    thee_x = []
+    thee_y = []
+    you_y1 = []
+
+    for d in theeyou_docs: # Counts are the tfs of the Postings, no positions are decoded
+        thee_x.append(meta[d]['sceneNum'])
+        thee_y.append(index['thee'].getTf(d))
+        you_y1.append(index['you'].getTf(d))
+
+    thouyou_docs = daatRetrieval(['thou', 'you'], index)
+
+    thou_x = []
+    thou_y = []
+    you_y2 = []
+
+    you_x = thee_x
+    for i in thou_x:
+        you_x.append(i)
+
+    you_y = you_y1
+    for i in you_y2:
+        you_y.append(you_y2)
+
+    for d in thouyou_docs:
+        thou_x.append(meta[d]['sceneNum'])
+        thou_y.append(index['thou'].getTf(d))
+        you_y2.append(index['you'].getTf(d))
+
+
+    fig = plt.Figure()
+    plt.suptitle("\"Thee\" or \"Thou\" vs \"You\" Word Count Over Scene Num")
+    plt.xlabel("SceneNum")
+    plt.ylabel("Word count")
+    plt.plot(thee_x, thee_y, label = "\"thee\" counts", color = 'red')
+    plt.plot(thou_x, thou_y, label = "\"thou\" counts", color = 'blue')
+    plt.plot(you_x, you_y, label = "\"you\" counts", color = 'green')
+    plt.legend(loc = "upper left")
+    plt.show()
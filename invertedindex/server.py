@@ -0,0 +1,266 @@
+import asyncio
+import concurrent.futures
+import json
+import math
+import multiprocessing
+import signal
+import time
+from .index import Index, QUERY_TYPES
+from .query import PROXIMITY_OPERATORS
+from .tracing import QueryTrace, TraceStats
+
+####################################################################################################################################
+
+# Query server
+# Loads the index once and answers queries over HTTP/JSON (on a TCP port or a Unix socket) until stopped.
+# Requests are read by an asyncio event loop and the queries are run by a pool of worker processes. The workers are forked after the
+# index is loaded, so they share its memory. Where processes can't be forked they are spawned and load the index from its directory
+# themselves. Every query has its own posting list cursors, so a worker could also be a thread, but
+# threads would take turns on one CPU. Before every query a worker refreshes its index (Index.refresh), so documents added with
+# python Indexer.py add while the server runs are found.
+# Endpoints:
+    # GET /health: {"status": "ok"}
+    # GET /stats: request and error counters, and the totals of the traces of the queries traced (see tracing.py)
+    # POST /query with a json body:
+        # {"type": "or" | "and", "terms": [...]}
+        # {"type": "phrase", "terms": [...], "operator": "#od" | "#uw" (default "#od"), "n": window size (default 1, the exact phrase)}
+        # {"type": "ranked", "terms": [...], "k": 10, "scorer": "bm25" | "dirichlet"}
+        # Any of them can have "playId": "hamlet" to only look at the documents of that play, and all but "ranked" can have
+        # "exclude": [...], terms the documents found must not have
+        # With "trace": true the query is traced and its trace is in the answer
+      # Answers {"results": [{"docId", "sceneId", "playId"} (and "score" for ranked, "positions" for phrase)], "count", "elapsed"}
+# Started with --trace every query is traced, whether it asks for it or not.
+
+####################################################################################################################################
+
+SERVER_STATE = dict() # Index of this process and whether to trace every query. Set before the workers are forked so they inherit them
+
+def describeDoc(d): # Result entry for document d
+    m = SERVER_STATE['index'].getMeta()[d]
+    return { 'docId':d, 'sceneId':m['sceneId'], 'playId':m['playId'] }
+
+def intField(query, name, default, minimum): # query[name] as an int, default if it is missing. Raises ValueError if it is anything else
+    value = query.get(name, default)
+    if not isinstance(value, int) or isinstance(value, bool) or value < minimum:
+        raise ValueError(name + " must be an integer of at least " + str(minimum))
+    return value
+
+def executeQuery(query): # Runs one /query request in a worker. Raises ValueError for bad requests
+    start = time.perf_counter()
+    index = SERVER_STATE['index']
+    index.refresh() # Documents may have been added to the index directory since the last query
+    queryType = query.get('type') if isinstance(query, dict) else None
+    terms = query.get('terms') if isinstance(query, dict) else None
+    if queryType not in QUERY_TYPES:
+        raise ValueError("type must be one of " + ', '.join(QUERY_TYPES))
+    if not isinstance(terms, list) or not all(isinstance(t, str) for t in terms):
+        raise ValueError("terms must be a list of strings")
+    playId = query.get('playId')
+    if playId is not None and not isinstance(playId, str):
+        raise ValueError("playId must be a string")
+    exclude = query.get('exclude', [])
+    if not isinstance(exclude, list) or not all(isinstance(t, str) for t in exclude) or (len(exclude) > 0 and queryType == 'ranked'):
+        raise ValueError("exclude must be a list of strings, and only works with or, and and phrase")
+    operator = query.get('operator', '#od')
+    if queryType == 'phrase' and operator not in PROXIMITY_OPERATORS:
+        raise ValueError("operator must be one of " + ', '.join(PROXIMITY_OPERATORS))
+    trace = QueryTrace() if query.get('trace') or SERVER_STATE['trace'] else None
+
+    if queryType in ('or', 'and'):
+        results = [describeDoc(d) for d in index.query(terms, queryType, playId = playId, exclude = exclude, trace = trace)]
+    elif queryType == 'phrase':
+        matches = index.query(terms, 'phrase', operator = operator, n = intField(query, 'n', 1, 1), playId = playId,
+            exclude = exclude, trace = trace)
+        results = []
+        for d in sorted(matches):
+            result = describeDoc(d)
+            result['positions'] = matches[d]
+            results.append(result)
+    else:
+        results = []
+        for score, d in index.query(terms, 'ranked', k = intField(query, 'k', 10, 0), scorer = query.get('scorer', 'bm25'), playId = playId,
+                trace = trace):
+            result = describeDoc(d)
+            result['score'] = score
+            results.append(result)
+
+    answer = { 'results':results, 'count':len(results), 'elapsed':time.perf_counter() - start }
+    if trace is not None:
+        answer['trace'] = trace.toDict()
+    return answer
+
+def ignoreInterrupt(): # Ctrl-C goes to the whole process group. Only the server should handle it, then it stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def startWorker(path, trace): # Initializer of spawned workers, which don't inherit SERVER_STATE: they load the index at path
+    ignoreInterrupt()
+    index = Index.load(path)
+    index.getScorer('bm25')
+    index.getScorer('dirichlet')
+    SERVER_STATE['index'] = index
+    SERVER_STATE['trace'] = trace
+
+HTTP_REASONS = { 200:'OK', 400:'Bad Request', 404:'Not Found', 405:'Method Not Allowed', 500:'Internal Server Error' }
+
+class QueryServer:
+    def __init__(self, index, workers = 1, trace = False): # index is an Index. With trace every query is traced
+        index.getScorer('bm25') # Make the scorers here so every worker inherits them instead of making its own
+        index.getScorer('dirichlet')
+        SERVER_STATE['index'] = index
+        SERVER_STATE['trace'] = trace
+        if 'fork' in multiprocessing.get_all_start_methods():
+            self.pool = concurrent.futures.ProcessPoolExecutor(workers, mp_context = multiprocessing.get_context('fork'),
+                initializer = ignoreInterrupt)
+        elif index.path is not None:
+            self.pool = concurrent.futures.ProcessPoolExecutor(workers, mp_context = multiprocessing.get_context('spawn'),
+                initializer = startWorker, initargs = (index.path, trace))
+        else:
+            raise ValueError("Workers can't be forked here, so the index must be loaded from a directory for them to load it too")
+        self.requests = 0
+        self.errors = 0
+        self.traces = TraceStats() # Totals of the traces the workers send back
+
+    async def route(self, method, path, body): # Returns (status, json payload)
+        if path == '/health':
+            return 200, { 'status':'ok' }
+        if path == '/stats':
+            return 200, { 'requests':self.requests, 'errors':self.errors, 'trace':self.traces.toDict() }
+        if path != '/query':
+            return 404, { 'error':"unknown path " + path }
+        if method != 'POST':
+            return 405, { 'error':"use POST for /query" }
+        try:
+            query = json.loads(body.decode('utf-8'))
+            answer = await asyncio.get_running_loop().run_in_executor(self.pool, executeQuery, query)
+        except ValueError as e: # Includes json.JSONDecodeError
+            return 400, { 'error':str(e) }
+        if 'trace' in answer:
+            self.traces.add(answer['trace'])
+            if not query.get('trace'): # Traced because of --trace, the client didn't ask for it
+                del answer['trace']
+        return 200, answer
+
+    async def handleConnection(self, reader, writer): # Answers requests on one connection until the client closes it
+        try:
+            while True:
+                requestLine = await reader.readline()
+                if requestLine == b'':
+                    break
+                method, target, version = requestLine.decode('latin-1').split()
+                headers = dict()
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                self.requests += 1
+                try:
+                    status, payload = await self.route(method, target.split('?')[0], body)
+                except Exception as e: # A query that crashed a worker must not take the server down
+                    status, payload = 500, { 'error':repr(e) }
+                if status != 200:
+                    self.errors += 1
+
+                data = json.dumps(payload).encode('utf-8')
+                keepAlive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                writer.write(("HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: %s\r\n\r\n" %
+                    (status, HTTP_REASONS[status], len(data), 'keep-alive' if keepAlive else 'close')).encode('latin-1') + data)
+                await writer.drain()
+                if not keepAlive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError): # Client went away or sent something that isn't HTTP
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, address): # address is host:port, or a path for a Unix socket
+        if '/' in address:
+            server = await asyncio.start_unix_server(self.handleConnection, path = address)
+        else:
+            host, _, port = address.rpartition(':')
+            server = await asyncio.start_server(self.handleConnection, host or '127.0.0.1', int(port))
+        print("Serving on " + address)
+        async with server:
+            await server.serve_forever()
+
+    def run(self, address):
+        try:
+            asyncio.run(self.serve(address))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.pool.shutdown()
+
+####################################################################################################################################
+
+# Load test
+# Sends queries to a running query server from many connections at once and prints the latency percentiles and queries per second.
+# Run with: python Indexer.py load-test [address] [requests per level] [concurrency levels...]
+
+####################################################################################################################################
+
+LOAD_TEST_QUERIES = [
+    { 'type':'or', 'terms':['verona', 'rome', 'italy'] },
+    { 'type':'or', 'terms':['falstaff'] },
+    { 'type':'and', 'terms':['thee', 'you'] },
+    { 'type':'phrase', 'terms':['lady', 'macbeth'] },
+    { 'type':'phrase', 'terms':['a', 'rose', 'by', 'any', 'other', 'name'] },
+    { 'type':'phrase', 'terms':['cry', 'havoc'], 'operator':'#uw', 'n':8 },
+    { 'type':'ranked', 'terms':['love', 'death', 'romeo', 'juliet'] },
+    { 'type':'ranked', 'terms':['king', 'crown', 'war'], 'scorer':'dirichlet' }
+]
+
+async def openConnection(address):
+    if '/' in address:
+        return await asyncio.open_unix_connection(address)
+    host, _, port = address.rpartition(':')
+    return await asyncio.open_connection(host or '127.0.0.1', int(port))
+
+async def postQuery(reader, writer, query): # Sends one /query on an open keep-alive connection. Returns the status code
+    body = json.dumps(query).encode('utf-8')
+    writer.write(("POST /query HTTP/1.1\r\nHost: indexer\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n" % len(body)).encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+async def loadLevel(address, concurrency, requests): # Returns (latencies, seconds, errors) for requests spread over concurrency clients
+    latencies = []
+    errors = 0
+
+    async def client(count, offset):
+        nonlocal errors
+        reader, writer = await openConnection(address)
+        try:
+            for i in range(count):
+                start = time.perf_counter()
+                if await postQuery(reader, writer, LOAD_TEST_QUERIES[(offset + i) % len(LOAD_TEST_QUERIES)]) != 200:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client(requests // concurrency + (1 if c < requests % concurrency else 0), c) for c in range(concurrency)])
+    return latencies, time.perf_counter() - start, errors
+
+def percentile(values, fraction): # Nearest-rank percentile of a sorted list
+    return values[min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))]
+
+def loadTest(address, requests, levels):
+    print("%-12s %10s %10s %10s %8s" % ("concurrency", "p50 (ms)", "p99 (ms)", "QPS", "errors"))
+    for concurrency in levels:
+        latencies, elapsed, errors = asyncio.run(loadLevel(address, concurrency, requests))
+        latencies.sort()
+        print("%-12d %10.2f %10.2f %10.1f %8d" % (concurrency, percentile(latencies, 0.5) * 1000, percentile(latencies, 0.99) * 1000, len(latencies) / elapsed, errors))
@@ -0,0 +1,495 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+try:
+    import fcntl # Only on Unix. Elsewhere IndexWriters only lock out the other threads of their own process
+except ImportError:
+    fcntl = None
+from .postings import writeVarint, readVarint, CompressedPostingList
+from .compact import MetaTable
+from .build import invertShard, readTexts
+from .query import getTermStats
+
+####################################################################################################################################
+
+# On-disk index
+# An index directory holds three files:
+    # lexicon.bin: the vocabulary. A header, then every term joined by '\n', then an array of termCount + 1 byte offsets into postings.bin
+        # The posting list of the i-th term is postings.bin[offsets[i]:offsets[i + 1]]
+        # Then three arrays of termCount ints: the df, cf and maxTf of every term (see getTermStats), so they are known without
+        # reading postings.bin
+    # postings.bin: a header, then for every term the encoded data of its CompressedPostingList,
+    # preceded by its posting count, last docId, offset of the last posting and skip pointers (docId, offset and posting index of
+    # each, as gaps from the previous one) as variable-byte ints
+    # meta.json: the metadata list as json
+
+####################################################################################################################################
+
+LEXICON_MAGIC = b'IIDXLEX5'
+POSTINGS_MAGIC = b'IIDXPST5'
+HEADER = struct.Struct('<8sII') # Magic, term count, byte length of the term block (unused in postings.bin)
+
+def toLittleEndian(values): # Arrays are written in native byte order, so swap them on big-endian machines
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+def encodePostingList(postingList): # Returns the postings.bin block of a PostingList: count, lastDoc and lastOffset, then its data
+    if not isinstance(postingList, CompressedPostingList):
+        postings = postingList.getPostings()
+        compressed = CompressedPostingList()
+        for posting in postings:
+            for p in posting.getPositions():
+                compressed.add(posting.getDocId(), p)
+        postingList = compressed
+    postingList.flush()
+
+    block = bytearray()
+    writeVarint(block, postingList.count)
+    writeVarint(block, postingList.lastDoc)
+    writeVarint(block, postingList.lastOffset)
+    writeVarint(block, len(postingList.skipDocs))
+    prevDoc = 0
+    prevOffset = 0
+    prevIndex = 0
+    for skipDoc, skipOffset, skipIndex in zip(postingList.skipDocs, postingList.skipOffsets, postingList.skipIndexes): # As gaps
+        writeVarint(block, skipDoc - prevDoc)
+        writeVarint(block, skipOffset - prevOffset)
+        writeVarint(block, skipIndex - prevIndex)
+        prevDoc = skipDoc
+        prevOffset = skipOffset
+        prevIndex = skipIndex
+    return bytes(block) + bytes(postingList.data)
+
+def decodePostingList(block): # Wraps a postings.bin block in a CompressedPostingList. Nothing is decoded until it is read
+    count, i = readVarint(block, 0)
+    lastDoc, i = readVarint(block, i)
+    lastOffset, i = readVarint(block, i)
+    skipCount, i = readVarint(block, i)
+    skipDocs = array('i') if skipCount > 0 else ()
+    skipOffsets = array('q') if skipCount > 0 else ()
+    skipIndexes = array('i') if skipCount > 0 else ()
+    for _ in range(skipCount):
+        gap, i = readVarint(block, i)
+        skipDocs.append((skipDocs[-1] if skipDocs else 0) + gap)
+        gap, i = readVarint(block, i)
+        skipOffsets.append((skipOffsets[-1] if skipOffsets else 0) + gap)
+        gap, i = readVarint(block, i)
+        skipIndexes.append((skipIndexes[-1] if skipIndexes else 0) + gap)
+    postingList = CompressedPostingList()
+    postingList.setEncoded(block[i:], count, lastDoc, lastOffset, skipDocs, skipOffsets, skipIndexes)
+    return postingList
+
+# Writes an index (anything with keys() and [] that returns PostingLists) and its metadata to the directory path
+def writeIndex(index, meta, path):
+    terms = sorted(index.keys()) # Sorted so the files are the same for the same index
+    writeSortedIndex(((t, index[t], getTermStats(index, t)) for t in terms), meta, path)
+
+# Writes the index directory at path from entries: (term, PostingList, (df, cf, maxTf)) in term order. Each PostingList is written
+# as soon as it is produced, so entries can be a generator that makes them one at a time (see external.py)
+def writeSortedIndex(entries, meta, path):
+    os.makedirs(path, exist_ok = True)
+    removeSegments(path) # A new index replaces every segment documents were added to
+
+    terms = []
+    offsets = array('Q')
+    dfs = array('I')
+    cfs = array('Q')
+    maxTfs = array('I')
+
+    with open(os.path.join(path, 'postings.bin'), 'wb') as f:
+        f.write(HEADER.pack(POSTINGS_MAGIC, 0, 0)) # The term count is only known at the end
+        for t, postingList, (df, cf, maxTf) in entries:
+            terms.append(t)
+            offsets.append(f.tell())
+            f.write(encodePostingList(postingList))
+            dfs.append(df)
+            cfs.append(cf)
+            maxTfs.append(maxTf)
+        offsets.append(f.tell()) # End offset of the last posting list
+        f.seek(0)
+        f.write(HEADER.pack(POSTINGS_MAGIC, len(terms), 0))
+
+    termBlock = '\n'.join(terms).encode('utf-8')
+    with open(os.path.join(path, 'lexicon.bin'), 'wb') as f:
+        f.write(HEADER.pack(LEXICON_MAGIC, len(terms), len(termBlock)))
+        f.write(termBlock)
+        for values in (offsets, dfs, cfs, maxTfs):
+            f.write(toLittleEndian(values).tobytes())
+
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(list(meta), f)
+
+# Checks if the index directory at path exists and was written after the json file (or every file of a list of them) was last modified
+def isIndexCurrent(path, jsonfilename):
+    files = [os.path.join(path, name) for name in ('lexicon.bin', 'postings.bin', 'meta.json')]
+    if os.path.exists(os.path.join(path, 'segments.json')): # Documents were added, the segment list is written after every change
+        files = [os.path.join(path, 'segments.json')]
+    if not all(os.path.exists(name) for name in files):
+        return False
+    if len(files) > 1:
+        for name, magic in zip(files, (LEXICON_MAGIC, POSTINGS_MAGIC)):
+            with open(name, 'rb') as f:
+                if f.read(len(magic)) != magic: # Written by an older version of this script
+                    return False
+    jsonfilenames = [jsonfilename] if isinstance(jsonfilename, str) else jsonfilename
+    return min(os.path.getmtime(name) for name in files) >= max(os.path.getmtime(name) for name in jsonfilenames)
+
+# DiskIndex can be used in place of the index dictionary.
+# Opening it only reads the lexicon. postings.bin is memory-mapped, and looking up a term wraps its block in a CompressedPostingList
+# without copying it: the list's data is a memoryview of the mapped file, so the pages are read by the OS as queries read them and can
+# be dropped from memory again. Nothing is kept between lookups, decoding a block's header and skip pointers is all a lookup costs.
+class DiskIndex:
+    def __init__(self, path):
+        self.path = path
+
+        with open(os.path.join(path, 'lexicon.bin'), 'rb') as f:
+            lexicon = f.read()
+        magic, termCount, termBytes = HEADER.unpack_from(lexicon)
+        if magic != LEXICON_MAGIC:
+            raise ValueError(path + " does not contain a lexicon.bin written by writeIndex")
+
+        start = HEADER.size
+        terms = lexicon[start:start + termBytes].decode('utf-8').split('\n') if termCount > 0 else []
+        start += termBytes
+        self.offsets = array('Q')
+        self.dfs = array('I') # Index into offsets -> df, cf and maxTf
+        self.cfs = array('Q')
+        self.maxTfs = array('I')
+        for values, count in ((self.offsets, termCount + 1), (self.dfs, termCount), (self.cfs, termCount), (self.maxTfs, termCount)):
+            end = start + count * values.itemsize
+            values.frombytes(lexicon[start:end])
+            toLittleEndian(values)
+            start = end
+        self.terms = dict(zip(terms, range(termCount))) # Term -> index into offsets
+
+        self.file = open(os.path.join(path, 'postings.bin'), 'rb')
+        self.postings = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+        if self.postings[:len(POSTINGS_MAGIC)] != POSTINGS_MAGIC:
+            raise ValueError(path + " does not contain a postings.bin written by writeIndex")
+        self.view = memoryview(self.postings) # Slices of it share the mapped memory instead of copying it
+
+        self.meta = None
+        self.generation = 0 # A DiskIndex never changes
+
+    def __getitem__(self, term): # Works like index[term] on the dictionary. Raises KeyError for unknown terms
+        i = self.terms[term]
+        return decodePostingList(self.view[self.offsets[i]:self.offsets[i + 1]])
+
+    def __contains__(self, term):
+        return term in self.terms
+
+    def __len__(self):
+        return len(self.terms)
+
+    def keys(self):
+        return self.terms.keys()
+
+    def getTermStats(self, term): # (df, cf, maxTf) of term from the lexicon, (0, 0, 0) if it is in no document
+        i = self.terms.get(term)
+        if i is None:
+            return (0, 0, 0)
+        return (self.dfs[i], self.cfs[i], self.maxTfs[i])
+
+    def getMeta(self): # Accessor for the metadata, as a MetaTable. Only read from meta.json when first asked for
+        if self.meta is None:
+            with open(os.path.join(self.path, 'meta.json'), 'r') as f:
+                self.meta = MetaTable(json.load(f))
+        return self.meta
+
+    def close(self):
+        self.view.release()
+        try:
+            self.postings.close()
+        except BufferError: # Posting lists looked up are still in use. The mapping is closed once the last of them is gone
+            pass
+        self.file.close()
+
+####################################################################################################################################
+
+# Segments
+# Documents can be added to an index on disk without rebuilding it. Every batch of added documents is written as a small index of its
+# own (a segment) in a subdirectory, with docIds continuing after the last document of the index.
+# segments.json lists the segments in docId order:
+    # generation: incremented every time the list changes
+    # nextSegment: number for the name of the next segment directory
+    # segments: path (relative to the index directory, "." for the index written by writeIndex), firstDoc and docCount of each segment
+    # merging: while segments are being merged, the id of the process merging them
+# Once MERGE_FACTOR segments have been added, IndexWriter merges them into one in a background thread (into the whole index
+# once they hold as many documents as the rest of it), so queries don't have to look in more and more segments.
+# segments.json is only read and changed with segments.json.lock locked (fcntl.flock), so IndexWriters of different processes
+# (python Indexer.py add run twice at once) take turns instead of giving two segments the same name and docIds. Only one
+# process merges at a time.
+# Readers (SegmentedIndex) lock it shared while they read segments.json and open the segments it lists, metadata included, and merges
+# only delete merged segments with it locked, so a reader never lists a segment whose files are gone. Without fcntl there is no
+# lock between processes, and a reader that finds files missing reads segments.json again, up to OPEN_ATTEMPTS times.
+
+####################################################################################################################################
+
+MERGE_FACTOR = 4
+OPEN_ATTEMPTS = 5
+JOINED_BYTES = 16 * 1024 * 1024 # Bytes of joined posting lists a SegmentedIndex keeps
+
+def readManifest(path): # The segment list of the index at path. An index without segments.json is one segment
+    manifestPath = os.path.join(path, 'segments.json')
+    if os.path.exists(manifestPath):
+        with open(manifestPath, 'r') as f:
+            return json.load(f)
+
+    manifest = { 'generation':0, 'nextSegment':1, 'segments':[] }
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        with open(os.path.join(path, 'meta.json'), 'r') as f:
+            manifest['segments'].append({ 'path':'.', 'firstDoc':0, 'docCount':len(json.load(f)) })
+    return manifest
+
+def writeManifest(path, manifest): # Replaces segments.json in one step, so readers see either the old or the new list
+    manifestPath = os.path.join(path, 'segments.json')
+    with open(manifestPath + '.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(manifestPath + '.tmp', manifestPath)
+
+# Locks segments.json of the index at path for the threads of this process and for other processes.
+# A shared lock (for readers) can be held by many at once, but not while anyone holds it unshared
+class ManifestLock:
+    def __init__(self, path, shared = False):
+        self.path = path
+        self.shared = shared
+        self.lock = threading.Lock() # Only for unshared locks. Each flock is on a file of its own, so they also exclude each other
+        self.file = None
+
+    def __enter__(self):
+        if not self.shared:
+            self.lock.acquire()
+        if fcntl is not None:
+            file = open(os.path.join(self.path, 'segments.json.lock'), 'a')
+            fcntl.flock(file, fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX) # Waits for other processes to unlock it
+            self.file = file
+        return self
+
+    def __exit__(self, *exception):
+        if self.file is not None:
+            self.file.close() # Unlocks it
+            self.file = None
+        if not self.shared:
+            self.lock.release()
+
+def isRunning(pid): # Checks if the process pid still exists
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError: # It exists but belongs to someone else
+        return True
+    return True
+
+def removeSegmentFiles(path, segment): # Deletes the files of one segment
+    if segment['path'] == '.':
+        for name in ('lexicon.bin', 'postings.bin', 'meta.json'):
+            if os.path.exists(os.path.join(path, name)):
+                os.remove(os.path.join(path, name))
+    else:
+        shutil.rmtree(os.path.join(path, segment['path']), ignore_errors = True)
+
+def removeSegments(path): # Deletes segments.json and every segment directory it lists
+    manifestPath = os.path.join(path, 'segments.json')
+    if not os.path.exists(manifestPath):
+        return
+    for segment in readManifest(path)['segments']:
+        if segment['path'] != '.':
+            removeSegmentFiles(path, segment)
+    os.remove(manifestPath)
+    if os.path.exists(manifestPath + '.lock'):
+        os.remove(manifestPath + '.lock')
+
+# SegmentedIndex can be used in place of the index dictionary. It shows the union of the segments of an index directory.
+# Looking up a term that is in more than one segment joins its posting lists in segment (docId) order. The joined lists are copies, so
+# the most recently used ones are kept until they take more than JOINED_BYTES.
+class SegmentedIndex:
+    def __init__(self, path, segments = None): # segments defaults to every segment listed in segments.json
+        self.path = path
+        self.fixed = segments is not None
+        self.open(segments)
+
+    # Opens the segments (every one listed in segments.json if None) and reads their metadata, so nothing is read from them later
+    # but the posting lists, which stay mapped if the files are deleted. generation is only changed once every segment is open
+    def open(self, segments = None):
+        for attempt in range(OPEN_ATTEMPTS):
+            try:
+                manifest, indexes = self.openSegments(segments)
+                break
+            except FileNotFoundError: # Merged away between reading segments.json and opening them. Only without fcntl
+                if attempt == OPEN_ATTEMPTS - 1:
+                    raise
+        self.generation = manifest['generation']
+        self.segments = manifest['segments'] if segments is None else segments
+        self.indexes = indexes
+        self.meta = None
+        self.terms = None
+        self.joined = OrderedDict() # Term -> joined PostingList for terms in more than one segment, least recently used first
+        self.joinedBytes = 0
+        self.lock = threading.Lock()
+
+    def openSegments(self, segments): # Returns segments.json and the DiskIndexes of segments (or of every segment in it)
+        with ManifestLock(self.path, shared = True):
+            manifest = readManifest(self.path)
+            indexes = []
+            try:
+                for segment in (manifest['segments'] if segments is None else segments):
+                    index = DiskIndex(os.path.join(self.path, segment['path']))
+                    indexes.append(index)
+                    index.getMeta()
+            except Exception: # Don't leave the ones already open mapped
+                for index in indexes:
+                    index.close()
+                raise
+        return manifest, indexes
+
+    # Reopens the segments if segments.json changed since they were opened. Returns True if it did. If opening them fails, the
+    # segments open before stay open and the next refresh tries again
+    def refresh(self):
+        manifest = readManifest(self.path)
+        if self.fixed or manifest['generation'] == self.generation:
+            return False
+        old = self.indexes
+        self.open()
+        for index in old: # Their files may have been merged away, but this is the only place they were open
+            index.close()
+        return True
+
+    def __getitem__(self, term): # Works like index[term] on the dictionary. Raises KeyError for unknown terms
+        with self.lock:
+            postingList = self.joined.get(term)
+            if postingList is not None:
+                self.joined.move_to_end(term)
+                return postingList
+        lists = [index[term] for index in self.indexes if term in index]
+        if len(lists) == 0:
+            raise KeyError(term)
+        if len(lists) == 1:
+            return lists[0]
+        postingList = CompressedPostingList()
+        for segmentList in lists:
+            postingList.extend(segmentList)
+        with self.lock:
+            if term not in self.joined: # Another thread may have joined it meanwhile
+                self.joined[term] = postingList
+                self.joinedBytes += len(postingList.data)
+            while self.joinedBytes > JOINED_BYTES and len(self.joined) > 1:
+                _, evicted = self.joined.popitem(last = False)
+                self.joinedBytes -= len(evicted.data)
+        return postingList
+
+    def __contains__(self, term):
+        return any(term in index for index in self.indexes)
+
+    def __len__(self):
+        return len(self.keys())
+
+    def getTermStats(self, term): # (df, cf, maxTf) of term over every segment
+        stats = [index.getTermStats(term) for index in self.indexes]
+        return (sum(df for df, _, _ in stats), sum(cf for _, cf, _ in stats), max((maxTf for _, _, maxTf in stats), default = 0))
+
+    def keys(self):
+        if self.terms is None:
+            self.terms = set()
+            for index in self.indexes:
+                self.terms.update(index.keys())
+        return self.terms
+
+    def getMeta(self): # Accessor for the metadata of all segments, as a MetaTable
+        if self.meta is None:
+            self.meta = MetaTable()
+            for index in self.indexes:
+                self.meta.extend(index.getMeta())
+        return self.meta
+
+    def close(self):
+        for index in self.indexes:
+            index.close()
+
+# Opens the index directory at path as a DiskIndex, or as a SegmentedIndex if documents were added to it
+def openIndex(path):
+    if os.path.exists(os.path.join(path, 'segments.json')):
+        return SegmentedIndex(path)
+    return DiskIndex(path)
+
+# IndexWriter adds documents to the index directory at path
+class IndexWriter:
+    def __init__(self, path):
+        self.path = path
+        self.lock = ManifestLock(path) # Held while the segment list is read and changed
+        self.merger = None # Background merge thread
+
+    # Adds documents (dictionaries with 'playId', 'sceneId', 'sceneNum' and 'text') as a new segment.
+    # Only the new documents are inverted and written. Returns the range of docIds they were given
+    def addDocuments(self, documents):
+        with self.lock:
+            manifest = readManifest(self.path)
+            firstDoc = sum(segment['docCount'] for segment in manifest['segments']) # After the current last docId
+            meta = []
+            index = invertShard((readTexts([], meta, documents), firstDoc, CompressedPostingList))
+            if len(meta) == 0:
+                return range(firstDoc, firstDoc)
+
+            name = 'segment-%d' % manifest['nextSegment']
+            writeIndex(index, meta, os.path.join(self.path, name))
+            manifest['nextSegment'] += 1
+            manifest['segments'].append({ 'path':name, 'firstDoc':firstDoc, 'docCount':len(meta) })
+            manifest['generation'] += 1
+            writeManifest(self.path, manifest)
+
+        if self.merger is None or not self.merger.is_alive():
+            self.merger = threading.Thread(target = self.mergeSegments, daemon = True)
+            self.merger.start()
+        return range(firstDoc, firstDoc + len(meta))
+
+    def pickMerge(self, segments): # Returns the segments to merge next, or None
+        added = segments[1:]
+        if len(added) < MERGE_FACTOR:
+            return None
+        if sum(segment['docCount'] for segment in added) >= segments[0]['docCount']:
+            return segments # The added segments are as big as the first one, merge everything
+        return added
+
+    def mergeSegments(self): # Merges segments until pickMerge finds nothing left to merge
+        while True:
+            with self.lock:
+                manifest = readManifest(self.path)
+                if 'merging' in manifest and isRunning(manifest['merging']):
+                    return # Another process is merging, it merges what this one added too once it is done
+                merging = self.pickMerge(manifest['segments'])
+                if merging is None:
+                    if 'merging' in manifest: # Left by a process that stopped while merging
+                        del manifest['merging']
+                        writeManifest(self.path, manifest)
+                    return
+                name = 'segment-%d' % manifest['nextSegment']
+                manifest['nextSegment'] += 1 # Reserve the name so added documents don't take it
+                manifest['merging'] = os.getpid()
+                writeManifest(self.path, manifest)
+
+            merged = SegmentedIndex(self.path, merging) # Segments are only ever added while this runs, never changed
+            writeIndex(merged, merged.getMeta(), os.path.join(self.path, name))
+            merged.close()
+
+            with self.lock:
+                manifest = readManifest(self.path)
+                segments = manifest['segments']
+                start = segments.index(merging[0])
+                segments[start:start + len(merging)] = [{ 'path':name, 'firstDoc':merging[0]['firstDoc'],
+                    'docCount':sum(segment['docCount'] for segment in merging) }]
+                manifest['generation'] += 1
+                del manifest['merging']
+                writeManifest(self.path, manifest)
+                for segment in merging: # Open readers keep their memory maps and have read the metadata, so the files can go
+                    removeSegmentFiles(self.path, segment)
+
+    def close(self): # Waits for the background merge to finish
+        if self.merger is not None:
+            self.merger.join()
@@ -0,0 +1,215 @@
+import threading
+import time
+
+####################################################################################################################################
+
+# Query tracing
+# A QueryTrace records what one query did: how far its cursors moved and how long each of its operators took. Tracing is opt-in:
+# pass trace = QueryTrace() to Index.query (or proximityRetrieval, rankedRetrieval) and read trace.toDict() afterwards. Without
+# a trace the query runs on the index itself, with the same cursors as always, so nothing is counted or timed.
+# With a trace the query runs on a TracedIndex, whose cursors count what they do before passing every call to the real cursor:
+    # cursors: cursors opened. Code that opens a new cursor per document (like findPhrase) rescans the posting list each time
+    # postingsVisited: postings the cursors stopped on (the first one, then one per movePast and per skipTo that moved)
+    # skips: skipTo calls, and skipDistance: postings they moved over in total
+    # positionsDecoded: positions read with getCurrentPositions
+    # positionsCompared: positions handed to the phrase and window operators (matchPositions)
+    # candidateDocs: documents found by candidate generation (conjunctiveDocs, or the documents scored by rankedRetrieval)
+    # results: documents returned
+# Operators are timed by name (like 'candidates', 'match', 'ranked' or 'boolean'), with the number of times each ran. Time not in any
+# operator, like decoding positions between candidates, only shows in elapsed.
+# TraceStats adds up traces (from one process, or the toDict() of traces from many), for a dashboard to read with toDict().
+
+####################################################################################################################################
+
+COUNTERS = ('cursors', 'postingsVisited', 'skips', 'skipDistance', 'positionsDecoded', 'positionsCompared', 'candidateDocs', 'results')
+
+class QueryTrace:
+    def __init__(self):
+        self.queryType = None
+        self.terms = None
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.operators = dict() # Operator name -> [calls, seconds]
+        self.elapsed = 0.0
+
+    def setQuery(self, queryType, terms):
+        self.queryType = queryType
+        self.terms = list(terms)
+
+    def count(self, counter, n = 1):
+        self.counters[counter] += n
+
+    def addTime(self, operator, seconds, calls = 1):
+        entry = self.operators.get(operator)
+        if entry is None:
+            entry = self.operators[operator] = [0, 0.0]
+        entry[0] += calls
+        entry[1] += seconds
+
+    def traceIndex(self, index): # index, with cursors that count into this trace
+        return TracedIndex(index, self)
+
+    def timeIterator(self, operator, iterable, counter = None): # Yields what iterable does, timing every step under operator
+        iterator = iter(iterable)
+        calls = 0
+        seconds = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    seconds += time.perf_counter() - start
+                calls += 1
+                yield item
+        finally:
+            self.addTime(operator, seconds, calls)
+            if counter is not None:
+                self.count(counter, calls)
+
+    def traceMatch(self, matchPositions): # matchPositions, timed as 'match' and counting the positions it is given
+        def match(positionLists, operator = '#od', n = 1):
+            start = time.perf_counter()
+            found = matchPositions(positionLists, operator, n)
+            self.addTime('match', time.perf_counter() - start)
+            self.counters['positionsCompared'] += sum(len(positions) for positions in positionLists)
+            return found
+        return match
+
+    def toDict(self): # As json
+        return { 'type':self.queryType, 'terms':self.terms, 'elapsed':self.elapsed, 'counters':dict(self.counters),
+            'operators':dict((name, { 'calls':calls, 'seconds':seconds }) for name, (calls, seconds) in self.operators.items()) }
+
+# Calls function(*args). With a trace, runs it as operator: the time it takes is added to it
+def traceCall(trace, operator, function, *args):
+    if trace is None:
+        return function(*args)
+    start = time.perf_counter()
+    try:
+        return function(*args)
+    finally:
+        trace.addTime(operator, time.perf_counter() - start)
+
+####################################################################################################################################
+
+# Traced index
+# TracedIndex, TracedPostingList and TracedCursor stand in for an index, its posting lists and their cursors. Everything but the
+# cursor moves is passed to the real objects as it is. A cursor's current attribute (the index of its current Posting, which
+# PostingCursor, CompressedPostingCursor and ColumnarPostingCursor all have) gives how far skipTo moved it.
+
+####################################################################################################################################
+
+class TracedIndex:
+    def __init__(self, index, trace):
+        self.index = index
+        self.trace = trace
+
+    def __getitem__(self, term):
+        return TracedPostingList(self.index[term], self.trace)
+
+    def __contains__(self, term):
+        return term in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def keys(self):
+        return self.index.keys()
+
+    def __getattr__(self, name): # getTermStats, getMeta, generation... of the index, if it has them
+        return getattr(self.index, name)
+
+class TracedPostingList:
+    def __init__(self, postingList, trace):
+        self.postingList = postingList
+        self.trace = trace
+
+    def cursor(self):
+        cursor = self.postingList.cursor()
+        counters = self.trace.counters
+        counters['cursors'] += 1
+        if not cursor.isDone():
+            counters['postingsVisited'] += 1
+        return TracedCursor(cursor, counters)
+
+    def __getattr__(self, name): # getTfs, getTf, getDocCount... of the posting list
+        return getattr(self.postingList, name)
+
+class TracedCursor:
+    __slots__ = ('cursor', 'counters')
+
+    def __init__(self, cursor, counters):
+        self.cursor = cursor
+        self.counters = counters # The counters of the trace
+
+    def getCurrentDoc(self):
+        return self.cursor.getCurrentDoc()
+
+    def getCurrentPositions(self):
+        positions = self.cursor.getCurrentPositions()
+        self.counters['positionsDecoded'] += len(positions)
+        return positions
+
+    def getCurrentTf(self):
+        return self.cursor.getCurrentTf()
+
+    def getDocCount(self):
+        return self.cursor.getDocCount()
+
+    def hasMore(self):
+        return self.cursor.hasMore()
+
+    def isDone(self):
+        return self.cursor.isDone()
+
+    def skipTo(self, d):
+        before = self.cursor.current
+        self.cursor.skipTo(d)
+        counters = self.counters
+        counters['skips'] += 1
+        if self.cursor.current > before:
+            counters['skipDistance'] += self.cursor.current - before
+            counters['postingsVisited'] += 1
+
+    def movePast(self):
+        self.cursor.movePast()
+        if not self.cursor.isDone():
+            self.counters['postingsVisited'] += 1
+
+    def reset(self):
+        self.cursor.reset()
+
+####################################################################################################################################
+
+# Aggregate counters
+# TraceStats adds up every trace given to add(): queries by type, the counters and the calls and time of every operator. One
+# TraceStats can be added to from many threads.
+
+####################################################################################################################################
+
+class TraceStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queries = dict() # Query type -> number of queries traced
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.operators = dict() # Operator name -> [calls, seconds]
+        self.elapsed = 0.0
+
+    def add(self, trace): # A QueryTrace, or the toDict() of one
+        if isinstance(trace, QueryTrace):
+            trace = trace.toDict()
+        with self.lock:
+            self.queries[trace['type']] = self.queries.get(trace['type'], 0) + 1
+            for counter, n in trace['counters'].items():
+                self.counters[counter] = self.counters.get(counter, 0) + n
+            for name, operator in trace['operators'].items():
+                entry = self.operators.setdefault(name, [0, 0.0])
+                entry[0] += operator['calls']
+                entry[1] += operator['seconds']
+            self.elapsed += trace['elapsed']
+
+    def toDict(self): # As json
+        with self.lock:
+            return { 'queries':dict(self.queries), 'elapsed':self.elapsed, 'counters':dict(self.counters),
+                'operators':dict((name, { 'calls':calls, 'seconds':seconds }) for name, (calls, seconds) in self.operators.items()) }
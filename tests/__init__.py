@@ -0,0 +1,3 @@
+import os
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'shakespeare-scenes.json.gz')
@@ -0,0 +1,55 @@
+import random
+import unittest
+from invertedindex.batch import batchRetrieval
+from invertedindex.build import buildIndex
+from invertedindex.query import conjunctiveDocs, getAllDocIds, proximityRetrieval, terms_0
+from . import CORPUS
+
+def oneQuery(query, index): # Answers one batch query with the one-query functions of query.py
+    operator, terms = query
+    if operator == 'or':
+        return getAllDocIds([t for t in terms if t in index], index)
+    if any(t not in index for t in terms):
+        return dict() if operator == 'counts' else set()
+    if operator == 'more':
+        return terms_0(index[terms[0]], index[terms[1]])
+    if operator == 'phrase':
+        return set(proximityRetrieval(terms, index))
+    docs = set(conjunctiveDocs([index[t].cursor() for t in set(terms)])) # 'and' and 'counts'
+    if operator == 'and':
+        return docs
+    return dict((d, tuple(index[t].getTf(d) for t in terms)) for d in docs)
+
+class BatchTest(unittest.TestCase): # batchRetrieval returns what running each query on its own does
+    @classmethod
+    def setUpClass(cls):
+        cls.index, _ = buildIndex(CORPUS)
+
+    def testReportQueries(self):
+        queries = [('more', ['thee', 'you']), ('more', ['thou', 'you']), ('or', ['verona', 'rome', 'italy']), ('or', ['falstaff']),
+            ('phrase', ['lady', 'macbeth']), ('phrase', ['a', 'rose', 'by', 'any', 'other', 'name']), ('phrase', ['cry', 'havoc']),
+            ('counts', ['thee', 'you']), ('and', ['romeo', 'juliet', 'love'])]
+        self.assertEqual(batchRetrieval(queries, self.index), [oneQuery(query, self.index) for query in queries])
+
+    def testRandomQueries(self): # Shared, repeated and unknown terms
+        rng = random.Random(10)
+        words = ['the', 'king', 'queen', 'lord', 'my', 'good', 'sweet', 'love', 'death', 'havoc', 'cry', 'notaword']
+        queries = []
+        for _ in range(60):
+            operator = rng.choice(['or', 'and', 'phrase', 'more', 'counts'])
+            queries.append((operator, [rng.choice(words) for _ in range(2 if operator == 'more' else rng.randint(1, 4))]))
+        expected = [oneQuery(query, self.index) for query in queries]
+        self.assertEqual(batchRetrieval(queries, self.index), expected)
+        for query, result in zip(queries[:10], expected[:10]):
+            self.assertEqual(batchRetrieval([query], self.index), [result])
+
+    def testEmpty(self):
+        self.assertEqual(batchRetrieval([], self.index), [])
+        self.assertEqual(batchRetrieval([('or', []), ('and', ['notaword'])], self.index), [set(), set()])
+
+    def testBadQueries(self):
+        self.assertRaises(ValueError, batchRetrieval, [('xor', ['the'])], self.index)
+        self.assertRaises(ValueError, batchRetrieval, [('more', ['the', 'king', 'queen'])], self.index)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from invertedindex.build import buildIndex, readBatches
+from invertedindex.postings import CompressedPostingList
+from invertedindex.query import getTermStats
+
+def readAll(postingList): # (docId, positions) of every Posting
+    cursor = postingList.cursor()
+    postings = []
+    while not cursor.isDone():
+        postings.append((cursor.getCurrentDoc(), cursor.getCurrentPositions()))
+        cursor.movePast()
+    return postings
+
+def writeCorpus(directory): # Writes two .jsonl corpus files of random documents to directory, returns their names
+    rng = random.Random(20)
+    words = ['w' + str(i) for i in range(400)]
+    files = []
+    for f in range(2):
+        filename = os.path.join(directory, 'corpus' + str(f) + '.jsonl')
+        with open(filename, 'w') as out:
+            for d in range(600):
+                text = ' '.join(rng.choice(words[:rng.randint(5, 400)]) for _ in range(rng.randint(0, 150)))
+                out.write(json.dumps({ 'playId':'play' + str(d // 50), 'sceneId':str(f) + ':' + str(d), 'sceneNum':d, 'text':text }) + '\n')
+        files.append(filename)
+    return files
+
+class BuildTest(unittest.TestCase): # Every way of building the index gives the same postings as building it in one process
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.files = writeCorpus(cls.directory)
+        cls.index, cls.meta = buildIndex(cls.files)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def assertSameIndex(self, index, meta):
+        self.assertEqual(list(meta), list(self.meta))
+        self.assertEqual(sorted(index.keys()), sorted(self.index.keys()))
+        for term in self.index.keys():
+            self.assertEqual(readAll(index[term]), readAll(self.index[term]))
+            self.assertEqual(getTermStats(index, term), getTermStats(self.index, term))
+
+    def testWorkers(self):
+        for workers in (2, 3):
+            self.assertSameIndex(*buildIndex(self.files, workers = workers))
+
+    def testBatches(self): # Shards are consecutive docIds, in order
+        texts = [str(d) for d in range(1000)]
+        for workers in (1, 3, 8):
+            for batchChars in (1, 500, 10 ** 6):
+                shards = list(readBatches(iter(texts), CompressedPostingList, workers, batchChars))
+                self.assertEqual([text for shard, _, _ in shards for text in shard], texts)
+                for shard, firstDoc, _ in shards:
+                    self.assertEqual(shard[0], str(firstDoc))
+                    self.assertGreater(len(shard), 0)
+
+if __name__ == '__main__':
+    unittest.main()
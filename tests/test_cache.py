@@ -0,0 +1,79 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from invertedindex.cache import QueryCache
+from invertedindex.query import daatRetrieval, findPhrase, getAllDocIds
+from invertedindex.storage import IndexWriter, SegmentedIndex
+from .test_postings import makeList
+from .test_segments import makeDocuments
+
+class CacheTest(unittest.TestCase): # QueryCache returns what the uncached queries do, and keeps and drops entries as it says
+    def setUp(self):
+        self.index = { 'x':makeList([(d, [0, 4]) for d in (2, 4, 5)]), 'y':makeList([(d, [1, 7]) for d in (1, 3, 5, 6)]),
+            'z':makeList([(d, [2, 5]) for d in range(8)]) }
+
+    def testResults(self):
+        cache = QueryCache(self.index)
+        for _ in range(2): # Computed, then cached
+            for terms in (['x', 'y'], ['y', 'x'], ['x', 'z'], ['z', 'y', 'x'], ['x', 'x']):
+                self.assertEqual(cache.getAllDocIds(terms), getAllDocIds(terms, self.index))
+                self.assertEqual(cache.daatRetrieval(terms), daatRetrieval(terms, self.index))
+                self.assertEqual(cache.phraseDocs(terms), set(d for d in daatRetrieval(terms, self.index) if findPhrase(terms, self.index, d)))
+
+    def testKeys(self): # or queries share an entry whatever the order, daatRetrieval ones don't, since its early stop depends on it
+        cache = QueryCache(self.index)
+        self.assertEqual(cache.getAllDocIds(['x', 'y']), cache.getAllDocIds(['y', 'x', 'y']))
+        self.assertEqual(cache.getStats()['hits'], 1)
+        self.assertEqual(cache.daatRetrieval(['x', 'y']), set()) # daatRetrieval stops early, so the order changes its result
+        self.assertEqual(cache.daatRetrieval(['y', 'x']), {5})
+        self.assertEqual(cache.getStats()['hits'], 1)
+        self.assertEqual(cache.daatRetrieval(['x', 'y']), set())
+        self.assertEqual(cache.getStats(), { 'hits':2, 'misses':3, 'evictions':0, 'entries':3, 'bytes':cache.bytes })
+
+    def testEviction(self): # The least recently used entry goes first
+        cache = QueryCache(self.index, maxEntries = 2)
+        cache.getAllDocIds(['x'])
+        cache.getAllDocIds(['y'])
+        cache.getAllDocIds(['x']) # Now y is the least recently used
+        cache.getAllDocIds(['z'])
+        self.assertEqual(list(cache.entries), [('or', ('x',)), ('or', ('z',))])
+        self.assertEqual(cache.getStats()['evictions'], 1)
+
+        size = cache.entries[('or', ('z',))][1]
+        cache = QueryCache(self.index, maxBytes = 2 * size)
+        for terms in (['x'], ['y'], ['z'], ['x', 'y']):
+            cache.getAllDocIds(terms)
+            self.assertLessEqual(cache.bytes, 2 * size)
+        self.assertEqual(cache.bytes, sum(size for _, size in cache.entries.values()))
+        self.assertGreater(cache.getStats()['evictions'], 0)
+
+        cache = QueryCache(self.index, maxBytes = 1) # An entry bigger than maxBytes is still kept until the next one comes
+        cache.getAllDocIds(['z'])
+        self.assertEqual(len(cache.entries), 1)
+
+    def testGeneration(self): # Entries are dropped when a SegmentedIndex opens new segments
+        directory = tempfile.mkdtemp()
+        try:
+            rng = random.Random(9)
+            writer = IndexWriter(directory)
+            writer.addDocuments(makeDocuments(rng, 50, 0))
+            writer.close()
+            index = SegmentedIndex(directory)
+            cache = QueryCache(index)
+            before = cache.getAllDocIds(['w1'])
+            writer.addDocuments(makeDocuments(rng, 50, 50))
+            writer.close()
+            self.assertEqual(cache.getAllDocIds(['w1']), before) # Not refreshed yet
+            self.assertEqual(cache.getStats()['hits'], 1)
+            self.assertTrue(index.refresh())
+            self.assertEqual(cache.getAllDocIds(['w1']), getAllDocIds(['w1'], index))
+            self.assertGreater(len(cache.getAllDocIds(['w1'])), len(before))
+            self.assertEqual(cache.getStats()['misses'], 2)
+            index.close()
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    unittest.main()
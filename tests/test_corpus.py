@@ -0,0 +1,71 @@
+import gzip
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from invertedindex.build import readCorpusList, readDocuments
+from . import CORPUS
+
+class ChunkedFile: # Text file whose reads return pieces of the given sizes in turn, whatever size is asked for
+    def __init__(self, text, sizes):
+        self.file = io.StringIO(text)
+        self.sizes = sizes
+        self.reads = 0
+
+    def read(self, size):
+        self.reads += 1
+        return self.file.read(self.sizes[(self.reads - 1) % len(self.sizes)])
+
+def makeDocuments(rng, count): # Documents with text that looks like json: brackets, commas, quotes, escapes and non-ascii characters
+    pieces = ['word', '[', ']', '{', '}', ',', '"', '\\', '\n', ' ', 'corpus', 'été', '—']
+    return [{ 'playId':'play' + str(d), 'sceneId':'play' + str(d) + ':0', 'sceneNum':d,
+        'text':''.join(rng.choice(pieces) for _ in range(rng.randint(0, 40))) } for d in range(count)]
+
+class CorpusTest(unittest.TestCase): # Documents split across reads are parsed like the whole file at once
+    def setUp(self):
+        self.rng = random.Random(5)
+        self.documents = makeDocuments(self.rng, 200)
+
+    def testChunks(self):
+        for indent in (None, 2):
+            text = json.dumps({ 'corpus':self.documents }, indent = indent)
+            for sizes in ([1], [2, 3], [7, 1, 64], [len(text)], [len(text) + 1]):
+                self.assertEqual(list(readCorpusList(ChunkedFile(text, sizes))), self.documents)
+            for _ in range(20):
+                sizes = [self.rng.randint(1, 300) for _ in range(10)]
+                self.assertEqual(list(readCorpusList(ChunkedFile(text, sizes))), self.documents)
+
+    def testEmpty(self):
+        self.assertEqual(list(readCorpusList(ChunkedFile('{"corpus": []}', [1]))), [])
+        self.assertEqual(list(readCorpusList(ChunkedFile('{"corpus":\n[\n]\n}', [3]))), [])
+
+    def testBroken(self):
+        text = json.dumps({ 'corpus':self.documents[:3] })
+        self.assertRaises(ValueError, lambda: list(readCorpusList(ChunkedFile('{"documents": []}', [4]))))
+        self.assertRaises(ValueError, lambda: list(readCorpusList(ChunkedFile(text[:-2], [5])))) # No closing ']'
+        self.assertRaises(ValueError, lambda: list(readCorpusList(ChunkedFile(text[:len(text) // 2], [5])))) # Cut inside a document
+
+    def testFormats(self): # .json, .jsonl, and both compressed, read the same documents
+        directory = tempfile.mkdtemp()
+        try:
+            filenames = [os.path.join(directory, 'corpus' + extension) for extension in ('.json', '.json.gz', '.jsonl', '.jsonl.gz')]
+            for filename in filenames:
+                with (gzip.open(filename, 'wt', encoding = 'utf-8') if filename.endswith('.gz') else open(filename, 'w', encoding = 'utf-8')) as f:
+                    if '.jsonl' in filename:
+                        f.write(''.join(json.dumps(document) + '\n' for document in self.documents))
+                    else:
+                        json.dump({ 'corpus':self.documents }, f)
+                self.assertEqual(list(readDocuments([filename])), self.documents)
+            self.assertEqual(list(readDocuments(filenames)), self.documents * len(filenames))
+        finally:
+            shutil.rmtree(directory)
+
+    def testCorpus(self): # The corpus is bigger than READ_SIZE, so its documents straddle reads
+        with gzip.open(CORPUS, 'rt', encoding = 'utf-8') as f:
+            self.assertEqual(list(readDocuments([CORPUS])), json.load(f)['corpus'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import random
+import unittest
+from invertedindex.docsets import DocSet, ARRAY_LIMIT, termDocSet, booleanRetrieval
+from invertedindex.postings import CompressedPostingList
+
+class DocSetTest(unittest.TestCase): # DocSets give what Python sets of the same docIds do
+    def setUp(self):
+        rng = random.Random(19)
+        self.sets = [
+            set(),
+            {0},
+            {65535, 65536},
+            set(rng.sample(range(1 << 20), 300)), # Sparse: array containers
+            set(rng.sample(range(65536), ARRAY_LIMIT)), # Largest array container
+            set(rng.sample(range(65536), ARRAY_LIMIT + 1)), # Smallest bitmap container
+            set(range(0, 140000, 5)), # Bitmaps in every group
+            set(rng.sample(range(300000), 20000)) | set(range(131072, 196608)) # A full group
+        ]
+
+    def assertSame(self, docSet, expected):
+        self.assertEqual(list(docSet), sorted(expected))
+        self.assertEqual(len(docSet), len(expected))
+        self.assertTrue(docSet == expected)
+
+    def testBuild(self):
+        for docIds in self.sets:
+            self.assertSame(DocSet(docIds), docIds)
+            self.assertSame(DocSet.fromSorted(sorted(docIds)), docIds)
+
+    def testOperations(self):
+        docSets = [DocSet(docIds) for docIds in self.sets]
+        for a, docSetA in zip(self.sets, docSets):
+            for b, docSetB in zip(self.sets, docSets):
+                self.assertSame(docSetA | docSetB, a | b)
+                self.assertSame(docSetA & docSetB, a & b)
+                self.assertSame(docSetA - docSetB, a - b)
+
+    def testAll(self):
+        docSets = [DocSet(docIds) for docIds in self.sets[3:]]
+        self.assertSame(DocSet.unionAll(docSets), set().union(*self.sets[3:]))
+        self.assertSame(DocSet.intersectAll(docSets[-2:]), self.sets[-2] & self.sets[-1])
+
+    def testContains(self):
+        for docIds in self.sets:
+            docSet = DocSet(docIds)
+            for d in list(docIds)[:100] + [1, 4097, 65536, 139995, 1 << 21]:
+                self.assertEqual(d in docSet, d in docIds)
+
+    def testBytes(self):
+        for docIds in self.sets:
+            self.assertSame(DocSet.fromBytes(DocSet(docIds).toBytes()), docIds)
+
+    def testAppendToResult(self): # Adding to a result leaves the DocSets it was made from as they were
+        operations = [lambda left, right: left | right, lambda left, right: left - right, lambda left, right: left & right,
+            lambda left, right: DocSet.unionAll([left, right]), lambda left, right: DocSet.intersectAll([left])]
+        sets = self.sets[:6] + [set(range(0, 65536, 8))] # One bitmap container is enough
+        for a in sets:
+            for b in sets:
+                for operation in operations:
+                    left = DocSet(a)
+                    right = DocSet(b)
+                    result = operation(left, right)
+                    expected = set(result)
+                    last = max(expected, default = -1)
+                    for d in (last + 1, last + 2, ((last + 2 >> 16) + 1) << 16): # Into the last group, then a new one
+                        result.append(d)
+                        expected.add(d)
+                    self.assertEqual(list(result), sorted(expected))
+                    self.assertSame(left, a)
+                    self.assertSame(right, b)
+
+    def testAppendToQuery(self): # booleanRetrieval results can be added to without changing the cached DocSets of the terms
+        index = dict()
+        for term, docIds in (('x', range(0, 70000, 2)), ('y', [1, 3, 65537])):
+            index[term] = CompressedPostingList(docIds[0], 0)
+            for d in docIds[1:]:
+                index[term].addPosting(d, [0])
+        cache = dict()
+        def getDocSet(term, index):
+            if term not in cache:
+                cache[term] = termDocSet(term, index)
+            return cache[term]
+        for terms, operator in ((['x'], 'and'), (['x'], 'or'), (['y'], 'and'), (['x', 'y'], 'or'), (['x', 'y'], 'and')):
+            booleanRetrieval(terms, index, operator, (), getDocSet).append(200000)
+            self.assertSame(getDocSet('x', index), set(range(0, 70000, 2)))
+            self.assertSame(getDocSet('y', index), {1, 3, 65537})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import shutil
+import tempfile
+import unittest
+from invertedindex.build import buildIndex
+from invertedindex.external import buildIndexExternal
+from invertedindex.query import getTermStats
+from invertedindex.storage import DiskIndex
+from .test_build import readAll, writeCorpus
+
+class ExternalTest(unittest.TestCase): # buildIndexExternal writes the index buildIndex builds in memory, however many runs it takes
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.files = writeCorpus(cls.directory)
+        cls.index, cls.meta = buildIndex(cls.files)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def testExternal(self):
+        for memory, workers in ((16 * 1024, 1), (64 * 1024, 2), (1 << 30, 1)):
+            path = os.path.join(self.directory, 'external')
+            runs = buildIndexExternal(self.files, path, memory, workers)
+            if memory < 1 << 20:
+                self.assertGreater(runs, 1)
+            index = DiskIndex(path)
+            try:
+                self.assertEqual(list(index.getMeta()), list(self.meta))
+                self.assertEqual(sorted(index.keys()), sorted(self.index.keys()))
+                for term in self.index.keys():
+                    self.assertEqual(readAll(index[term]), readAll(self.index[term]))
+                    self.assertEqual(getTermStats(index, term), getTermStats(self.index, term))
+            finally:
+                index.close()
+                shutil.rmtree(path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from invertedindex import Index
+from invertedindex.reports import phraseScenes
+from . import CORPUS
+
+# The scenes of the phrase reports. daatRetrieval (which the reports use) stops once one of its lists has no more postings, so the
+# "cry havoc" report misses life_and_death_of_king_john:1.0. proximityRetrieval finds it
+LADY_MACBETH = ['macbeth:0.4', 'macbeth:0.5', 'macbeth:0.6', 'macbeth:1.1', 'macbeth:1.2', 'macbeth:2.0', 'macbeth:2.1', 'macbeth:2.3',
+    'macbeth:4.0']
+ROSE = ['romeo_and_juliet:1.1']
+CRY_HAVOC = ['coriolanus:2.0', 'julius_caesar:2.0']
+
+class PhraseTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.index = Index.build(CORPUS)
+
+    def reportScenes(self, phrase):
+        return phraseScenes(phrase, self.index.index, self.index.getMeta())
+
+    def queryScenes(self, phrase):
+        meta = self.index.getMeta()
+        return sorted(meta[d]['sceneId'] for d in self.index.query(phrase, 'phrase'))
+
+    def testLadyMacbeth(self):
+        self.assertEqual(self.reportScenes(['lady', 'macbeth']), LADY_MACBETH)
+        self.assertEqual(self.queryScenes(['lady', 'macbeth']), LADY_MACBETH)
+
+    def testRose(self):
+        phrase = ['a', 'rose', 'by', 'any', 'other', 'name']
+        self.assertEqual(self.reportScenes(phrase), ROSE)
+        self.assertEqual(self.queryScenes(phrase), ROSE)
+
+    def testCryHavoc(self):
+        self.assertEqual(self.reportScenes(['cry', 'havoc']), CRY_HAVOC)
+        self.assertEqual(self.queryScenes(['cry', 'havoc']), sorted(CRY_HAVOC + ['life_and_death_of_king_john:1.0']))
+
+    def testPlay(self):
+        meta = self.index.getMeta()
+        found = self.index.query(['cry', 'havoc'], 'phrase', playId = 'julius_caesar')
+        self.assertEqual([meta[d]['sceneId'] for d in found], ['julius_caesar:2.0'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import random
+import unittest
+from invertedindex.postings import CompressedPostingList, SKIP_INTERVAL
+from invertedindex.storage import encodePostingList, decodePostingList
+
+def makeList(postings): # CompressedPostingList of (docId, positions) in docId order
+    postingList = None
+    for d, positions in postings:
+        if postingList is None:
+            postingList = CompressedPostingList(d, positions[0])
+            for p in positions[1:]:
+                postingList.add(d, p)
+        else:
+            postingList.addPosting(d, positions)
+    postingList.flush()
+    return postingList
+
+def randomPostings(rng, count, maxDoc):
+    return [(d, sorted(rng.sample(range(200), rng.randint(1, 5)))) for d in sorted(rng.sample(range(maxDoc), count))]
+
+def readAll(postingList): # (docId, positions) of every Posting, moving the cursor one Posting at a time
+    cursor = postingList.cursor()
+    postings = []
+    while not cursor.isDone():
+        postings.append((cursor.getCurrentDoc(), cursor.getCurrentPositions()))
+        cursor.movePast()
+    return postings
+
+class CompressedPostingListTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(4)
+
+    def assertSkipsLikeLinearScan(self, postingList, postings):
+        docIds = [d for d, _ in postings]
+        for _ in range(20):
+            cursor = postingList.cursor()
+            for target in sorted(self.rng.sample(range(docIds[-1] + 10), min(60, docIds[-1] + 10))):
+                cursor.skipTo(target)
+                expected = next((d for d in docIds if d >= target), docIds[-1]) # skipTo stops on the last Posting if none is >= target
+                self.assertEqual(cursor.getCurrentDoc(), expected)
+                i = docIds.index(expected)
+                self.assertEqual(cursor.getCurrentPositions(), postings[i][1])
+                self.assertEqual(cursor.getCurrentTf(), len(postings[i][1]))
+
+    def testRead(self):
+        for count in (1, 2, SKIP_INTERVAL, SKIP_INTERVAL + 1, 1000):
+            postings = randomPostings(self.rng, count, 5000)
+            postingList = makeList(postings)
+            self.assertEqual(readAll(postingList), postings)
+            self.assertEqual(postingList.getTfs(), [len(positions) for _, positions in postings])
+
+    def testSkipTo(self):
+        for count in (1, 5, SKIP_INTERVAL * 3 + 7, 2000):
+            postings = randomPostings(self.rng, count, 10000)
+            self.assertSkipsLikeLinearScan(makeList(postings), postings)
+
+    def testExtend(self): # Joined lists read and skip like one list with all the Postings
+        for _ in range(50):
+            postings = randomPostings(self.rng, self.rng.randint(2, 1500), 20000)
+            cuts = sorted(self.rng.sample(range(1, len(postings)), min(len(postings) - 1, self.rng.randint(1, 6))))
+            parts = [postings[start:end] for start, end in zip([0] + cuts, cuts + [len(postings)])]
+            postingList = makeList(parts[0])
+            for part in parts[1:]:
+                postingList.extend(makeList(part))
+            self.assertEqual(postingList.getDocCount(), len(postings))
+            self.assertEqual(readAll(postingList), postings)
+            self.assertSkipsLikeLinearScan(postingList, postings)
+
+            postingList.addPosting(postings[-1][0] + 1, [3, 9]) # Adding after extend keeps the skip pointers right
+            postings.append((postings[-1][0] + 1, [3, 9]))
+            self.assertSkipsLikeLinearScan(postingList, postings)
+
+    def testEncode(self):
+        for count in (1, SKIP_INTERVAL + 1, 1500):
+            postings = randomPostings(self.rng, count, 8000)
+            postingList = decodePostingList(encodePostingList(makeList(postings)))
+            self.assertEqual(readAll(postingList), postings)
+            self.assertSkipsLikeLinearScan(postingList, postings)
+
+if __name__ == '__main__':
+    unittest.main()
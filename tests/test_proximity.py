@@ -0,0 +1,54 @@
+import random
+import unittest
+from invertedindex.build import buildIndex
+from invertedindex.query import documentPositions, getAllDocIds, matchPositions, proximityRetrieval
+from . import CORPUS
+
+def orderedMatches(words, query, n): # Brute force #odN: starts of a chain of positions of the query terms, each 1 to n after the last
+    def chain(i, x):
+        return i == len(query) or any(words[y] == query[i] and chain(i + 1, y) for y in range(x + 1, min(x + n + 1, len(words))))
+    return [x for x in range(len(words)) if words[x] == query[0] and chain(1, x)]
+
+def holdsAll(words, query, start, end): # Whether words[start:end] has every query term, as often as the query has it
+    window = words[start:end]
+    return all(window.count(t) >= query.count(t) for t in query)
+
+def unorderedMatches(words, query, n): # Brute force #uwN: starts of the windows of at most n words that hold every term and need their first word
+    return [x for x in range(len(words)) if words[x] in query and any(holdsAll(words, query, x, y) and not holdsAll(words, query, x + 1, y)
+        for y in range(x + 1, min(x + n, len(words)) + 1))]
+
+class ProximityTest(unittest.TestCase): # matchPositions and proximityRetrieval find what checking every position does
+    def setUp(self):
+        self.rng = random.Random(8)
+
+    def testMatchPositions(self):
+        for _ in range(3000):
+            vocabulary = ['a', 'b', 'c', 'd', 'e'][:self.rng.randint(1, 5)]
+            words = [self.rng.choice(vocabulary) for _ in range(self.rng.randint(0, 40))]
+            query = [self.rng.choice(vocabulary) for _ in range(self.rng.randint(1, 4))]
+            positionLists = [[x for x, w in enumerate(words) if w == t] for t in query]
+            n = self.rng.randint(1, 8)
+            self.assertEqual(matchPositions(positionLists, '#od', n), orderedMatches(words, query, n), (words, query, n))
+            self.assertEqual(matchPositions(positionLists, '#uw', n), unorderedMatches(words, query, n), (words, query, n))
+
+    def testUnknownOperator(self):
+        self.assertRaises(ValueError, matchPositions, [[1], [2]], '#phrase')
+
+    def testRetrieval(self): # On the corpus, against every document that has all the terms
+        index, _ = buildIndex(CORPUS)
+        for query in (['to', 'be', 'or', 'not'], ['my', 'lord'], ['the', 'king', 'the'], ['sweet', 'love'], ['cry', 'havoc']):
+            for operator, n in (('#od', 1), ('#od', 3), ('#uw', 2), ('#uw', 8)):
+                expected = dict()
+                for d in getAllDocIds(query, index):
+                    positionLists = documentPositions(query, index, d)
+                    if positionLists is None:
+                        continue
+                    terms = dict((x, t) for t, positions in zip(query, positionLists) for x in positions)
+                    text = [terms.get(x) for x in range(max(terms) + 1)] # The document, with None for the words that aren't query terms
+                    found = (orderedMatches if operator == '#od' else unorderedMatches)(text, query, n)
+                    if len(found) > 0:
+                        expected[d] = found
+                self.assertEqual(proximityRetrieval(query, index, operator, n), expected, (query, operator, n))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from invertedindex.build import buildIndex
+from invertedindex.ranking import CollectionStats, BM25Scorer, DirichletScorer, exhaustiveRetrieval, rankedRetrieval
+from . import CORPUS
+
+QUERIES = [
+    ['the', 'and', 'i', 'to', 'of', 'a', 'you', 'my', 'that', 'in'],
+    ['king', 'queen', 'crown', 'throne', 'england', 'france', 'war', 'peace', 'sword', 'blood'],
+    ['love', 'death', 'romeo', 'juliet'],
+    ['thee', 'thou', 'you'],
+    ['falstaff', 'sack', 'tavern'],
+    ['havoc'],
+    ['notaword', 'havoc']
+]
+
+class RankingTest(unittest.TestCase): # rankedRetrieval (MaxScore) returns what scoring every document does
+    @classmethod
+    def setUpClass(cls):
+        cls.index, cls.meta = buildIndex(CORPUS, compact = True)
+        stats = CollectionStats(cls.index, cls.meta)
+        cls.scorers = [BM25Scorer(stats), DirichletScorer(stats)]
+
+    def assertSameResults(self, results, expected):
+        self.assertEqual([d for _, d in results], [d for _, d in expected])
+        for (score, _), (expectedScore, _) in zip(results, expected):
+            self.assertAlmostEqual(score, expectedScore, places = 9)
+
+    def testTopK(self):
+        for scorer in self.scorers:
+            for query in QUERIES:
+                for k in (1, 10, 100):
+                    with self.subTest(scorer = type(scorer).__name__, query = query, k = k):
+                        self.assertSameResults(rankedRetrieval(query, self.index, scorer, k), exhaustiveRetrieval(query, self.index, scorer, k))
+
+    def testPlay(self): # Restricted to one play, the same as the exhaustive ranking of the documents of that play
+        ranges = self.meta.getPlayRanges('hamlet')
+        for scorer in self.scorers:
+            for query in QUERIES[:5]:
+                everything = exhaustiveRetrieval(query, self.index, scorer, len(self.meta))
+                expected = [(score, d) for score, d in everything if any(d in docIds for docIds in ranges)][:10]
+                self.assertSameResults(rankedRetrieval(query, self.index, scorer, 10, ranges), expected)
+
+    def testNoResults(self):
+        for scorer in self.scorers:
+            for k in (0, -1):
+                self.assertEqual(rankedRetrieval(QUERIES[2], self.index, scorer, k), [])
+                self.assertEqual(exhaustiveRetrieval(QUERIES[2], self.index, scorer, k), [])
+            self.assertEqual(rankedRetrieval([], self.index, scorer), [])
+            self.assertEqual(rankedRetrieval(['notaword'], self.index, scorer), [])
+
+if __name__ == '__main__':
+    unittest.main()
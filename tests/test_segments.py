@@ -0,0 +1,126 @@
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from invertedindex.build import buildIndex
+from invertedindex.query import getTermStats
+from invertedindex.storage import MERGE_FACTOR, IndexWriter, SegmentedIndex, readManifest, writeIndex
+
+def readAll(postingList): # (docId, positions) of every Posting
+    cursor = postingList.cursor()
+    postings = []
+    while not cursor.isDone():
+        postings.append((cursor.getCurrentDoc(), cursor.getCurrentPositions()))
+        cursor.movePast()
+    return postings
+
+def makeDocuments(rng, count, start): # count random documents, sceneIds numbered from start
+    words = ['w' + str(i) for i in range(200)]
+    return [{ 'playId':'play' + str((start + d) // 20), 'sceneId':'scene:' + str(start + d), 'sceneNum':start + d,
+        'text':' '.join(rng.choice(words) for _ in range(rng.randint(0, 60))) } for d in range(count)]
+
+class SegmentTest(unittest.TestCase): # Adding documents as segments and merging them gives the index built from all of them at once
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'index')
+        rng = random.Random(6)
+        self.documents = makeDocuments(rng, 300, 0)
+        self.added = [makeDocuments(rng, rng.randint(1, 40), 300 + 40 * i) for i in range(2 * MERGE_FACTOR + 1)]
+        writeIndex(*self.build(self.documents), self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def build(self, documents): # buildIndex of documents, through a .jsonl file
+        filename = os.path.join(self.directory, 'corpus.jsonl')
+        with open(filename, 'w') as out:
+            for document in documents:
+                out.write(json.dumps(document) + '\n')
+        return buildIndex(filename)
+
+    def open(self): # SegmentedIndex of the index, closed after the test
+        index = SegmentedIndex(self.path)
+        self.addCleanup(index.close)
+        return index
+
+    def assertSameIndex(self, index, documents):
+        expected, meta = self.build(documents)
+        self.assertEqual(list(index.getMeta()), list(meta))
+        self.assertEqual(sorted(index.keys()), sorted(expected.keys()))
+        for term in expected.keys():
+            self.assertEqual(readAll(index[term]), readAll(expected[term]))
+            self.assertEqual(getTermStats(index, term), getTermStats(expected, term))
+
+    def testAdd(self): # docIds follow on from the last document
+        writer = IndexWriter(self.path)
+        documents = list(self.documents)
+        for added in self.added:
+            self.assertEqual(writer.addDocuments(added), range(len(documents), len(documents) + len(added)))
+            documents += added
+        self.assertEqual(writer.addDocuments([]), range(len(documents), len(documents)))
+        writer.close()
+        index = self.open()
+        self.assertSameIndex(index, documents)
+
+    def testMerge(self): # Merged segments hold the same postings, and no segment is left behind unmerged for long
+        writer = IndexWriter(self.path)
+        documents = list(self.documents)
+        for added in self.added:
+            writer.addDocuments(added)
+            documents += added
+            writer.close()
+            self.assertLessEqual(len(readManifest(self.path)['segments']), MERGE_FACTOR)
+        index = self.open()
+        self.assertSameIndex(index, documents)
+        names = set(segment['path'] for segment in readManifest(self.path)['segments']) - {'.'}
+        self.assertEqual(set(name for name in os.listdir(self.path) if name.startswith('segment-')), names)
+
+    def testReadAfterMerge(self): # An open index still reads segments that were merged away and deleted
+        writer = IndexWriter(self.path)
+        documents = list(self.documents)
+        for added in self.added[:MERGE_FACTOR - 1]:
+            writer.addDocuments(added)
+            documents += added
+        writer.close()
+        index = self.open()
+        writer.addDocuments(self.added[MERGE_FACTOR - 1])
+        writer.close()
+        self.assertLess(len(readManifest(self.path)['segments']), len(index.segments)) # Merged
+        self.assertSameIndex(index, documents)
+
+    def testRefresh(self):
+        writer = IndexWriter(self.path)
+        documents = list(self.documents)
+        index = self.open()
+        self.assertFalse(index.refresh())
+        for added in self.added:
+            writer.addDocuments(added)
+            documents += added
+            writer.close()
+            self.assertTrue(index.refresh())
+            self.assertFalse(index.refresh())
+            self.assertEqual(index.generation, readManifest(self.path)['generation'])
+        self.assertSameIndex(index, documents)
+
+    def testFailedRefresh(self): # A refresh that couldn't open the segments keeps the old ones, and the next one tries again
+        writer = IndexWriter(self.path)
+        writer.addDocuments(self.added[0])
+        writer.close()
+        index = self.open()
+        generation = index.generation
+        writer.addDocuments(self.added[1])
+        writer.close()
+        segment = readManifest(self.path)['segments'][-1]['path']
+        meta = os.path.join(self.path, segment, 'meta.json')
+        os.rename(meta, meta + '.moved')
+        self.assertRaises(FileNotFoundError, index.refresh)
+        self.assertEqual(index.generation, generation)
+        self.assertSameIndex(index, self.documents + self.added[0])
+        os.rename(meta + '.moved', meta)
+        self.assertTrue(index.refresh())
+        self.assertSameIndex(index, self.documents + self.added[0] + self.added[1])
+
+if __name__ == '__main__':
+    unittest.main()
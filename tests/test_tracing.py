@@ -0,0 +1,62 @@
+import unittest
+from invertedindex.index import Index
+from invertedindex.tracing import COUNTERS, QueryTrace, TraceStats
+from .test_postings import makeList
+from . import CORPUS
+
+QUERIES = [
+    (['lady', 'macbeth'], dict(queryType = 'phrase')),
+    (['cry', 'havoc'], dict(queryType = 'phrase', operator = '#uw', n = 5)),
+    (['romeo', 'juliet'], dict(queryType = 'and')),
+    (['romeo', 'juliet'], dict(queryType = 'and', playId = 'romeo_and_juliet')),
+    (['verona', 'rome', 'italy'], dict(queryType = 'or')),
+    (['verona', 'rome'], dict(queryType = 'or', playId = 'julius_caesar')),
+    (['love', 'death'], dict(queryType = 'phrase', operator = '#od', n = 3, exclude = ['romeo'])),
+    (['king', 'crown', 'throne'], dict(queryType = 'ranked', k = 5)),
+    (['love', 'death'], dict(queryType = 'ranked', scorer = 'dirichlet', playId = 'hamlet'))
+]
+
+class TraceTest(unittest.TestCase):
+    def testCounts(self): # Every counter, on posting lists small enough to follow by hand
+        index = { 'x':makeList([(d, [0, 4]) for d in (2, 4, 5)]), 'y':makeList([(d, [1, 7]) for d in (1, 3, 5, 6)]) }
+        meta = [{ 'playId':'play', 'sceneId':'play:' + str(d), 'sceneNum':d, 'length':8 } for d in range(7)]
+        trace = QueryTrace()
+        self.assertEqual(Index(index, meta).query(['x', 'y'], 'phrase', trace = trace), { 5:[0] })
+        # Cursors on 2 and 1 first. x has fewer documents, so y skips to 2 (lands on 3), x skips to 3 (4), y to 4 (5), x to 5,
+        # y to 5 (doesn't move), and both are on 5: 2 positions each are decoded and compared, then x is done
+        self.assertEqual(trace.counters, { 'cursors':2, 'postingsVisited':6, 'skips':5, 'skipDistance':4, 'positionsDecoded':4,
+            'positionsCompared':4, 'candidateDocs':1, 'results':1 })
+        self.assertEqual(trace.operators['candidates'][0], 1)
+        self.assertEqual(trace.operators['match'][0], 1)
+        self.assertEqual(trace.toDict()['type'], 'phrase')
+        self.assertEqual(trace.toDict()['terms'], ['x', 'y'])
+
+    def testSameResults(self): # A traced query returns what the untraced one does, and counts its results
+        index = Index.build(CORPUS)
+        for terms, options in QUERIES:
+            trace = QueryTrace()
+            results = index.query(terms, trace = trace, **options)
+            self.assertEqual(results, index.query(terms, **options), (terms, options))
+            self.assertEqual(trace.counters['results'], len(results))
+            self.assertGreater(trace.elapsed, 0)
+            self.assertLessEqual(sum(seconds for _, seconds in trace.operators.values()), trace.elapsed)
+
+    def testStats(self): # TraceStats adds up QueryTraces and their toDict()
+        traces = []
+        for queryType, counts in (('or', 1), ('and', 2), ('or', 3)):
+            trace = QueryTrace()
+            trace.setQuery(queryType, ['a'])
+            for counter in COUNTERS:
+                trace.count(counter, counts)
+            trace.addTime('boolean', 0.5, counts)
+            trace.elapsed = 1.0
+            traces.append(trace)
+        stats = TraceStats()
+        stats.add(traces[0])
+        stats.add(traces[1].toDict())
+        stats.add(traces[2])
+        self.assertEqual(stats.toDict(), { 'queries':{ 'or':2, 'and':1 }, 'elapsed':3.0, 'counters':dict.fromkeys(COUNTERS, 6),
+            'operators':{ 'boolean':{ 'calls':6, 'seconds':1.5 } } })
+
+if __name__ == '__main__':
+    unittest.main()